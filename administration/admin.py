@@ -108,6 +108,6 @@ class DailyResetTrackerAdmin(admin.ModelAdmin):
     """
     list_display = ('last_reset_time', 'reset_interval_hours') 
     list_editable = ('reset_interval_hours',) 
-    readonly_fields = ('last_reset_time',)
+    readonly_fields = ('last_reset_time', 'reset_in_progress_for', 'reset_cursor')
     ordering = ('-last_reset_time',) 
     search_fields = ('last_reset_time',)
\ No newline at end of file
@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from administration.stats import backfill_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the DailyStats rollup of the admin dashboard (registrations and submissions "
+        "per day) from the users and games tables, a chunk of days at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day (YYYY-MM-DD), defaults to the first user or game")
+        parser.add_argument('--end', help="Last day (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Days recomputed per transaction")
+
+    def parse_day(self, value):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        written = backfill_daily_stats(
+            start=self.parse_day(options['start']),
+            end=self.parse_day(options['end']),
+            chunk_days=max(options['chunk_days'], 1),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Daily stats written for {written} days."))
@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django_redis.compressors.zlib import ZlibCompressor
+from django_redis.serializers.json import JSONSerializer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from game.views import ProductViewSet
+from notification.views import UserNotificationViewSet
+from packs.views import PackViewSet
+from shared.cache_codec import MsgpackSerializer
+
+User = get_user_model()
+
+
+class LegacyCodec:
+    """
+    Previous cache configuration: JSONSerializer + ZlibCompressor.
+    """
+    name = "json+zlib"
+
+    def __init__(self):
+        self.serializer = JSONSerializer({})
+        self.compressor = ZlibCompressor({})
+
+    def dumps(self, value):
+        return self.compressor.compress(self.serializer.dumps(value))
+
+    def loads(self, value):
+        try:
+            value = self.compressor.decompress(value)
+        except Exception:
+            pass
+        return self.serializer.loads(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the encode/decode throughput and stored size of the msgpack cache codec "
+        "with the previous JSON + zlib configuration, on the cached products list, packs "
+        "list and notification list payloads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def payloads(self):
+        """
+        Values stored by cache_result for the real endpoints, built without the cache.
+        """
+        factory = APIRequestFactory()
+        user = User.objects.annotate(total=Count('notifications')).order_by('-total').first()
+        endpoints = (
+            ('products list', ProductViewSet, 'list'),
+            ('packs list', PackViewSet, 'list'),
+            ('notifications', UserNotificationViewSet, 'list'),
+        )
+        payloads = []
+        for label, viewset, action in endpoints:
+            # Same viewset with the cache_result wrapper removed
+            uncached = type(f"Uncached{viewset.__name__}", (viewset,), {action: getattr(viewset, action).__wrapped__})
+            request = factory.get('/')
+            force_authenticate(request, user=user or User(username='benchmark'))
+            response = uncached.as_view({'get': action})(request)
+            payloads.append((label, {
+                'value': {'data': response.data, 'status_code': response.status_code, 'headers': {}},
+                'delta': 0.01,
+                'expires_at': time.time(),
+            }))
+        return payloads
+
+    def memory_usage(self, encoded):
+        """
+        Redis memory of a key holding ``encoded``, None when it cannot be measured.
+        """
+        try:
+            from django_redis import get_redis_connection
+            redis = get_redis_connection('default')
+            redis.set('benchmark_cache_codec', encoded)
+            try:
+                return redis.memory_usage('benchmark_cache_codec')
+            finally:
+                redis.delete('benchmark_cache_codec')
+        except Exception:
+            return None
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        codec_options = settings.CACHES['default'].get('OPTIONS', {})
+        codecs = (LegacyCodec(), MsgpackSerializer(codec_options))
+
+        for label, value in self.payloads():
+            self.stdout.write(label)
+            for codec in codecs:
+                encoded = codec.dumps(value)
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    codec.dumps(value)
+                encode = (time.perf_counter() - start) / iterations
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    codec.loads(encoded)
+                decode = (time.perf_counter() - start) / iterations
+
+                memory = self.memory_usage(encoded)
+                name = getattr(codec, 'name', 'msgpack')
+                self.stdout.write(
+                    f"  {name:<10} encode {encode * 1000000:9.1f} us  decode {decode * 1000000:9.1f} us  "
+                    f"stored {len(encoded):8} bytes"
+                    + (f"  redis memory {memory} bytes" if memory is not None else "")
+                )
+        self.stdout.write(self.style.SUCCESS("Benchmark completed."))
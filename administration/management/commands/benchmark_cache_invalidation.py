@@ -0,0 +1,96 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.cache_utils import build_versioned_cache_key, generation_key, invalidate_generation
+
+
+def legacy_invalidate_cache_pattern(pattern):
+    """
+    Previous shared.cache_utils.invalidate_cache_pattern (KEYS + DEL), kept
+    here as the benchmark baseline. Returns the number of keys deleted.
+    """
+    keys = cache.keys(pattern)
+    if keys:
+        cache.delete_many(keys)
+    return len(keys)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare KEYS-based pattern invalidation with generation counters on a "
+        "Redis cache seeded with throwaway keys. Requires django-redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000000, help="Number of keys seeded in the cache")
+        parser.add_argument('--users', type=int, default=100000, help="Number of user scopes the keys are spread over")
+        parser.add_argument('--iterations', type=int, default=5, help="Invalidations measured per method")
+
+    def redis(self):
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception as e:
+            raise CommandError(f"A django-redis cache is required: {e}")
+
+    def seed(self, redis, family, count, users):
+        batch_size = 10000
+        for start in range(0, count, batch_size):
+            pipe = redis.pipeline(transaction=False)
+            for i in range(start, min(start + batch_size, count)):
+                # Same layout as the notification keys: family:<user id>:...
+                pipe.set(cache.make_key(f"{family}:{i % users + 1}:{i}"), b'x', ex=3600)
+            pipe.execute()
+
+    def cleanup(self, redis, family, scopes):
+        batch = []
+        for key in redis.scan_iter(match=cache.make_key(f"{family}:*"), count=10000):
+            batch.append(key)
+            if len(batch) >= 10000:
+                redis.delete(*batch)
+                batch = []
+        if batch:
+            redis.delete(*batch)
+        redis.delete(*(cache.make_key(generation_key(family, user_id)) for user_id in scopes))
+        redis.delete(cache.make_key(generation_key(family)))
+
+    def handle(self, *args, **options):
+        redis = self.redis()
+        family = f"benchmark_{uuid.uuid4().hex[:8]}"
+        iterations = options['iterations']
+
+        self.stdout.write(f"Seeding {options['keys']} keys...")
+        self.seed(redis, family, options['keys'], options['users'])
+        try:
+            elapsed = []
+            deleted = []
+            for user_id in range(1, iterations + 1):
+                start = time.perf_counter()
+                deleted.append(legacy_invalidate_cache_pattern(f"{family}:{user_id}*"))
+                elapsed.append(time.perf_counter() - start)
+            self.stdout.write(
+                f"{'KEYS':<12} {sum(elapsed) / iterations * 1000:10.3f} ms per invalidation "
+                f"({sum(deleted) / iterations:.0f} keys deleted, including users sharing the id prefix)"
+            )
+
+            elapsed = []
+            for user_id in range(1, iterations + 1):
+                start = time.perf_counter()
+                invalidate_generation(family, user_id)
+                elapsed.append(time.perf_counter() - start)
+            self.stdout.write(f"{'generation':<12} {sum(elapsed) / iterations * 1000:10.3f} ms per invalidation")
+
+            start = time.perf_counter()
+            for user_id in range(1, iterations + 1):
+                build_versioned_cache_key(family, user_id, 'list', scoped=True)
+            self.stdout.write(
+                f"{'key lookup':<12} {(time.perf_counter() - start) / iterations * 1000:10.3f} ms "
+                f"added per cached read (generation fetch)"
+            )
+        finally:
+            self.cleanup(redis, family, range(1, iterations + 1))
+
+        self.stdout.write(self.style.SUCCESS("Benchmark completed (seeded keys removed)."))
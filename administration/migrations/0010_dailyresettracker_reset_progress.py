@@ -0,0 +1,23 @@
+# Generated by Django 3.2.21 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administration', '0009_alter_dailyresettracker_reset_interval_hours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyresettracker',
+            name='reset_cursor',
+            field=models.BigIntegerField(default=0, verbose_name='Last Reset User ID'),
+        ),
+        migrations.AddField(
+            model_name='dailyresettracker',
+            name='reset_in_progress_for',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reset In Progress For'),
+        ),
+    ]
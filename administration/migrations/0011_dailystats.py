@@ -0,0 +1,55 @@
+# Generated by Django 3.2.21 on 2026-10-16 23:43
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """
+    Fill the rows from the users and games tables (see administration.stats.backfill_daily_stats).
+    """
+    User = apps.get_model('users', 'User')
+    Game = apps.get_model('game', 'Game')
+    DailyStats = apps.get_model('administration', 'DailyStats')
+
+    def count_per_day(queryset, field):
+        rows = queryset.annotate(day=TruncDate(field)).values('day').annotate(count=Count('id')).order_by()
+        return {row['day']: row['count'] for row in rows}
+
+    registrations = count_per_day(User.objects.filter(is_staff=False), 'date_joined')
+    submissions = count_per_day(
+        Game.objects.filter(is_active=True).filter(Q(played=True) | Q(pending=True)), 'updated_at'
+    )
+    DailyStats.objects.bulk_create([
+        DailyStats(date=day, registrations=registrations.get(day, 0), submissions=submissions.get(day, 0))
+        for day in sorted(set(registrations) | set(submissions))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('administration', '0010_dailyresettracker_reset_progress'),
+        ('game', '0014_game_record_keyset_idx'),
+        ('users', '0018_user_last_connection_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Date')),
+                ('registrations', models.IntegerField(default=0, verbose_name='Users Registered')),
+                ('submissions', models.IntegerField(default=0, verbose_name='Played Or Pending Games')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Stats',
+                'verbose_name_plural': 'Daily Stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
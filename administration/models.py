@@ -46,6 +46,9 @@ class Settings(models.Model):
         if not self.pk and Settings.objects.exists():
             raise ValueError("There can only be one instance of Settings.")
         super(Settings, self).save(*args, **kwargs)
+        # Also covers the changes made from the Django admin
+        from shared.cache_utils import invalidate_settings_cache
+        invalidate_settings_cache()
 
 class Event(models.Model):
     name = models.CharField(max_length=255, verbose_name="Event Name")
@@ -85,4 +88,25 @@ class DailyResetTracker(models.Model):
         decimal_places=2,  # Number of decimal places
         default=24.00,  # Default to 24 hours
         verbose_name="Reset Interval in Hours",
-    )
\ No newline at end of file
+    )
+    # Progress of a reset split in chunks, so an interrupted reset resumes where it stopped
+    reset_in_progress_for = models.DateTimeField(null=True, blank=True, verbose_name="Reset In Progress For")
+    reset_cursor = models.BigIntegerField(default=0, verbose_name="Last Reset User ID")
+
+
+class DailyStats(models.Model):
+    """
+    Per-day rollup of the admin dashboard figures (local dates, see administration.stats).
+    """
+    date = models.DateField(unique=True, verbose_name="Date")
+    registrations = models.IntegerField(default=0, verbose_name="Users Registered")
+    submissions = models.IntegerField(default=0, verbose_name="Played Or Pending Games")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats of {self.date}"
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = "Daily Stats"
+        verbose_name_plural = "Daily Stats"
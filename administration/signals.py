@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from game.models import Game
+
+from .stats import record_registration, record_submission_move
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def count_user_registration(sender, instance, created, **kwargs):
+    """
+    Count new users in the DailyStats registrations of the dashboard.
+    """
+    if created:
+        record_registration(instance)
+
+
+@receiver(post_delete, sender=User)
+def uncount_user_registration(sender, instance, **kwargs):
+    record_registration(instance, delta=-1)
+
+
+@receiver(post_delete, sender=Game)
+def uncount_game_submission(sender, instance, **kwargs):
+    """
+    Remove deleted games from the DailyStats submissions, bulk and cascade
+    deletes (e.g. with their user) included.
+    """
+    # Set by Game.from_db/save, unknown for games loaded with deferred fields
+    previous_day = getattr(instance, '_submission_day', None)
+    if previous_day is not None:
+        record_submission_move(previous_day, None)
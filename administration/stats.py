@@ -0,0 +1,179 @@
+"""
+Admin dashboard statistics, read from the DailyStats rollup.
+
+Every local day has a DailyStats row counting the non-staff users who joined
+that day and the submissions of that day: the active games played or pending
+whose last update falls on it, as the dashboard always counted them.
+
+The rows are kept up to date incrementally: user registrations and deletions
+and game deletions (administration.signals) and Game saves (Game.save)
+adjust the counters of the affected days. The adjustments run once the
+change is committed, as a single UPDATE, so the plays of every user do not
+queue on the lock of today's row. ``backfill_daily_stats`` (management
+command of the same name) recomputes the rows from the users and games
+tables, a chunk of days at a time.
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils.timezone import localdate, localtime, make_aware
+
+from game.models import Game, Product
+from shared.cache_utils import cache_result
+
+from .models import DailyStats
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def submission_day(game):
+    """
+    Local day ``game`` counts as a submission on, None when it does not count.
+    """
+    if game.is_active and (game.played or game.pending) and game.updated_at:
+        return localtime(game.updated_at).date()
+    return None
+
+
+def _add(day, **deltas):
+    """
+    Add ``deltas`` to the counters of ``day``, creating its row when missing.
+    """
+    values = {field: F(field) + delta for field, delta in deltas.items()}
+    if DailyStats.objects.filter(date=day).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            DailyStats.objects.create(date=day, **deltas)
+    except IntegrityError:
+        # Created by a concurrent adjustment
+        DailyStats.objects.filter(date=day).update(**values)
+
+
+def _add_on_commit(day, **deltas):
+    def apply():
+        try:
+            _add(day, **deltas)
+        except Exception as e:
+            logger.warning(f"Daily stats update failed for {day}: {e}")
+    transaction.on_commit(apply)
+
+
+def record_submission_move(previous_day, day):
+    """
+    A game started counting on ``day`` (None: stopped counting) instead of ``previous_day``.
+    """
+    if previous_day == day:
+        return
+    if previous_day is not None:
+        _add_on_commit(previous_day, submissions=-1)
+    if day is not None:
+        _add_on_commit(day, submissions=1)
+
+
+def record_registration(user, delta=1):
+    """
+    Count the registration of ``user`` (delta=-1 when the user is deleted).
+    """
+    if user.is_staff or not user.date_joined:
+        return
+    _add_on_commit(localtime(user.date_joined).date(), registrations=delta)
+
+
+def clear_submissions():
+    """
+    Zero the submissions of every day, once all the games have been deleted.
+    """
+    transaction.on_commit(lambda: DailyStats.objects.exclude(submissions=0).update(submissions=0))
+
+
+def _count_per_day(queryset, field, start, end):
+    """
+    {local date: count} of ``queryset`` rows whose ``field`` falls in [start, end).
+    """
+    # Local midnights, so the range is served by the column's index
+    bounds = (make_aware(datetime.combine(start, time())), make_aware(datetime.combine(end, time())))
+    rows = queryset.filter(**{f'{field}__gte': bounds[0], f'{field}__lt': bounds[1]}).annotate(
+        day=TruncDate(field)
+    ).values('day').annotate(count=Count('id')).order_by()
+    return {row['day']: row['count'] for row in rows}
+
+
+def backfill_daily_stats(start=None, end=None, chunk_days=31):
+    """
+    Recompute the DailyStats rows of the days from ``start`` to ``end``
+    (inclusive, by default from the first user or game to today), a chunk of
+    ``chunk_days`` days per transaction. Returns the number of days written.
+
+    Adjustments committed while a chunk is recomputed can be counted twice or
+    missed: re-running the backfill of a day fixes it.
+    """
+    end = end or localdate()
+    if start is None:
+        first_user = User.objects.users().aggregate(first=Min('date_joined'))['first']
+        first_game = Game.objects.aggregate(first=Min('updated_at'))['first']
+        firsts = [localtime(value).date() for value in (first_user, first_game) if value]
+        start = min(firsts) if firsts else end
+
+    submissions = Game.objects.filter(is_active=True).filter(Q(played=True) | Q(pending=True))
+    written = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days), end + timedelta(days=1))
+        registrations_per_day = _count_per_day(User.objects.users(), 'date_joined', chunk_start, chunk_end)
+        submissions_per_day = _count_per_day(submissions, 'updated_at', chunk_start, chunk_end)
+        days = [chunk_start + timedelta(days=offset) for offset in range((chunk_end - chunk_start).days)]
+
+        with transaction.atomic():
+            existing = {stats.date: stats for stats in DailyStats.objects.select_for_update().filter(date__in=days)}
+            created, updated = [], []
+            for day in days:
+                stats = existing.get(day) or DailyStats(date=day)
+                stats.registrations = registrations_per_day.get(day, 0)
+                stats.submissions = submissions_per_day.get(day, 0)
+                (updated if day in existing else created).append(stats)
+            DailyStats.objects.bulk_update(updated, ['registrations', 'submissions'])
+            DailyStats.objects.bulk_create(created)
+        written += len(days)
+        logger.info(f"Daily stats recomputed from {chunk_start} to {chunk_end - timedelta(days=1)}")
+        chunk_start = chunk_end
+    return written
+
+
+@cache_result('DASHBOARD', 'totals')
+def get_dashboard_stats():
+    """
+    Totals of the admin dashboard, read from DailyStats in one query (plus
+    the products count), cached for CACHE_TTL['DASHBOARD'] seconds.
+    """
+    today = localdate()
+    this_year = Q(date__year=today.year)
+    months = range(1, 13)
+    totals = DailyStats.objects.aggregate(
+        total_users=Coalesce(Sum('registrations'), 0),
+        total_submissions=Coalesce(Sum('submissions', filter=Q(date=today)), 0),
+        **{
+            f'registrations_{month}': Coalesce(Sum('registrations', filter=this_year & Q(date__month=month)), 0)
+            for month in months
+        },
+        **{
+            f'submissions_{month}': Coalesce(Sum('submissions', filter=this_year & Q(date__month=month)), 0)
+            for month in months
+        },
+    )
+    return {
+        'total_users': totals['total_users'],
+        'active_products': Product.objects.count(),
+        'total_submissions': totals['total_submissions'],
+        'user_registrations_per_month': {month: totals[f'registrations_{month}'] for month in months},
+        # Months up to the current one
+        'total_submissions_per_month': {
+            month: totals[f'submissions_{month}'] for month in range(1, today.month + 1)
+        },
+    }
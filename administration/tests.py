@@ -1,3 +1,58 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils.timezone import localdate
+
+from game.models import Game
+from packs.models import Pack
+
+from .models import DailyStats
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'administration-tests'}},
+)
+class DailyStatsSubmissionTests(TestCase):
+    """
+    Deleted games leave the DailyStats submissions, however they are deleted.
+    """
+
+    def setUp(self):
+        Pack.objects.create(
+            name="VIP1", usd_value=0, daily_missions=5, daily_withdrawals=1, icon="pack.png",
+            profit_percentage=Decimal("0.5"), short_description="s", description="d",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = User.objects.create_user(
+                username="player", email="player@example.com", password="password", phone_number="player",
+            )
+            for _ in range(2):
+                Game.objects.create(user=self.user, amount=Decimal("50.00"), played=True)
+            # Not a submission
+            Game.objects.create(user=self.user, amount=Decimal("50.00"))
+
+    def submissions(self):
+        return DailyStats.objects.get(date=localdate()).submissions
+
+    def test_deleted_game(self):
+        self.assertEqual(self.submissions(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Game.objects.filter(played=True).first().delete()
+
+        self.assertEqual(self.submissions(), 1)
+
+    def test_games_deleted_in_bulk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Game.objects.all().delete()
+
+        self.assertEqual(self.submissions(), 0)
+
+    def test_games_deleted_with_their_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertEqual(self.submissions(), 0)
+        self.assertEqual(DailyStats.objects.get(date=localdate()).registrations, 0)
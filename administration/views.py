@@ -13,15 +13,19 @@ from .models import Settings,Event
 from .serializers import SettingsSerializer,DepositSerializer,SettingsVideoSerializer,EventSerializer,WithdrawalSerializer
 from shared.utils import standard_response as Response
 from shared.helpers import get_settings,create_admin_log
-from shared.cache_utils import cache_result, invalidate_settings_cache, invalidate_events_cache
+from shared.cache_utils import cache_result, invalidate_settings_cache, invalidate_events_cache, CACHE_FAMILIES
+from shared import cache_metrics
+from shared.local_cache import local_cache
 from shared.mixins import StandardResponseMixin
+from shared.pagination import KeysetPagination, KEYSET_PAGINATION_PARAMETERS
 from core.permissions import IsSiteAdmin,IsAdminOrReadOnly
 from finances.models import Deposit,Withdrawal
 from cloudinary.uploader import upload
 from rest_framework.exceptions import ValidationError
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from django.contrib.auth import get_user_model
-from users.serializers import UserProfileListSerializer,AdminUserUpdateSerializer
+from users.serializers import UserProfileListSerializer,AdminUserUpdateSerializer,UserActivitySerializer
+from users import last_seen
 from wallet.serializers import OnHoldPaySerializer
 from wallet.models import OnHoldPay
 from game.models import Game
@@ -57,7 +61,7 @@ class SettingsViewSet(GenericViewSet):
         404: "Settings not found",
     },
 )
-    @cache_result('SETTINGS', 'global')
+    @cache_result('SETTINGS', 'global', l1=True)
     def list(self, request, *args, **kwargs):
         """
         Handle GET request for settings.
@@ -83,7 +87,8 @@ class SettingsViewSet(GenericViewSet):
         """
         Handle PATCH request to partially update settings.
         """
-        instance = get_settings()
+        # Not the shared in-memory copy of get_settings()
+        instance = Settings.objects.first()
         if not instance:
             raise NotFound(detail="Settings not found.")
         serializer = self.get_serializer(instance, data=request.data, partial=True)  # Partial update enabled
@@ -167,6 +172,7 @@ class AdminDepositViewSet(StandardResponseMixin, ViewSet):
         }
         return action_to_serializer.get(self.action, DepositSerializer.List)
 
+    @swagger_auto_schema(manual_parameters=KEYSET_PAGINATION_PARAMETERS)
     def list(self, request):
         """
         List all deposits for admin users.
@@ -174,15 +180,12 @@ class AdminDepositViewSet(StandardResponseMixin, ViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return Response([], status=status.HTTP_200_OK)
 
-        deposits = Deposit.objects.all().order_by('date_time')
+        # Oldest first, as before: created_at is set with date_time
+        paginator = KeysetPagination(ordering=('created_at', 'id'))
+        deposits = paginator.paginate_queryset(Deposit.objects.all(), request, view=self)
         serializer_class = self.get_serializer_class()
         serializer = serializer_class(deposits, many=True)
-        return Response(
-            success=True,
-            message="All deposits retrieved successfully.",
-            data=serializer.data,
-            status_code=status.HTTP_200_OK,
-        )
+        return paginator.get_paginated_response(serializer.data, message="All deposits retrieved successfully.")
 
     @action(detail=True, methods=["patch"], url_path="update-status")
     def update_status(self, request, pk=None):
@@ -240,9 +243,10 @@ class AdminWithdrawalViewSet(StandardResponseMixin, ViewSet):
     @swagger_auto_schema(
         operation_summary="List All Withdrawals",
         operation_description=(
-            "Retrieve a list of all withdrawal requests, ordered by creation date. "
+            "Retrieve a page of the withdrawal requests, newest first. "
             "Accessible only to admin users."
         ),
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS,
         responses={
             200: openapi.Response(
                 description="List of withdrawals",
@@ -258,15 +262,11 @@ class AdminWithdrawalViewSet(StandardResponseMixin, ViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return Response([], status=status.HTTP_200_OK)
 
-        withdrawals = Withdrawal.objects.all().order_by('-created_at')
+        paginator = KeysetPagination()
+        withdrawals = paginator.paginate_queryset(Withdrawal.objects.all(), request, view=self)
         serializer_class = self.get_serializer_class()
         serializer = serializer_class(withdrawals, many=True)
-        return Response(
-            success=True,
-            message="All withdrawals retrieved successfully.",
-            data=serializer.data,
-            status_code=status.HTTP_200_OK,
-        )
+        return paginator.get_paginated_response(serializer.data, message="All withdrawals retrieved successfully.")
 
     @swagger_auto_schema(
         operation_summary="Update Withdrawal Status",
@@ -393,16 +393,19 @@ class AdminUserManagementViewSet(StandardResponseMixin,ReadOnlyModelViewSet):
     def get_queryset(self):
         """
         Annotate the queryset with complex fields and return it.
+        The game totals are the users' indexed counter columns (see game.counters).
         """
-        return User.objects.users().annotate(
-            total_games_played=Count('games', filter=Q(games__played=True)),
-            total_negative_product=Count('games', filter=Q(games__played=True)& Q(games__special_product=True)),
+        # Write the buffered connections first, so last_connection is up to date
+        last_seen.flush()
+        return UserProfileListSerializer.setup_eager_loading(User.objects.users()).annotate(
+            total_games_played=F('games_played_count'),
+            total_negative_product=F('special_games_played_count'),
             wallet_commission=F('wallet__commission')
         )
 
     filter_backends = [OrderingFilter, SearchFilter]
     search_fields = ['username', 'email', 'phone_number','first_name','last_name']
-    ordering_fields = ['wallet__commission', 'total_games_played', 'total_negative_product',] 
+    ordering_fields = ['wallet__commission', 'total_games_played', 'total_negative_product', 'lifetime_commission',] 
     ordering = ['-id'] 
 
     def get_serializer_class(self):
@@ -439,6 +442,8 @@ class AdminUserManagementViewSet(StandardResponseMixin,ReadOnlyModelViewSet):
             return AdminUserUpdateSerializer.UserProfitCalculation
         elif self.action == 'calculate_user_salary':
             return AdminUserUpdateSerializer.UserSalaryCalculation
+        elif self.action == 'active_today':
+            return UserActivitySerializer
         return super().get_serializer_class()
     
     
@@ -741,6 +746,27 @@ class AdminUserManagementViewSet(StandardResponseMixin,ReadOnlyModelViewSet):
         except Exception:
             pass
         return self.handle_action_response(user, "User pack has been updated successfully")
+
+    @swagger_auto_schema(
+        operation_summary="Users connected today",
+        operation_description="Page of the users connected since midnight, most recent first.",
+        manual_parameters=KEYSET_PAGINATION_PARAMETERS,
+    )
+    @action(detail=False, methods=['get'], url_path='active-today')
+    @cache_result('DASHBOARD', 'active_today', vary_on_query=('cursor', 'page_size'))
+    def active_today(self, request):
+        """
+        List the users connected today (counted in the dashboard's total_users_login_today).
+        """
+        # Write the buffered connections first, so last_connection is up to date
+        last_seen.flush()
+        users = User.objects.filter(
+            last_connection__gte=last_seen.start_of_today()
+        ).only(*UserActivitySerializer.Meta.fields)
+        paginator = KeysetPagination(ordering=('-last_connection', '-id'))
+        page = paginator.paginate_queryset(users, request, view=self)
+        serializer = UserActivitySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data, message="Users connected today retrieved successfully.")
     
 class OnHoldViewSet(StandardResponseMixin,ModelViewSet):
     queryset = OnHoldPay.objects.all()
@@ -814,3 +840,58 @@ class AdminNegativeUserManagementViewSet(StandardResponseMixin,ModelViewSet):
             )
     
 
+
+class CacheMetricsViewSet(StandardResponseMixin, ViewSet):
+    """
+    Admin ViewSet exposing the hit/miss, latency and payload size metrics of the cache families.
+    """
+    permission_classes = [IsSiteAdmin]
+
+    @swagger_auto_schema(
+        operation_summary="Cache metrics",
+        operation_description=(
+            "Per cache family: L1/L2 hits and misses, stale values served, lookup and recomputation "
+            "latency histograms and stored payload sizes. Totals of every worker, as flushed to Redis "
+            "every few seconds, or of the answering worker with scope=process."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                name="scope",
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=["all", "process"],
+                description="all (default) or process",
+                required=False,
+            )
+        ],
+        responses={200: "Cache metrics retrieved successfully."},
+    )
+    def list(self, request):
+        """
+        Return the cache metrics.
+        """
+        if request.query_params.get("scope") == "process":
+            families = cache_metrics.get_local_metrics(CACHE_FAMILIES)
+        else:
+            families = cache_metrics.get_metrics(CACHE_FAMILIES)
+        return Response(
+            success=True,
+            message="Cache metrics retrieved successfully.",
+            data={"families": families, "l1_entries": len(local_cache)},
+            status_code=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(operation_summary="Reset the cache metrics", responses={200: "Cache metrics reset."})
+    @action(detail=False, methods=["post"], url_path="reset")
+    def reset(self, request):
+        """
+        Clear the aggregated counters and those of the answering worker.
+        """
+        cache_metrics.reset_metrics(CACHE_FAMILIES)
+        create_admin_log(request, "Reset the cache metrics")
+        return Response(
+            success=True,
+            message="Cache metrics reset.",
+            data={},
+            status_code=status.HTTP_200_OK,
+        )
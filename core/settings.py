@@ -148,6 +148,9 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Repairs the SQLite test tables left broken by the migrations (see core/test_runner.py)
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 
 "---------------------------------------------Rest Framework Settings -------------------------------------------------"
 REST_FRAMEWORK = {
@@ -234,6 +237,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'users.daily_reset': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
     'handlers': {
         'console': {
@@ -390,8 +398,11 @@ CACHES = {
                 'max_connections': 50,
                 'retry_on_timeout': True,
             },
-            'COMPRESSOR': 'django_redis.compressors.zlib.ZlibCompressor',
-            'SERIALIZER': 'django_redis.serializers.json.JSONSerializer',
+            # msgpack with zlib above CODEC_COMPRESS_MIN_BYTES, see shared/cache_codec.py
+            'COMPRESSOR': 'django_redis.compressors.identity.IdentityCompressor',
+            'SERIALIZER': 'shared.cache_codec.MsgpackSerializer',
+            'CODEC_COMPRESS_MIN_BYTES': int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '1024')),
+            'CODEC_COMPRESS_LEVEL': int(os.getenv('CACHE_COMPRESS_LEVEL', '1')),
         },
         'KEY_PREFIX': 'ads_backend',
         'TIMEOUT': 7200,  # 2 hours default timeout
@@ -405,5 +416,74 @@ CACHE_TTL = {
     'NOTIFICATIONS': 10800,  # 3 hours
     'SETTINGS': 14400,  # 4 hours
     'EVENTS': 14400,  # 4 hours
+    'DASHBOARD': int(os.getenv('DASHBOARD_CACHE_TTL', '60')),  # 1 minute, not invalidated
     'DEFAULT': 7200,  # 2 hours
 }
+
+# Per-process L1 cache of the hot catalog reads (cache_result(..., l1=True)):
+# entry bound, lifetime (seconds) and how long a worker trusts the family
+# generations it fetched before checking them again in Redis (seconds)
+CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', '1000'))
+CACHE_L1_TTL = int(os.getenv('CACHE_L1_TTL', '60'))
+CACHE_L1_GENERATION_CHECK_INTERVAL = float(os.getenv('CACHE_L1_GENERATION_CHECK_INTERVAL', '1.0'))
+
+# Stampede protection of cache_result: lifetime of the per-key recomputation lock
+# and longest wait for another worker's recomputation (seconds), how long the
+# previous value outlives the key to be served meanwhile (seconds), and the
+# eagerness of the probabilistic early refresh (0 disables it)
+CACHE_REFRESH_LOCK_TIMEOUT = int(os.getenv('CACHE_REFRESH_LOCK_TIMEOUT', '30'))
+CACHE_REFRESH_WAIT = float(os.getenv('CACHE_REFRESH_WAIT', '2.0'))
+CACHE_STALE_GRACE = int(os.getenv('CACHE_STALE_GRACE', '600'))
+CACHE_EARLY_EXPIRY_BETA = float(os.getenv('CACHE_EARLY_EXPIRY_BETA', '1.0'))
+
+# Seconds between two flushes of a worker's cache metrics to Redis, and share
+# of the per-request cache log lines written (at DEBUG level)
+CACHE_METRICS_FLUSH_INTERVAL = int(os.getenv('CACHE_METRICS_FLUSH_INTERVAL', '10'))
+CACHE_LOG_SAMPLE_RATE = float(os.getenv('CACHE_LOG_SAMPLE_RATE', '0.01'))
+
+"----------------------------------------------- GAME SETTINGS  -----------------------------------------------"
+
+# Lifetime (seconds) of the product price index version: every worker rebuilds
+# its index at least this often, even for catalog writes that send no signal
+PRODUCT_INDEX_VERSION_TTL = int(os.getenv('PRODUCT_INDEX_VERSION_TTL', '300'))
+
+# Time budget (seconds) of the subset-sum search picking negative game products
+NEGATIVE_PRODUCT_SEARCH_TIME_BUDGET = float(os.getenv('NEGATIVE_PRODUCT_SEARCH_TIME_BUDGET', '0.5'))
+
+# Per-user lookahead queue of precomputed next games (requires Redis)
+GAME_LOOKAHEAD_ENABLED = os.getenv('GAME_LOOKAHEAD_ENABLED', '0') == '1'
+# Share of users (0-100) the lookahead queue is enabled for
+GAME_LOOKAHEAD_ROLLOUT_PERCENT = int(os.getenv('GAME_LOOKAHEAD_ROLLOUT_PERCENT', '100'))
+
+# Per-user game lock: lifetime of the lock and maximum wait before answering 409 (seconds)
+GAME_USER_LOCK_TIMEOUT = int(os.getenv('GAME_USER_LOCK_TIMEOUT', '10'))
+GAME_USER_LOCK_WAIT = float(os.getenv('GAME_USER_LOCK_WAIT', '1.0'))
+
+"----------------------------------------------- DAILY RESET SETTINGS  -----------------------------------------------"
+
+# Timezone of the daily reset midnight; when empty the admin Settings.timezone is used
+DAILY_RESET_TIMEZONE = os.getenv('DAILY_RESET_TIMEZONE', 'US/Eastern')
+# Seconds between two reset checks of the middleware and of the scheduler thread
+DAILY_RESET_CHECK_INTERVAL = int(os.getenv('DAILY_RESET_CHECK_INTERVAL', '60'))
+# Run the reset scheduler thread inside each web process (the run_daily_reset command can be used instead)
+DAILY_RESET_SCHEDULER_ENABLED = os.getenv('DAILY_RESET_SCHEDULER_ENABLED', '0') == '1'
+# Users reset per transaction by the daily reset
+DAILY_RESET_CHUNK_SIZE = int(os.getenv('DAILY_RESET_CHUNK_SIZE', '5000'))
+
+"----------------------------------------------- LAST CONNECTION SETTINGS  -----------------------------------------------"
+
+# A user's last_connection is recorded at most once per interval (seconds) and process
+LAST_CONNECTION_WRITE_INTERVAL = int(os.getenv('LAST_CONNECTION_WRITE_INTERVAL', '60'))
+# Recorded connections are written to the database in bulk at this interval (seconds)
+LAST_CONNECTION_FLUSH_INTERVAL = int(os.getenv('LAST_CONNECTION_FLUSH_INTERVAL', '60'))
+
+"----------------------------------------------- AUTH PRINCIPAL SETTINGS  -----------------------------------------------"
+
+# Lifetime (seconds) of the cached auth principal in Redis and of its in-process copy
+AUTH_PRINCIPAL_TTL = int(os.getenv('AUTH_PRINCIPAL_TTL', '300'))
+AUTH_PRINCIPAL_L1_TTL = int(os.getenv('AUTH_PRINCIPAL_L1_TTL', '5'))
+
+"----------------------------------------------- ADMIN SETTINGS CACHE  -----------------------------------------------"
+
+# Seconds between two checks of the admin settings version stamp by a worker
+SETTINGS_VERSION_CHECK_INTERVAL = float(os.getenv('SETTINGS_VERSION_CHECK_INTERVAL', '0.25'))
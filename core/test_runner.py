@@ -0,0 +1,35 @@
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+def repair_sqlite_wallet_table(connection):
+    """
+    On SQLite, wallet migration 0006 copies wallet_wallet with
+    CREATE TABLE ... AS SELECT, which drops its primary key and constraints.
+    Recreate the table from the Wallet model when its primary key is missing.
+    """
+    from wallet.models import Wallet
+
+    table = Wallet._meta.db_table
+    with connection.cursor() as cursor:
+        columns = connection.introspection.get_table_description(cursor, table)
+        if any(column.pk for column in columns):
+            return
+        cursor.execute(f'DROP TABLE "{table}"')
+    with connection.schema_editor() as editor:
+        editor.create_model(Wallet)
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner of the project: repairs the SQLite wallet table once the test
+    databases are migrated, without changing the applied migrations.
+    """
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        for alias in connections:
+            connection = connections[alias]
+            if connection.vendor == 'sqlite':
+                repair_sqlite_wallet_table(connection)
+        return old_config
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.21 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0004_auto_20241230_0721'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deposit',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='deposit_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deposit',
+            index=models.Index(fields=['-created_at', '-id'], name='deposit_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='withdrawal',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='withdrawal_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='withdrawal',
+            index=models.Index(fields=['-created_at', '-id'], name='withdrawal_keyset_idx'),
+        ),
+    ]
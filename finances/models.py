@@ -37,6 +37,11 @@ class Deposit(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the user's and the admin deposit lists
+            models.Index(fields=['user', '-created_at', '-id'], name='deposit_user_keyset_idx'),
+            models.Index(fields=['-created_at', '-id'], name='deposit_keyset_idx'),
+        ]
 
 
 
@@ -110,6 +115,11 @@ class Withdrawal(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the user's and the admin withdrawal lists
+            models.Index(fields=['user', '-created_at', '-id'], name='withdrawal_user_keyset_idx'),
+            models.Index(fields=['-created_at', '-id'], name='withdrawal_keyset_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """
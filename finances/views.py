@@ -11,6 +11,7 @@ from .models import Deposit,PaymentMethod,Withdrawal
 from .serializers import DepositSerializer,PaymentMethodSerializer,WithdrawalSerializer
 from core.permissions import IsAdminOrReadCreateOnlyForRegularUsers
 from shared.mixins import StandardResponseMixin
+from shared.pagination import KeysetPagination, KEYSET_PAGINATION_PARAMETERS
 from shared.helpers import create_user_notification,create_admin_notification
 
 
@@ -23,23 +24,20 @@ class DepositViewSet(StandardResponseMixin, ViewSet):
     permission_classes = [IsAuthenticated, IsAdminOrReadCreateOnlyForRegularUsers]
     parser_classes = [MultiPartParser, FormParser]
 
+    @swagger_auto_schema(manual_parameters=KEYSET_PAGINATION_PARAMETERS)
     def list(self, request):
         """
-        List deposits made by the authenticated user.
+        List deposits made by the authenticated user, newest first.
         """
         if getattr(self, 'swagger_fake_view', False): 
             return Response([], status=status.HTTP_200_OK)
         
         user = request.user
-        deposits = Deposit.objects.filter(user=user).order_by('-date_time')  # Regular user: Their deposits
+        paginator = KeysetPagination()
+        deposits = paginator.paginate_queryset(Deposit.objects.filter(user=user), request, view=self)  # Regular user: Their deposits
 
         serializer = DepositSerializer(deposits, many=True)
-        return self.standard_response(
-            success=True,
-            message="Deposits retrieved successfully.", 
-            data=serializer.data,
-            status_code=status.HTTP_200_OK,
-        )
+        return paginator.get_paginated_response(serializer.data, message="Deposits retrieved successfully.")
 
     @swagger_auto_schema(
         operation_description="Create a deposit for the authenticated user.",
@@ -252,16 +250,13 @@ class WithdrawalViewSet(StandardResponseMixin, ViewSet):
             status_code=status.HTTP_201_CREATED,
         )
 
+    @swagger_auto_schema(manual_parameters=KEYSET_PAGINATION_PARAMETERS)
     @action(detail=False, methods=['get'])
     def withdrawal_history(self,request):
         """
-        Retrieve the withdrawal history for the authenticated user.
+        Retrieve the withdrawal history for the authenticated user, newest first.
         """
-        withdrawals = Withdrawal.objects.filter(user=request.user)
+        paginator = KeysetPagination()
+        withdrawals = paginator.paginate_queryset(Withdrawal.objects.filter(user=request.user), request, view=self)
         serializer = WithdrawalSerializer.ListWithdrawals(withdrawals, many=True)
-        return self.standard_response(
-            success=True,
-            message="Withdrawal History Fetched succesfully.",
-            data=serializer.data,
-            status_code=status.HTTP_201_CREATED,
-        )
\ No newline at end of file
+        return paginator.get_paginated_response(serializer.data, message="Withdrawal History Fetched succesfully.")
\ No newline at end of file
@@ -1,3 +1,4 @@
+from django import forms
 from django.contrib import admin
 from .models import Product,Game
 
@@ -10,8 +11,21 @@ class ProductAdmin(admin.ModelAdmin):
     ordering = ('-date_created',)
 
 
+class GameAdminForm(forms.ModelForm):
+    class Meta:
+        model = Game
+        fields = '__all__'
+
+    def clean_products(self):
+        products = self.cleaned_data.get('products')
+        if products is not None and len(products) > Game.MAX_PRODUCTS:
+            raise forms.ValidationError("A game cannot have more than 3 products.")
+        return products
+
+
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
+    form = GameAdminForm
     list_display = ('id', 'user', 'rating_score', 'played', 'pending', 'special_product', 'created_at', 'updated_at')
     search_fields = ('user__username', 'rating_no')
     list_filter = ('played', 'special_product', 'pending', 'created_at')
@@ -19,8 +33,3 @@ class GameAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     filter_horizontal = ('products',)  # To manage many-to-many relationships in the admin UI
 
-    def save_model(self, request, obj, form, change):
-        # Custom save logic (if needed)
-        if obj.products.count() > 3:
-            raise ValueError("A game cannot have more than 3 products.")
-        super().save_model(request, obj, form, change)
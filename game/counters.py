@@ -0,0 +1,102 @@
+"""
+Per-user lifetime game counters.
+
+User.games_played_count, User.special_games_played_count and
+User.lifetime_commission mirror, for the active played games of each user,
+Count(games), Count(games with special_product) and Sum(games.commission).
+They are incremented in the same UPDATE as the daily counters when
+PlayGameService records a submission, so the admin user list sorts on indexed
+columns instead of aggregating the Game table.
+
+``rebuild_game_counters`` recomputes them from the Game table, a chunk of
+users at a time (``rebuild_game_counters`` management command).
+"""
+import logging
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Game
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+COUNTER_FIELDS = ('games_played_count', 'special_games_played_count', 'lifetime_commission')
+
+
+def played_game_increments(commission, special_product):
+    """
+    F-expression updates of the counters for one more played game.
+    """
+    values = {
+        'games_played_count': F('games_played_count') + 1,
+        'lifetime_commission': F('lifetime_commission') + commission,
+    }
+    if special_product:
+        values['special_games_played_count'] = F('special_games_played_count') + 1
+    return values
+
+
+def reset_game_counters():
+    """
+    Zero every user's counters, once all the games have been deleted.
+    """
+    return User.objects.exclude(
+        games_played_count=0, special_games_played_count=0, lifetime_commission=0
+    ).update(games_played_count=0, special_games_played_count=0, lifetime_commission=0)
+
+
+def compute_game_counters(user_ids):
+    """
+    Counters of ``user_ids`` computed from the Game table: {user_id: (played, special, commission)}.
+    """
+    rows = Game.objects.filter(user_id__in=user_ids, played=True, is_active=True).values('user_id').annotate(
+        played=Count('id'),
+        special=Count('id', filter=Q(special_product=True)),
+        commission=Sum('commission'),
+    ).order_by()
+    counters = {user_id: (0, 0, Decimal('0.00')) for user_id in user_ids}
+    for row in rows:
+        counters[row['user_id']] = (row['played'], row['special'], row['commission'] or Decimal('0.00'))
+    return counters
+
+
+def rebuild_game_counters(chunk_size=1000, fix=True):
+    """
+    Compare the stored counters with the Game table, one chunk of users at a
+    time, and store the recomputed values of the users that differ unless
+    ``fix`` is False. Returns (users checked, users that differed).
+
+    When fixing, the users of a chunk are locked while it is checked, so plays
+    recorded meanwhile wait and are counted once.
+    """
+    checked = mismatched = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            queryset = User.objects.filter(pk__gt=last_id).order_by('pk').only('pk', *COUNTER_FIELDS)
+            if fix:
+                queryset = queryset.select_for_update()
+            users = list(queryset[:chunk_size])
+            if not users:
+                break
+            last_id = users[-1].pk
+            expected = compute_game_counters([user.pk for user in users])
+
+            stale = []
+            for user in users:
+                stored = tuple(getattr(user, field) for field in COUNTER_FIELDS)
+                values = expected[user.pk]
+                if stored != values:
+                    logger.info(f"Game counters of user {user.pk}: stored {stored}, expected {values}")
+                    for field, value in zip(COUNTER_FIELDS, values):
+                        setattr(user, field, value)
+                    stale.append(user)
+            if fix and stale:
+                User.objects.bulk_update(stale, COUNTER_FIELDS)
+            checked += len(users)
+            mismatched += len(stale)
+    return checked, mismatched
@@ -0,0 +1,74 @@
+"""
+Per-user lock serializing the game state transitions of one user.
+
+Only requests of the same user wait on each other. The wait is bounded: when
+the lock cannot be taken in time an ActionInProgressException (409) is raised
+so a double-submitted request gets a fast answer instead of queueing.
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from shared.custom_exceptions import ActionInProgressException
+
+logger = logging.getLogger('cache_operations')
+
+# Poll interval of the fallback lock, in seconds
+POLL_INTERVAL = 0.05
+
+
+def lock_key(user_id):
+    return f"game_user_lock:{user_id}"
+
+
+@contextmanager
+def user_game_lock(user_id):
+    """
+    Hold the game lock of ``user_id`` for the duration of the block.
+
+    Uses a Redis lock when the cache backend provides one, otherwise an
+    ``add``-based lock in the cache. The lock expires after
+    GAME_USER_LOCK_TIMEOUT seconds, so a crashed worker cannot keep it.
+    """
+    timeout = getattr(settings, 'GAME_USER_LOCK_TIMEOUT', 10)
+    wait = getattr(settings, 'GAME_USER_LOCK_WAIT', 1.0)
+
+    if hasattr(cache, 'lock'):
+        # django-redis: token based lock released atomically by its owner only
+        try:
+            lock = cache.lock(lock_key(user_id), timeout=timeout, sleep=POLL_INTERVAL, blocking_timeout=wait)
+            acquired = lock.acquire()
+        except Exception as e:
+            # Redis unavailable: the wallet row lock taken by the caller still serializes the writes
+            logger.warning(f"Game lock unavailable for user {user_id}: {e}")
+            lock = None
+            acquired = True
+        if not acquired:
+            raise ActionInProgressException()
+        try:
+            yield
+        finally:
+            if lock is not None:
+                try:
+                    lock.release()
+                except Exception as e:
+                    # Expired while held, another request may own it by now
+                    logger.warning(f"Game lock of user {user_id} was lost before release: {e}")
+        return
+
+    key = lock_key(user_id)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(key, token, timeout):
+        if time.monotonic() >= deadline:
+            raise ActionInProgressException()
+        time.sleep(POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        if cache.get(key) == token:
+            cache.delete(key)
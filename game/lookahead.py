@@ -0,0 +1,159 @@
+"""
+Per-user lookahead queue of precomputed next-game candidates.
+
+When enabled, a background worker queues the next candidate per user and day
+right after each play, using the same balance-band rules as
+``PlayGameService.select_smart_products``. ``assign_next_game`` then only pops
+a candidate and inserts the game.
+
+The entry is tagged with the balance, pack and catalog version it was
+computed for; an entry whose tag no longer matches is dropped and the request
+falls back to synchronous selection. Only one candidate is queued: every play
+changes the balance, so candidates computed further ahead would be stale.
+"""
+import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.utils.timezone import localdate
+
+from .product_index import get_product_price_index
+
+logger = logging.getLogger('cache_operations')
+
+# Refills are small (one index lookup and one query each), two workers are plenty
+_refill_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='game-lookahead')
+
+
+def is_enabled_for(user):
+    """
+    Lookahead switch: GAME_LOOKAHEAD_ENABLED turns the feature on and
+    GAME_LOOKAHEAD_ROLLOUT_PERCENT limits it to a stable share of users.
+    """
+    if not getattr(settings, 'GAME_LOOKAHEAD_ENABLED', False):
+        return False
+    rollout = getattr(settings, 'GAME_LOOKAHEAD_ROLLOUT_PERCENT', 100)
+    # Stable bucket per user, so a user does not flip between modes
+    return zlib.crc32(str(user.pk).encode()) % 100 < rollout
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def queue_key(user_id, day=None):
+    day = day or localdate()
+    return cache.make_key(f"game_lookahead:{user_id}:{day.isoformat()}")
+
+
+def build_tag(wallet, catalog_version):
+    """
+    Everything a candidate depends on: balance, pack and catalog version.
+    """
+    balance = Decimal(wallet.balance).quantize(Decimal('0.01'))
+    return f"{balance}:{wallet.package_id}:{catalog_version}"
+
+
+def pop_candidate(user, wallet):
+    """
+    Pop the next candidate for the user.
+    Returns (product_id, price) or None when the queue is empty or stale.
+    """
+    redis = _redis()
+    if redis is None:
+        return None
+    key = queue_key(user.pk)
+    try:
+        entry = redis.lpop(key)
+    except Exception as e:
+        logger.warning(f"Lookahead pop failed for user {user.pk}: {e}")
+        return None
+    if entry is None:
+        return None
+
+    if isinstance(entry, bytes):
+        entry = entry.decode()
+    tag, product_id, price = entry.rsplit('|', 2)
+    index = get_product_price_index()
+    if tag != build_tag(wallet, index.version):
+        # Balance, pack or catalog changed since the queue was built
+        invalidate(user.pk)
+        return None
+    return int(product_id), Decimal(price)
+
+
+def invalidate(user_id):
+    """
+    Drop the user's queued candidates.
+    """
+    redis = _redis()
+    if redis is None:
+        return
+    try:
+        redis.delete(queue_key(user_id))
+    except Exception as e:
+        logger.warning(f"Lookahead invalidation failed for user {user_id}: {e}")
+
+
+def refill(user_id):
+    """
+    Rebuild the user's queue for the current balance, pack and catalog.
+    The candidate follows the smart selection bands and skips products played
+    today.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import Game, Product
+
+    redis = _redis()
+    if redis is None:
+        return 0
+
+    user = get_user_model().objects.select_related('wallet').get(pk=user_id)
+    wallet = user.wallet
+    index = get_product_price_index()
+    tag = build_tag(wallet, index.version)
+
+    excluded = Game.played_product_ids_today(user)
+    product_id = index.select_for_balance(wallet.balance, excluded)
+    entries = []
+    if product_id is not None:
+        price = Product.objects.filter(pk=product_id).values_list('price', flat=True).first()
+        if price is not None:
+            entries.append(f"{tag}|{product_id}|{price}")
+
+    key = queue_key(user_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(key)
+    if entries:
+        pipe.rpush(key, *entries)
+        # Queues are per day; keep them a little longer than a day at most
+        pipe.expire(key, 26 * 3600)
+    pipe.execute()
+    return len(entries)
+
+
+def _refill_in_background(user_id):
+    close_old_connections()
+    try:
+        refill(user_id)
+    except Exception as e:
+        logger.warning(f"Lookahead refill failed for user {user_id}: {e}")
+    finally:
+        connection.close()
+
+
+def schedule_refill(user_id):
+    """
+    Queue a background refill for the user. Meant to run after the play commits.
+    """
+    if _redis() is None:
+        return
+    _refill_executor.submit(_refill_in_background, user_id)
@@ -0,0 +1,64 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from game.views import ProductViewSet
+from packs.views import PackViewSet
+from shared.cache_metrics import get_local_metrics
+from shared.local_cache import local_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency of ProductViewSet.list and PackViewSet.active_packs "
+        "served from the per-process L1 cache, from Redis (L2) and from the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+
+    def measure(self, view, user, iterations, before=None):
+        factory = APIRequestFactory()
+        elapsed = 0.0
+        for _ in range(iterations):
+            if before:
+                before()
+            request = factory.get('/')
+            force_authenticate(request, user=user)
+            start = time.perf_counter()
+            view(request)
+            elapsed += time.perf_counter() - start
+        return elapsed / iterations * 1000000
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        # Never saved: only used to pass the IsAuthenticated checks
+        user = get_user_model()(username='benchmark')
+
+        endpoints = (
+            ('products list', ProductViewSet, 'list'),
+            ('active packs', PackViewSet, 'active_packs'),
+        )
+        for label, viewset, action in endpoints:
+            cached_view = viewset.as_view({'get': action})
+            # Same viewset with the cache_result wrapper removed
+            uncached = type(f"Uncached{viewset.__name__}", (viewset,), {action: getattr(viewset, action).__wrapped__})
+            uncached_view = uncached.as_view({'get': action})
+
+            db = self.measure(uncached_view, user, iterations)
+            # Warm Redis, then empty the L1 before every call
+            self.measure(cached_view, user, 1)
+            l2 = self.measure(cached_view, user, iterations, before=local_cache.clear)
+            self.measure(cached_view, user, 1)
+            l1 = self.measure(cached_view, user, iterations)
+            self.stdout.write(f"{label:<14} database {db:10.1f} us   L2 {l2:10.1f} us   L1 {l1:10.1f} us")
+
+        for cache_type, metrics in get_local_metrics().items():
+            for tier in ('l1', 'l2'):
+                self.stdout.write(
+                    f"{cache_type:<10} {tier}: {metrics[tier]['hits']} hits, {metrics[tier]['misses']} misses "
+                    f"({metrics[tier]['hit_rate']:.1%})"
+                )
+        self.stdout.write(self.style.SUCCESS("Benchmark completed."))
@@ -0,0 +1,77 @@
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from game.models import Product
+from game.services import PlayGameService
+from wallet.models import Wallet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the SQL queries of the play flow (current-game then play-game) for a throwaway user. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plays', type=int, default=5)
+        parser.add_argument('--balance', type=Decimal, default=Decimal('500.00'))
+        parser.add_argument('--verbose-sql', action='store_true', help="Print every captured statement")
+
+    def capture(self, func):
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+        statements = Counter(query['sql'].split(' ', 1)[0].upper() for query in context.captured_queries)
+        return result, len(context.captured_queries), statements, context.captured_queries
+
+    def handle(self, *args, **options):
+        if not Product.objects.exists():
+            raise CommandError("The product catalog is empty.")
+
+        with transaction.atomic():
+            suffix = uuid.uuid4().hex[:10]
+            user = User.objects.create_user(
+                username=f"bench_{suffix}",
+                email=f"bench_{suffix}@example.com",
+                password=uuid.uuid4().hex,
+                phone_number=suffix,
+            )
+            Wallet.objects.filter(user=user).update(balance=options['balance'])
+            user = User.objects.get(pk=user.pk)
+            if not Wallet.objects.filter(user=user, package__isnull=False).exists():
+                raise CommandError("No active pack is available for the benchmark user.")
+
+            totals = Counter()
+            for play in range(1, options['plays'] + 1):
+                # Each request builds its own service, as the views do
+                (game, _), current_count, current_statements, current_queries = self.capture(
+                    lambda: PlayGameService.for_user(user).get_active_game()
+                )
+                (_, message), play_count, play_statements, play_queries = self.capture(
+                    lambda: PlayGameService.for_user(user).play_game(5, "benchmark")
+                )
+                totals['current-game'] += current_count
+                totals['play-game'] += play_count
+                self.stdout.write(
+                    f"play {play}: current-game {current_count:>3} queries {dict(current_statements)} | "
+                    f"play-game {play_count:>3} queries {dict(play_statements)} | {message}"
+                )
+                if options['verbose_sql']:
+                    for query in current_queries + play_queries:
+                        self.stdout.write(f"    {query['sql'][:160]}")
+
+            plays = max(options['plays'], 1)
+            self.stdout.write(
+                f"average: current-game {totals['current-game'] / plays:.1f} queries, "
+                f"play-game {totals['play-game'] / plays:.1f} queries"
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark completed (changes rolled back)."))
@@ -0,0 +1,97 @@
+import random
+import time
+from decimal import Decimal
+from itertools import combinations
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from game.product_combinations import CombinationSearch
+from game.product_index import to_cents
+
+
+def legacy_select(products, min_amount, max_amount, max_products, time_limit):
+    """
+    Previous AdminNegativeUserSerializer.Create.select_products_within_range,
+    kept here as the benchmark baseline. Stops after ``time_limit`` seconds
+    since an exhaustive C(N, 3) pass does not finish on large catalogs.
+
+    Returns (combination, finished).
+    """
+    deadline = time.perf_counter() + time_limit
+    products = [p for p in products if p.price <= max_amount]
+    random.shuffle(products)
+    for checked, combination in enumerate(combinations(products, max_products)):
+        if checked % 10000 == 0 and time.perf_counter() >= deadline:
+            return [], False
+        total_price = sum(Decimal(product.price) for product in combination)
+        if min_amount <= total_price <= max_amount:
+            return list(combination), True
+    return [], True
+
+
+class Command(BaseCommand):
+    help = "Compare the bounded subset-sum selector against the legacy itertools.combinations scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--legacy-time-limit', type=float, default=5.0,
+                            help="Seconds allowed to each legacy call before it is abandoned")
+        parser.add_argument('--time-budget', type=float, default=0.5,
+                            help="Time budget of the subset-sum selector in seconds")
+
+    def run_case(self, label, products, prices, ids, min_amount, max_amount, count, options):
+        iterations = options['iterations']
+
+        legacy_total = 0
+        abandoned = 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            _, finished = legacy_select(products, min_amount, max_amount, count, options['legacy_time_limit'])
+            legacy_total += time.perf_counter() - start
+            abandoned += not finished
+
+        search_total = 0
+        found = 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            search = CombinationSearch(
+                prices, ids, to_cents(min_amount), to_cents(max_amount), count, options['time_budget']
+            )
+            found += bool(search.run())
+            search_total += time.perf_counter() - start
+
+        legacy = legacy_total / iterations
+        selector = search_total / iterations
+        self.stdout.write(
+            f"{len(products):>8} products | {label:<18} | n={count} | "
+            f"legacy {legacy * 1000:10.1f} ms{' (abandoned x%d)' % abandoned if abandoned else ''} | "
+            f"selector {selector * 1000:8.2f} ms ({found}/{iterations} found)"
+        )
+
+    def handle(self, *args, **options):
+        for size in options['products']:
+            products = sorted(
+                (
+                    # Whole-dollar prices, so a window strictly between two dollars never fits
+                    SimpleNamespace(id=i, price=Decimal(random.randint(10, 5000)))
+                    for i in range(1, size + 1)
+                ),
+                key=lambda p: (p.price, p.id),
+            )
+            prices = [to_cents(p.price) for p in products]
+            ids = [p.id for p in products]
+
+            for count in (1, 2, 3):
+                # Typical on-hold window: user balance plus a small range
+                self.run_case(
+                    "fitting window", products, prices, ids,
+                    Decimal('1500.00'), Decimal('1550.00'), count, options,
+                )
+                # Worst case for the legacy scan: no combination fits
+                self.run_case(
+                    "no fit", products, prices, ids,
+                    Decimal('1500.25'), Decimal('1500.75'), count, options,
+                )
+        self.stdout.write(self.style.SUCCESS("Benchmark completed."))
@@ -0,0 +1,78 @@
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from game.product_index import ProductPriceIndex
+
+
+def legacy_select(products_list, user_balance):
+    """
+    Previous PlayGameService.select_smart_products band scan, kept here as the
+    benchmark baseline. ``products_list`` is the catalog sorted by price.
+    """
+    bands = [
+        [p for p in products_list if p.price == user_balance],
+        [p for p in products_list if user_balance * Decimal('0.8') <= p.price < user_balance],
+        [p for p in products_list if user_balance * Decimal('0.6') <= p.price < user_balance * Decimal('0.8')],
+        [p for p in products_list if user_balance * Decimal('0.4') <= p.price < user_balance * Decimal('0.6')],
+        [p for p in products_list if user_balance * Decimal('0.2') <= p.price < user_balance * Decimal('0.4')],
+        [p for p in products_list if user_balance * Decimal('0.1') <= p.price < user_balance * Decimal('0.2')],
+        [p for p in products_list if user_balance * Decimal('0.05') <= p.price < user_balance * Decimal('0.1')],
+        [p for p in products_list if user_balance * Decimal('0.01') <= p.price < user_balance * Decimal('0.05')],
+    ]
+    for band in bands:
+        if band:
+            return random.choice(band)
+    affordable = [p for p in products_list if p.price <= user_balance]
+    if affordable:
+        return max(affordable, key=lambda x: x.price)
+    return products_list[0] if products_list else None
+
+
+class Command(BaseCommand):
+    help = "Compare the product price index against the legacy in-Python band scan on a synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--played', type=int, default=30, help="Number of products excluded as played today")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        for size in options['products']:
+            products = sorted(
+                (
+                    SimpleNamespace(id=i, price=Decimal(random.randint(100, 5000000)) / 100)
+                    for i in range(1, size + 1)
+                ),
+                key=lambda p: (p.price, p.id),
+            )
+            played = set(random.sample(range(1, size + 1), min(options['played'], size)))
+            balances = [Decimal(random.randint(1000, 2000000)) / 100 for _ in range(iterations)]
+
+            # Legacy path: filter the played products and scan the list for every call
+            start = time.perf_counter()
+            for balance in balances:
+                available = [p for p in products if p.id not in played]
+                legacy_select(available, balance)
+            legacy = (time.perf_counter() - start) / iterations
+
+            index = ProductPriceIndex()
+            start = time.perf_counter()
+            index.load((p.id, p.price) for p in products)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for balance in balances:
+                index.select_for_balance(balance, played)
+            indexed = (time.perf_counter() - start) / iterations
+
+            self.stdout.write(
+                f"{size:>8} products | legacy {legacy * 1000:9.3f} ms/call | "
+                f"index {indexed * 1000:7.3f} ms/call | build {build * 1000:8.1f} ms | "
+                f"speedup x{legacy / indexed if indexed else float('inf'):.0f}"
+            )
+        self.stdout.write(self.style.SUCCESS("Benchmark completed."))
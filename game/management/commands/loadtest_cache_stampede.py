@@ -0,0 +1,80 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from game.views import ProductViewSet
+from shared.cache_metrics import get_local_metrics
+from shared.cache_utils import build_cache_key, invalidate_product_cache
+from shared.local_cache import local_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent ProductViewSet.list requests right after products:all is "
+        "invalidated and count the database queries they run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def mass_miss(self, concurrency):
+        """
+        Run ``concurrency`` requests released at the same time, each thread
+        standing for a worker. Returns the number of queries they ran.
+        """
+        view = ProductViewSet.as_view({'get': 'list'})
+        # Never saved: only used to pass the permission checks
+        user = get_user_model()(username='loadtest')
+        barrier = threading.Barrier(concurrency)
+        queries = []
+        errors = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        def worker():
+            request = APIRequestFactory().get('/')
+            force_authenticate(request, user=user)
+            try:
+                with connection.execute_wrapper(count_query):
+                    barrier.wait()
+                    view(request)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for error in errors:
+            self.stderr.write(f"Request failed: {error}")
+        return len(queries)
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        # Threads share this process' L1: start from an empty one like separate workers would
+        local_cache.clear()
+        self.mass_miss(1)
+
+        local_cache.clear()
+        invalidate_product_cache()
+        queries = self.mass_miss(concurrency)
+        self.stdout.write(f"After invalidation: {concurrency} requests, {queries} queries")
+
+        # No previous value to serve either: the other requests wait for the single recomputation
+        local_cache.clear()
+        invalidate_product_cache()
+        cache.delete(build_cache_key('PRODUCTS', 'stale', 'all'))
+        queries = self.mass_miss(concurrency)
+        self.stdout.write(f"Cold cache:         {concurrency} requests, {queries} queries")
+
+        self.stdout.write(f"Stale values served: {get_local_metrics()['PRODUCTS']['stale_served']}")
+        self.stdout.write(self.style.SUCCESS("Load test completed."))
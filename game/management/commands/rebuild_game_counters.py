@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from game.counters import rebuild_game_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the users' lifetime game counters (games played, special games played, "
+        "lifetime commission) from the Game table, a chunk of users at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Users checked per transaction")
+        parser.add_argument('--verify', action='store_true', help="Only report the users whose counters differ")
+
+    def handle(self, *args, **options):
+        checked, mismatched = rebuild_game_counters(chunk_size=options['chunk_size'], fix=not options['verify'])
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f"Checked {checked} users: all counters are up to date."))
+        elif options['verify']:
+            self.stdout.write(self.style.WARNING(f"Checked {checked} users: {mismatched} have stale counters."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Checked {checked} users: rebuilt the counters of {mismatched}."))
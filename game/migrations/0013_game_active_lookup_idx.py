@@ -0,0 +1,17 @@
+# Generated by Django 3.2.21 on 2026-10-16 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_game_commission_percentage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['user', 'is_active', 'played', 'pending', 'special_product', 'game_number'], name='game_active_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.21 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_game_active_lookup_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['user', 'is_active', '-updated_at', '-id'], name='game_record_keyset_idx'),
+        ),
+    ]
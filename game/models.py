@@ -1,9 +1,9 @@
-import random
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now, timedelta
 # from wallet.models import OnHoldPay
 from django.core.validators import MinValueValidator
+from shared.helpers import allocate_rating_numbers
 
 User = get_user_model()
 
@@ -12,10 +12,7 @@ def generate_unique_rating_no():
     """
     Generate a unique 11-digit number for rating_no.
     """
-    while True:
-        rating_no = ''.join([str(random.randint(0, 9)) for _ in range(11)])
-        if not Product.objects.filter(rating_no=rating_no).exists():
-            return rating_no
+    return allocate_rating_numbers(1)[0]
 
 
 class Product(models.Model):
@@ -63,16 +60,57 @@ class Game(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Active game resolution in PlayGameService.get_active_game
+            models.Index(
+                fields=['user', 'is_active', 'played', 'pending', 'special_product', 'game_number'],
+                name='game_active_lookup_idx',
+            ),
+            # Keyset pagination of GameViewSet.game_record
+            models.Index(fields=['user', 'is_active', '-updated_at', '-id'], name='game_record_keyset_idx'),
+        ]
         
+    MAX_PRODUCTS = 3
+
+    # Fields deciding the day a game counts as a dashboard submission on
+    SUBMISSION_FIELDS = {'is_active', 'played', 'pending', 'updated_at'}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Unknown when some of the fields were deferred: the save is not tracked
+        if cls.SUBMISSION_FIELDS.issubset(field_names):
+            from administration.stats import submission_day
+            instance._submission_day = submission_day(instance)
+        return instance
+
     def save(self, *args, **kwargs):
         """
-        Override save method to enforce a maximum of 3 products per game.
+        Generate the rating number before the first save.
+        The product limit is enforced by set_products, not on every save.
+        Keeps the DailyStats submissions of the dashboard up to date.
         """
-        super().save(*args, **kwargs)
         if not self.rating_no:
             self.rating_no = generate_unique_rating_no()
-        if self.products.count() > 3:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'rating_no' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['rating_no']
+        tracked = self._state.adding or hasattr(self, '_submission_day')
+        previous_day = getattr(self, '_submission_day', None)
+        super().save(*args, **kwargs)
+        if tracked:
+            from administration.stats import record_submission_move, submission_day
+            self._submission_day = submission_day(self)
+            record_submission_move(previous_day, self._submission_day)
+
+    def set_products(self, products):
+        """
+        Assign the game products, enforcing a maximum of 3 products per game.
+        """
+        products = list(products)
+        if len(products) > self.MAX_PRODUCTS:
             raise ValueError("A game cannot have more than 3 products.")
+        self.products.set(products)
 
     @classmethod
     def count_games_played_today(cls, user):
@@ -100,6 +138,22 @@ class Game(models.Model):
         '''
         return cls.objects.filter(user=user, played=False,pending=True,is_active=True).exists()
 
+    @classmethod
+    def played_product_ids_today(cls, user):
+        '''
+        Ids of the products in the user's active games created today
+        '''
+        start_of_day = now().replace(hour=0, minute=0, second=0, microsecond=0)
+        end_of_day = start_of_day + timedelta(days=1)
+        return set(
+            cls.objects.filter(
+                user=user,
+                is_active=True,
+                created_at__gte=start_of_day,
+                created_at__lt=end_of_day
+            ).values_list('products__id', flat=True)
+        )
+
     def __str__(self):
         names = list(self.products.values_list("name", flat=True)[:3])
         label = ", ".join(names) if names else "no products"
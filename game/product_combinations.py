@@ -0,0 +1,266 @@
+"""
+Bounded subset-sum search over the product price index.
+
+Used to pick the 1-3 products of a negative (special) game so that their
+total falls inside the on-hold window. Prices are handled as integer cents
+and every valid combination has the same chance of being returned, as long
+as the search finishes within its time budget.
+"""
+import logging
+import random
+import time
+from bisect import bisect_left, bisect_right
+from decimal import ROUND_CEILING, ROUND_FLOOR
+
+from django.conf import settings
+
+from .product_index import get_product_price_index, to_cents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIME_BUDGET = 0.5  # seconds
+# Rejection sampling draws before falling back to the exhaustive scan
+MAX_SAMPLE_ATTEMPTS = 20000
+
+
+class CombinationSearch:
+    """
+    Search for ``count`` distinct products whose total is within [min_cents, max_cents].
+
+    ``prices`` must be sorted ascending and ``ids`` aligned with it.
+    After ``run()``, ``timed_out`` tells whether the budget ran out before the
+    search could prove there was no fit.
+    """
+
+    def __init__(self, prices, ids, min_cents, max_cents, count, time_budget=DEFAULT_TIME_BUDGET):
+        self.prices = prices
+        self.ids = ids
+        self.min_cents = min_cents
+        self.max_cents = max_cents
+        self.count = count
+        self.deadline = time.perf_counter() + time_budget
+        self.timed_out = False
+
+    def run(self):
+        """
+        Returns a list of product ids, or an empty list when nothing fits.
+        """
+        if self.count <= 0 or self.min_cents > self.max_cents:
+            return []
+        # Products priced above the window can never be part of a combination
+        size = bisect_right(self.prices, self.max_cents)
+        if size < self.count:
+            return []
+        if self.count == 1:
+            positions = self._single(size)
+        elif self.count == 2:
+            positions = self._pair(size)
+        elif self.count == 3:
+            positions = self._triple(size)
+        else:
+            raise ValueError("Only combinations of 1 to 3 products are supported.")
+        return [self.ids[position] for position in positions]
+
+    def _expired(self):
+        if time.perf_counter() >= self.deadline:
+            self.timed_out = True
+        return self.timed_out
+
+    # ------------------------------------------------------------------ #
+    # One product: a single price range
+    # ------------------------------------------------------------------ #
+    def _single(self, size):
+        lo = bisect_left(self.prices, self.min_cents, 0, size)
+        if lo >= size:
+            return []
+        return [random.randrange(lo, size)]
+
+    # ------------------------------------------------------------------ #
+    # Two products: two-pointer count, then a weighted pick
+    # ------------------------------------------------------------------ #
+    def _pair_ranges(self, start, end, min_cents, max_cents):
+        """
+        For every position i in [start, end) count the partners j > i (j < end)
+        with min_cents <= prices[i] + prices[j] <= max_cents.
+        The partners of i always form the contiguous range [lo, hi).
+
+        Returns (total, [(i, lo, hi, count), ...]) for the positions with partners.
+        """
+        prices = self.prices
+        ranges = []
+        total = 0
+        lo = hi = end
+        for i in range(start, end):
+            price = prices[i]
+            if price + price > max_cents:
+                break
+            # Bounds move left as prices[i] grows, so both pointers only decrease
+            while hi > i + 1 and prices[hi - 1] + price > max_cents:
+                hi -= 1
+            while lo > i + 1 and prices[lo - 1] + price >= min_cents:
+                lo -= 1
+            first = max(lo, i + 1)
+            found = hi - first
+            if found <= 0:
+                continue
+            ranges.append((i, first, hi, found))
+            total += found
+        return total, ranges
+
+    @staticmethod
+    def _pick_weighted(total, ranges):
+        """
+        Pick one entry of ``ranges`` with probability proportional to its count.
+        """
+        target = random.randrange(total)
+        for entry in ranges:
+            if target < entry[-1]:
+                return entry, target
+            target -= entry[-1]
+        return ranges[-1], 0
+
+    def _pair(self, size):
+        total, ranges = self._pair_ranges(0, size, self.min_cents, self.max_cents)
+        if not total:
+            return []
+        (i, first, _hi, _count), offset = self._pick_weighted(total, ranges)
+        return [i, first + offset]
+
+    # ------------------------------------------------------------------ #
+    # Three products: rejection sampling, then an exhaustive meet-in-the-middle
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _choose_excluding(lo, hi, excluded):
+        """
+        Uniformly choose a position in [lo, hi) that is not in ``excluded``.
+        """
+        skipped = sorted(position for position in set(excluded) if lo <= position < hi)
+        position = lo + random.randrange(hi - lo - len(skipped))
+        for excluded_position in skipped:
+            if excluded_position <= position:
+                position += 1
+        return position
+
+    def _window_capacity(self, size):
+        """
+        Largest number of products whose prices fit in one window of width
+        max_cents - min_cents. Upper bound for the number of third products
+        completing any pair.
+        """
+        prices = self.prices
+        width = self.max_cents - self.min_cents
+        capacity = 0
+        for i in range(size):
+            capacity = max(capacity, bisect_right(prices, prices[i] + width, i, size) - i)
+        return capacity
+
+    def _triple(self, size):
+        prices = self.prices
+        # Any product of a valid triple costs at most max - (two cheapest)
+        size = bisect_right(prices, self.max_cents - prices[0] - prices[1], 0, size)
+        if size < 3:
+            return []
+        if prices[size - 1] + prices[size - 2] + prices[size - 3] < self.min_cents:
+            return []
+
+        positions = self._sample_triple(size)
+        if positions:
+            return positions
+        return self._scan_triple(size)
+
+    def _sample_triple(self, size):
+        """
+        Draw an ordered pair uniformly, count the third products that complete
+        it and accept with probability count / capacity. Every valid triple is
+        reachable through its six ordered pairs with the same probability, so
+        accepted triples are uniformly distributed.
+
+        Gives up after MAX_SAMPLE_ATTEMPTS draws or half of the budget and
+        returns an empty list in that case.
+        """
+        prices = self.prices
+        capacity = self._window_capacity(size)
+        deadline = time.perf_counter() + (self.deadline - time.perf_counter()) / 2
+        for attempt in range(1, MAX_SAMPLE_ATTEMPTS + 1):
+            if attempt % 256 == 0 and time.perf_counter() >= deadline:
+                break
+            i = random.randrange(size)
+            j = random.randrange(size - 1)
+            if j >= i:
+                j += 1
+            pair_price = prices[i] + prices[j]
+            lo = bisect_left(prices, self.min_cents - pair_price, 0, size)
+            hi = bisect_right(prices, self.max_cents - pair_price, 0, size)
+            found = hi - lo - (lo <= i < hi) - (lo <= j < hi)
+            if found > 0 and random.random() * capacity < found:
+                return [i, j, self._choose_excluding(lo, hi, (i, j))]
+        return []
+
+    def _scan_triple(self, size):
+        """
+        For each first product (visited in random order) count the pairs that
+        complete it with the two-pointer pass, then pick uniformly among every
+        triple counted. When the budget runs out mid-scan the pick is made among
+        the triples found so far.
+        """
+        prices = self.prices
+        largest_pair = prices[size - 1] + prices[size - 2]
+        order = list(range(size))
+        random.shuffle(order)
+        candidates = []
+        total = 0
+        for i in order:
+            if self._expired():
+                break
+            price = prices[i]
+            # Pairs come from pricier products, so skip first products that cannot fit
+            if price * 3 > self.max_cents or price + largest_pair < self.min_cents:
+                continue
+            # Count each triple once: the pair is taken from products after i
+            pair_total, ranges = self._pair_ranges(
+                i + 1, size, self.min_cents - price, self.max_cents - price
+            )
+            if pair_total:
+                candidates.append((i, pair_total, ranges))
+                total += pair_total
+
+        if not total:
+            if self.timed_out:
+                logger.warning(
+                    "Product combination search ran out of time "
+                    f"({size} products, window {self.min_cents}-{self.max_cents} cents)"
+                )
+            return []
+
+        target = random.randrange(total)
+        for i, pair_total, ranges in candidates:
+            if target < pair_total:
+                break
+            target -= pair_total
+        for j, first, _hi, found in ranges:
+            if target < found:
+                return [i, j, first + target]
+            target -= found
+        return []
+
+
+def select_product_combination(min_amount, max_amount, count, time_budget=None):
+    """
+    Pick ``count`` (1 to 3) distinct product ids whose total price lies within
+    [min_amount, max_amount], uniformly among all such combinations.
+
+    Returns a list of product ids, empty when no combination fits (or none was
+    found within the time budget).
+    """
+    if time_budget is None:
+        time_budget = getattr(settings, 'NEGATIVE_PRODUCT_SEARCH_TIME_BUDGET', DEFAULT_TIME_BUDGET)
+    prices, ids = get_product_price_index().snapshot()
+    search = CombinationSearch(
+        prices,
+        ids,
+        to_cents(min_amount, ROUND_CEILING),
+        to_cents(max_amount, ROUND_FLOOR),
+        count,
+        time_budget,
+    )
+    return search.run()
@@ -0,0 +1,246 @@
+"""
+Process-local, price-sorted index of the product catalog.
+
+The index keeps every product as an integer-cent price in a sorted array
+(ties broken by id) so balance-band lookups in ``PlayGameService`` become
+binary searches instead of full catalog scans.
+"""
+import logging
+import random
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('cache_operations')
+
+# Shared key holding the current catalog version, so every worker rebuilds
+# its own copy of the index after invalidate_product_cache() runs anywhere.
+# It expires after PRODUCT_INDEX_VERSION_TTL seconds, so catalog writes that
+# send no signal (queryset.update, bulk_create) are picked up too.
+PRODUCT_INDEX_VERSION_KEY = 'product_index:version'
+
+
+def version_ttl():
+    return getattr(settings, 'PRODUCT_INDEX_VERSION_TTL', 300)
+
+# Balance bands used by smart selection, highest priority first.
+# (lower fraction of balance inclusive, upper fraction of balance exclusive)
+BALANCE_BANDS = (
+    (Decimal('0.8'), Decimal('1.0')),
+    (Decimal('0.6'), Decimal('0.8')),
+    (Decimal('0.4'), Decimal('0.6')),
+    (Decimal('0.2'), Decimal('0.4')),
+    (Decimal('0.1'), Decimal('0.2')),
+    (Decimal('0.05'), Decimal('0.1')),
+    (Decimal('0.01'), Decimal('0.05')),
+)
+
+
+def to_cents(amount, rounding=ROUND_CEILING):
+    """
+    Convert a Decimal amount to integer cents.
+    Rounds up by default so that ``price >= amount`` is equivalent to
+    ``price_cents >= to_cents(amount)`` for prices stored with two decimals.
+    """
+    return int((Decimal(amount) * 100).to_integral_value(rounding=rounding))
+
+
+class ProductPriceIndex:
+    """
+    Sorted (price_cents, id) arrays for the whole catalog.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prices = array('q')
+        self._ids = array('q')
+        self._positions = {}
+        self._version = None
+        self._loaded = False
+
+    # ------------------------------------------------------------------ #
+    # Building / invalidation
+    # ------------------------------------------------------------------ #
+    def _current_version(self):
+        """
+        Return the shared catalog version, creating it when missing.
+        Falls back to the local version if the cache is unavailable.
+        """
+        try:
+            version = cache.get(PRODUCT_INDEX_VERSION_KEY)
+            if version is None:
+                version = uuid.uuid4().hex
+                cache.add(PRODUCT_INDEX_VERSION_KEY, version, version_ttl())
+                version = cache.get(PRODUCT_INDEX_VERSION_KEY) or version
+            return version
+        except Exception as e:
+            logger.warning(f"Product index version lookup failed: {e}")
+            return self._version
+
+    def rebuild(self, version=None):
+        """
+        Reload the catalog into the sorted arrays (one query, two columns).
+        """
+        from .models import Product
+
+        rows = Product.objects.order_by('price', 'id').values_list('id', 'price')
+        self.load(rows.iterator(), version)
+
+    def load(self, rows, version=None):
+        """
+        Replace the index content with ``(id, price)`` rows sorted by price then id.
+        """
+        prices = array('q')
+        ids = array('q')
+        for product_id, price in rows:
+            ids.append(product_id)
+            prices.append(to_cents(price))
+
+        with self._lock:
+            self._prices = prices
+            self._ids = ids
+            self._positions = {product_id: position for position, product_id in enumerate(ids)}
+            self._version = version
+            self._loaded = True
+
+    def ensure_fresh(self):
+        """
+        Rebuild the index if it was never loaded or another process
+        invalidated the catalog since the last build.
+        """
+        version = self._current_version()
+        if not self._loaded or (version is not None and version != self._version):
+            self.rebuild(version)
+        return self
+
+    def invalidate(self):
+        """
+        Drop the local copy and publish a new catalog version for other workers.
+        """
+        with self._lock:
+            self._loaded = False
+        try:
+            cache.set(PRODUCT_INDEX_VERSION_KEY, uuid.uuid4().hex, version_ttl())
+        except Exception as e:
+            logger.warning(f"Product index invalidation failed: {e}")
+
+    # ------------------------------------------------------------------ #
+    # Lookups
+    # ------------------------------------------------------------------ #
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def version(self):
+        """
+        Catalog version the current arrays were built from.
+        """
+        return self._version
+
+    def snapshot(self):
+        """
+        Return the current (prices, ids) arrays. Both are replaced, never
+        mutated, on rebuild, so callers can use them without holding the lock.
+        """
+        with self._lock:
+            return self._prices, self._ids
+
+    def _excluded_positions(self, excluded_ids, ids):
+        positions = self._positions
+        found = []
+        for product_id in excluded_ids or ():
+            position = positions.get(product_id)
+            if position is not None and position < len(ids) and ids[position] == product_id:
+                found.append(position)
+        return sorted(set(found))
+
+    @staticmethod
+    def _choose_in_range(lo, hi, excluded_positions):
+        """
+        Uniformly choose a position in [lo, hi) that is not excluded.
+        Returns None when every position in the range is excluded.
+        """
+        if hi <= lo:
+            return None
+        skipped = excluded_positions[bisect_left(excluded_positions, lo):bisect_left(excluded_positions, hi)]
+        available = (hi - lo) - len(skipped)
+        if available <= 0:
+            return None
+        position = lo + random.randrange(available)
+        # Shift past every excluded slot at or before the candidate position
+        for excluded in skipped:
+            if excluded <= position:
+                position += 1
+            else:
+                break
+        return position
+
+    def select_for_balance(self, user_balance, excluded_ids=()):
+        """
+        Pick one product id using the smart balance bands.
+
+        Mirrors the original selection rules:
+        - an exact balance match first, then 80-100%, 60-80% ... 1-5% bands,
+          each chosen uniformly at random among products not excluded;
+        - if no band has a product, the highest priced product within the
+          balance (played ones included), otherwise the cheapest product;
+        - nothing at all if every product is excluded.
+
+        Returns a product id or None.
+        """
+        prices, ids = self.snapshot()
+        excluded_positions = self._excluded_positions(excluded_ids, ids)
+        if len(ids) - len(excluded_positions) <= 0:
+            return None
+
+        user_balance = Decimal(user_balance)
+        balance_cents = to_cents(user_balance)
+
+        # Priority 1: exact balance match
+        if Decimal(balance_cents) == user_balance * 100:
+            position = self._choose_in_range(
+                bisect_left(prices, balance_cents),
+                bisect_right(prices, balance_cents),
+                excluded_positions,
+            )
+            if position is not None:
+                return ids[position]
+
+        # Priority 2..8: balance bands, lower bound inclusive, upper bound exclusive
+        for lower, upper in BALANCE_BANDS:
+            position = self._choose_in_range(
+                bisect_left(prices, to_cents(user_balance * lower)),
+                bisect_left(prices, to_cents(user_balance * upper)),
+                excluded_positions,
+            )
+            if position is not None:
+                return ids[position]
+
+        # Fallback: highest priced affordable product, including played ones
+        affordable_end = bisect_right(prices, to_cents(user_balance, ROUND_FLOOR))
+        if affordable_end > 0:
+            return ids[bisect_left(prices, prices[affordable_end - 1])]
+        # Nothing fits: cheapest product
+        return ids[0]
+
+
+product_price_index = ProductPriceIndex()
+
+
+def get_product_price_index():
+    """
+    Return the process-wide index, rebuilt if the catalog changed.
+    """
+    return product_price_index.ensure_fresh()
+
+
+def invalidate_product_price_index():
+    """
+    Force every worker to rebuild its product index on next use.
+    """
+    product_price_index.invalidate()
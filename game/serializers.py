@@ -5,9 +5,9 @@ from wallet.models import OnHoldPay
 import random
 from decimal import Decimal
 from users.serializers import AdminUserUpdateSerializer
-from itertools import combinations
 from decimal import Decimal
-from random import shuffle
+from .product_combinations import select_product_combination
+from .product_index import invalidate_product_price_index
 
 
 User = get_user_model()
@@ -210,7 +210,7 @@ class AdminNegativeUserSerializer:
                 self.instance.commission_percentage = special_percentage
                 self.instance.special_product = True
                 self.instance.is_active = True
-                self.instance.products.set(products_selected)
+                self.instance.set_products(products_selected)
                 self.instance.save()
                 return self.instance
             else:
@@ -226,7 +226,7 @@ class AdminNegativeUserSerializer:
                     special_product=True,
                     is_active=True,
                 )
-                game.products.set(products_selected)
+                game.set_products(products_selected)
                 return game
         
         
@@ -243,23 +243,17 @@ class AdminNegativeUserSerializer:
             Returns:
                 list: A list of selected product instances, or an empty list if no combination is found.
             """
-            # Fetch all products and shuffle them for randomness
-            products = list(Product.objects.filter(price__lte=max_amount))
-            shuffle(products)  # Randomize the order of products
+            # Bounded subset-sum search on the price index (integer cents)
+            for _ in range(2):
+                product_ids = select_product_combination(min_amount, max_amount, max_products)
+                if not product_ids:
+                    return []
+                products = Product.objects.in_bulk(product_ids)
+                if len(products) == len(product_ids):
+                    return [products[product_id] for product_id in product_ids]
+                # Some products were removed since the index was built
+                invalidate_product_price_index()
 
-            # Use a generator to lazily produce combinations
-            product_combinations = (combination for combination in combinations(products, max_products))
-
-            # Iterate through combinations lazily
-            for combination in product_combinations:
-                # Calculate the total price for the combination
-                total_price = sum(Decimal(product.price) for product in combination)
-
-                # Check if total price falls within the specified range
-                if min_amount <= total_price <= max_amount:
-                    return list(combination)  # Return the first valid combination
-
-            # If no valid combination is found, return an empty list
             return []
 
 
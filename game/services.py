@@ -1,10 +1,43 @@
 from django.utils.timezone import now, timedelta
 from .models import Game, Product,generate_unique_rating_no
+from .product_index import get_product_price_index
+from .locks import user_game_lock
+from .counters import COUNTER_FIELDS, played_game_increments
+from . import lookahead
+from functools import wraps
 import random
 from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Case, DateTimeField, F, IntegerField, Q, Value, When
 from users.models import Invitation
+from wallet.models import Wallet
 from decimal import Decimal
 from shared.helpers import get_settings,create_admin_notification,create_user_notification
+from shared.identity_map import IdentityMap
+
+User = get_user_model()
+
+
+def single_flight(method):
+    """
+    Run a state transition of PlayGameService under the per-user game lock,
+    in a transaction holding the user's wallet row lock.
+    Nested calls on the same service (e.g. play_game -> get_active_game) reuse
+    the lock already held.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._lock_depth:
+            return method(self, *args, **kwargs)
+        with user_game_lock(self.user.pk):
+            self._lock_depth += 1
+            try:
+                with transaction.atomic():
+                    self.lock_state()
+                    return method(self, *args, **kwargs)
+            finally:
+                self._lock_depth -= 1
+    return wrapper
 
 
 class PlayGameService:
@@ -12,12 +45,56 @@ class PlayGameService:
     Service to handle the logic for playing a game and assigning the next game.
     """
 
-    def __init__(self, user, total_number_can_play, wallet):
-        self.user = user
+    # Active game priorities, lowest value wins
+    PRIORITY_PENDING_SPECIAL = 0
+    PRIORITY_SPECIAL_AT_TARGET = 1
+    PRIORITY_PENDING_REGULAR = 2
+    PRIORITY_ACTIVE_REGULAR = 3
+
+    def __init__(self, user, total_number_can_play, wallet, settings=None):
+        # Every instance used by the service is registered once and reused
+        self.identity_map = IdentityMap()
+        self.user = self.identity_map.add(user)
+        self.wallet = self.identity_map.add(wallet)
+        # Make user.wallet and wallet.user point at the same instances
+        self.user.wallet = self.wallet
         self.total_number_can_play = total_number_can_play
-        self.wallet = wallet
-        self.settings = get_settings()
-        self.pack = wallet.package
+        self.pack = self.identity_map.add(self.wallet.package)
+        self._settings = settings
+        self._lock_depth = 0
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Build the service for a user, loading the user, wallet, pack and
+        invitation (with its referrer) in a single query.
+        """
+        queryset = User.objects.select_related('wallet__package', 'invitation__referral')
+        loaded_user = queryset.get(pk=user.pk)
+        wallet = getattr(loaded_user, 'wallet', None)
+        if not wallet:
+            Wallet.objects.create(user=loaded_user)
+            loaded_user = queryset.get(pk=user.pk)
+            wallet = loaded_user.wallet
+        return cls(loaded_user, wallet.package.daily_missions, wallet)
+
+    def lock_state(self):
+        """
+        Lock the wallet and user rows until the end of the transaction and
+        reload their values, which may have changed while waiting for the lock.
+        """
+        wallet = Wallet.objects.select_for_update().select_related('user').get(pk=self.wallet.pk)
+        self.identity_map.merge(wallet.user)
+        self.identity_map.merge(wallet)
+
+    @property
+    def settings(self):
+        """
+        Global settings, loaded on first use only.
+        """
+        if self._settings is None:
+            self._settings = get_settings()
+        return self._settings
 
     def check_can_user_play(self):
         """
@@ -76,28 +153,61 @@ class PlayGameService:
             return False, "You have reached the maximum number of albums you can review today. Please upgrade your package for more options."
         return True, ""
 
+    def find_active_game_candidate(self):
+        """
+        Rank the user's unplayed active games by priority and return the best one.
+        Priorities, highest first:
+        - pending special game (latest first)
+        - special game at the next game number (first created first)
+        - pending regular game (latest first)
+        - active regular game (latest first)
+        Returns a tuple: (game: Game or None, priority: int or None)
+        """
+        target_game_number = Game.count_games_played_today(self.user) + 1
+        special_at_target = Q(special_product=True, pending=False, game_number=target_game_number)
+
+        game = (
+            Game.objects.filter(user=self.user, played=False, is_active=True)
+            .filter(Q(special_product=False) | Q(pending=True) | special_at_target)
+            .select_related('on_hold')
+            .annotate(
+                priority=Case(
+                    When(special_product=True, pending=True, then=Value(self.PRIORITY_PENDING_SPECIAL)),
+                    When(special_at_target, then=Value(self.PRIORITY_SPECIAL_AT_TARGET)),
+                    When(pending=True, then=Value(self.PRIORITY_PENDING_REGULAR)),
+                    default=Value(self.PRIORITY_ACTIVE_REGULAR),
+                    output_field=IntegerField(),
+                ),
+                # Special games waiting for their appearance are taken oldest first
+                oldest_first=Case(
+                    When(special_at_target, then=F('created_at')),
+                    default=None,
+                    output_field=DateTimeField(),
+                ),
+            )
+            .order_by('priority', 'oldest_first', '-created_at')
+            .first()
+        )
+        if game is None:
+            return None, None
+        return game, game.priority
+
+    @single_flight
     def get_active_game(self):
         """
         Retrieve the user's active game.
         Special games now take immediate priority over existing active games.
         Returns a tuple: (game: Game or None, error: str)
         """
-        # HIGHEST PRIORITY: Check for pending special games first
-        pending_special_game = Game.objects.filter(user=self.user, played=False, pending=True, is_active=True, special_product=True).first()
-        if pending_special_game:
-            return pending_special_game, ""
-        
-        # SECOND PRIORITY: Check for new special games that should be activated immediately
-        target_game_number = Game.count_games_played_today(self.user) + 1
-        
-        # Get the first available special game for this appearance
-        special_game = Game.objects.filter(
-            user=self.user, 
-            played=False, 
-            special_product=True, 
-            game_number=target_game_number, 
-            is_active=True
-        ).order_by('created_at').first()  # Order by creation time to pick the first one
+        # Resolve every priority level in a single indexed query
+        game, priority = self.find_active_game_candidate()
+
+        # HIGHEST PRIORITY: pending special games
+        if priority == self.PRIORITY_PENDING_SPECIAL:
+            return game, ""
+
+        # SECOND PRIORITY: new special games that should be activated immediately
+        special_game = game if priority == self.PRIORITY_SPECIAL_AT_TARGET else None
         
         if special_game:
             try:
@@ -107,7 +217,7 @@ class PlayGameService:
                 
                 min_value = float(hold_value.min_amount)  # Convert to float
                 max_value = float(hold_value.max_amount)  # Convert to float
-                balance = self.user.wallet.balance
+                balance = self.wallet.balance
 
                 random_amount = Decimal(random.uniform(min_value, max_value))  # Generate a random float and convert to Decimal
                 amount = balance + random_amount
@@ -127,28 +237,25 @@ class PlayGameService:
                 special_game.commission_percentage = special_percentage
                 special_game.pending = True
                 
-                # Use debit method for consistency - this will handle balance and on_hold correctly
-                self.wallet.debit(amount)
+                # Same balance/on_hold rules as Wallet.debit, applied atomically
+                self.wallet.atomic_debit(amount)
                 
-                special_game.save()
-                self.wallet.save()
+                special_game.save(update_fields=['amount', 'commission', 'commission_percentage', 'pending', 'updated_at'])
 
                 return special_game, ""
             except Exception as e:
                 # If there's an error, still return the special game but without processing
                 return special_game, ""
         
-        # THIRD PRIORITY: Check for pending regular games
-        pending_regular_game = Game.objects.filter(user=self.user, played=False, pending=True, is_active=True, special_product=False).first()
-        if pending_regular_game:
-            return pending_regular_game, ""
+        # THIRD PRIORITY: pending regular games
+        if priority == self.PRIORITY_PENDING_REGULAR:
+            return game, ""
         
-        # FOURTH PRIORITY: Check for active regular games
-        active_game = Game.objects.filter(user=self.user, played=False, is_active=True, special_product=False).first()
-        if active_game:
-            active_game.pending = True
-            active_game.save()
-            return active_game, ""
+        # FOURTH PRIORITY: active regular games
+        if priority == self.PRIORITY_ACTIVE_REGULAR:
+            game.pending = True
+            game.save(update_fields=['pending', 'updated_at'])
+            return game, ""
 
         # If no active game exists, try to assign a new one
         game, message = self.assign_next_game()
@@ -164,70 +271,91 @@ class PlayGameService:
         amount = game.amount
         commission = game.commission
 
-        if game.pending:
-            self.wallet.credit(commission)
-            self.wallet.credit_commission(commission)
-        else:
-            if self.wallet.balance < amount and game.special_product:
-                game.pending = True
-                game.save()
-                
-                # Use debit method for consistency - this will handle balance and on_hold correctly
-                self.wallet.debit(amount)
+        with transaction.atomic():
+            if game.pending:
+                self.wallet.atomic_credit(commission, commission)
+            else:
+                if self.wallet.balance < amount and game.special_product:
+                    game.pending = True
+                    game.save(update_fields=['pending', 'updated_at'])
+                    
+                    # Same balance/on_hold rules as Wallet.debit, applied atomically
+                    self.wallet.atomic_debit(amount)
+                    
+                    return False, "Insufficient balance to review this album."
+
+                self.wallet.atomic_credit(commission, commission)
+
+            game.rating_score = rating_score
+            game.comment = comment
+            game.played = True
+            game.pending = False
+            
+            # Check if this was a special game and if there are more special games for the same appearance
+            should_increment_submission = True
+            if game.special_product:
+                # Check if there are more unplayed special games for the same appearance
+                remaining_special_games = Game.objects.filter(
+                    user=self.user,
+                    special_product=True,
+                    played=False,
+                    is_active=True,
+                    game_number=game.game_number
+                ).exclude(pk=game.pk).exists()
                 
-                return False, "Insufficient balance to review this album."
-
-            self.wallet.credit(commission)
-            self.wallet.credit_commission(commission)
-
-        game.rating_score = rating_score
-        game.comment = comment
-        game.played = True
-        game.pending = False
-        
-        # Check if this was a special game and if there are more special games for the same appearance
-        should_increment_submission = True
-        if game.special_product:
-            # Check if there are more unplayed special games for the same appearance
-            remaining_special_games = Game.objects.filter(
-                user=self.user,
-                special_product=True,
-                played=False,
-                is_active=True,
-                game_number=game.game_number
-            ).exclude(pk=game.pk).exists()
+                if remaining_special_games:
+                    # Don't increment submission count - user stays at same appearance
+                    should_increment_submission = False
             
-            if remaining_special_games:
-                # Don't increment submission count - user stays at same appearance
-                should_increment_submission = False
-        
-        if should_increment_submission:
-            self.user.number_of_submission_today += 1
-            self.user.today_profit += commission
-            self.user.save()
+            set_completed = self.record_submission(commission, should_increment_submission, game.special_product)
+            # Referral bonus is given for special games as well
             self.handle_referral_bonus(commission)
 
-            if self.user.number_of_submission_today >= self.total_number_can_play:
-                self.user.number_of_submission_set_today += 1
-                self.user.save()
-                set_number = self.get_ordinal(self.user.number_of_submission_set_today)
-                create_admin_notification("Worker Set Completed",f"{self.user.username} has completed all album reviews in the {set_number} set, You can proceed to reset account")
-                if self.user.number_of_submission_set_today <  self.pack.number_of_set:
-                    create_user_notification(self.user,"Album Review Set Completed",f"Good job!!!. The {set_number} set of album reviews has been completed. Kindly request for the next sets.")
-                
-            if self.user.number_of_submission_set_today >=  self.pack.number_of_set:
-                create_user_notification(self.user,"Good job!!! Album Review Set Completed",f"You have completed all {self.user.number_of_submission_set_today} album review sets for today!!!!!!")
-                create_admin_notification("Worker Set Completed",f"{self.user.username} has completed all {self.user.number_of_submission_set_today} album review sets for today")
-        else:
-            self.user.today_profit += commission
-            self.user.save()
-            # Still handle referral bonus for special games
-            self.handle_referral_bonus(commission)
-        
-        self.user.save()
-        game.save()
+            if should_increment_submission:
+                if set_completed:
+                    set_number = self.get_ordinal(self.user.number_of_submission_set_today)
+                    create_admin_notification("Worker Set Completed",f"{self.user.username} has completed all album reviews in the {set_number} set, You can proceed to reset account")
+                    if self.user.number_of_submission_set_today <  self.pack.number_of_set:
+                        create_user_notification(self.user,"Album Review Set Completed",f"Good job!!!. The {set_number} set of album reviews has been completed. Kindly request for the next sets.")
+                    
+                if self.user.number_of_submission_set_today >=  self.pack.number_of_set:
+                    create_user_notification(self.user,"Good job!!! Album Review Set Completed",f"You have completed all {self.user.number_of_submission_set_today} album review sets for today!!!!!!")
+                    create_admin_notification("Worker Set Completed",f"{self.user.username} has completed all {self.user.number_of_submission_set_today} album review sets for today")
+            
+            game.save(update_fields=['rating_score', 'comment', 'played', 'pending', 'updated_at'])
+
+            # Precompute the next candidate for the new balance once the play is committed
+            if lookahead.is_enabled_for(self.user):
+                user_id = self.user.pk
+                transaction.on_commit(lambda: lookahead.schedule_refill(user_id))
 
         return True, ""
+
+    def record_submission(self, commission, increment_submission=True, special_product=False):
+        """
+        Update the user's daily counters and lifetime game counters in a single
+        UPDATE with F-expressions and refresh self.user with the stored values.
+        Returns True when this submission completed a set.
+        """
+        values = {'today_profit': F('today_profit') + commission, **played_game_increments(commission, special_product)}
+        if increment_submission:
+            values['number_of_submission_today'] = F('number_of_submission_today') + 1
+            # Conditions see the counter before the increment
+            values['number_of_submission_set_today'] = Case(
+                When(
+                    number_of_submission_today__gte=self.total_number_can_play - 1,
+                    then=F('number_of_submission_set_today') + 1,
+                ),
+                default=F('number_of_submission_set_today'),
+            )
+
+        User.objects.filter(pk=self.user.pk).update(**values)
+        counters = User.objects.filter(pk=self.user.pk).values(
+            'number_of_submission_today', 'number_of_submission_set_today', 'today_profit', *COUNTER_FIELDS
+        ).get()
+        for field, value in counters.items():
+            setattr(self.user, field, value)
+        return increment_submission and self.user.number_of_submission_today >= self.total_number_can_play
     
     def handle_referral_bonus(self,commission_amount):
         """
@@ -235,29 +363,30 @@ class PlayGameService:
         """
         try:
             user = self.user
-            invitation = getattr(user, "invitation", None)
+            invitation = self.identity_map.add(getattr(user, "invitation", None))
             if not invitation:
                 # print(f"No invitation found for user {user.username}.")
                 return
             settings = self.settings
             bonus_percentage = Decimal(settings.percentage_of_sponsors)  # Ensure it's Decimal
             bonus_amount = commission_amount * (bonus_percentage / Decimal(100))  # Use Decimal for calculation
-            referral = invitation.referral
-            if not hasattr(referral, "wallet") or not referral.wallet:
-                print(f"Referrer {referral.username} does not have a wallet.")
-                return
-            
+            referral_id = invitation.referral_id
+
             with transaction.atomic():
-                referral.wallet.balance += bonus_amount
-                referral.current_referral_bonus += bonus_amount
-                referral.wallet.save()
-                referral.save()
-
-                if referral.current_referral_bonus >= Decimal(10):
-                    referral.current_referral_bonus -= Decimal(10)
-                    referral.save()
+                if not Wallet.add_to_balance(referral_id, bonus_amount):
+                    print(f"Referrer {self.get_referral(invitation).username} does not have a wallet.")
+                    return
+                User.objects.filter(pk=referral_id).update(
+                    current_referral_bonus=F('current_referral_bonus') + bonus_amount
+                )
+                # Only one concurrent request can take the 10 USD off the running total
+                reached_bonus = User.objects.filter(
+                    pk=referral_id, current_referral_bonus__gte=Decimal(10)
+                ).update(current_referral_bonus=F('current_referral_bonus') - Decimal(10))
+
+                if reached_bonus:
                     create_user_notification(
-                    referral,
+                    self.get_referral(invitation),
                     "Referral Bonus",
                     "You have received a total of 10 USD for referral bonus!!!!"
                     )
@@ -268,6 +397,12 @@ class PlayGameService:
             print(f"An error occurred while processing referral bonus: {str(e)}")
         
 
+    def get_referral(self, invitation):
+        """
+        Referrer of the invitation, through the identity map.
+        """
+        return self.identity_map.get_or_load(User, invitation.referral_id, lambda: invitation.referral)
+
     def assign_next_game(self):
         """
         Assign the next game for the user with smart product selection based on balance.
@@ -275,28 +410,32 @@ class PlayGameService:
         when there are better options available.
         Returns a tuple: (game: Game or None, message: str)
         """
-        start_of_day = now().replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
+        # Precomputed candidate from the lookahead queue, when enabled for this user
+        if lookahead.is_enabled_for(self.user):
+            candidate = lookahead.pop_candidate(self.user, self.wallet)
+            if candidate:
+                product_id, price = candidate
+                return self.create_assigned_game([product_id], price)
 
         # Get all products the user has played today
-        played_products_today = Game.objects.filter(
-            user=self.user,
-            is_active=True,
-            created_at__gte=start_of_day,
-            created_at__lt=end_of_day
-        ).values_list('products__id', flat=True)
-
-        # Get products the user hasn't played today
-        available_products = Product.objects.exclude(id__in=played_products_today)
+        played_products_today = Game.played_product_ids_today(self.user)
 
-        # Smart product selection based on user balance
-        selected_products = self.select_smart_products(available_products, self.wallet.balance)
+        # Smart product selection based on user balance, skipping products played today
+        selected_products = self.select_smart_products(played_products_today, self.wallet.balance)
         
         if not selected_products:
             return None, "No suitable albums available for your current balance. Please add funds to access more album options."
 
-        # Calculate the total amount and commission
+        # Calculate the total amount
         total_amount = sum(product.price for product in selected_products)
+        return self.create_assigned_game(selected_products, total_amount)
+
+    def create_assigned_game(self, products, total_amount):
+        """
+        Create the pending game for the selected products (instances or ids).
+        Returns a tuple: (game: Game, message: str)
+        """
+        # Calculate the commission
         if self.wallet.package:
             commission_percentage = self.wallet.package.profit_percentage
         else:
@@ -317,130 +456,40 @@ class PlayGameService:
         )
 
         # Associate the selected products with the new game
-        new_game.products.set(selected_products)
-
-        new_game.save()
+        new_game.set_products(products)
 
         return new_game, "New album assigned! Review and rate to earn your commission."
 
-    def select_smart_products(self, available_products, user_balance):
+    def select_smart_products(self, excluded_product_ids, user_balance):
         """
         Smart product selection that prioritizes products around the user's balance.
         Selects one product, prioritizing from 100% down to 1% of user balance.
         Falls back to all products (including played ones) if no suitable products found.
+
+        The bands are resolved with binary searches on the in-memory product
+        price index instead of loading the catalog.
         
         Args:
-            available_products: QuerySet of available products
+            excluded_product_ids: Ids of products the user already played today
             user_balance: User's current wallet balance
             
         Returns:
             list: Selected products for the game (always one product)
         """
-        if not available_products.exists():
-            return []
-            
-        # Convert to list and sort by price for better selection
-        products_list = list(available_products.order_by('price'))
-        
-        # Define balance ranges for smart selection (100% down to 1%)
-        balance_100_percent = user_balance * Decimal('1.0')    # 100% of balance
-        balance_80_percent = user_balance * Decimal('0.8')     # 80% of balance
-        balance_60_percent = user_balance * Decimal('0.6')     # 60% of balance
-        balance_40_percent = user_balance * Decimal('0.4')     # 40% of balance
-        balance_20_percent = user_balance * Decimal('0.2')     # 20% of balance
-        balance_10_percent = user_balance * Decimal('0.1')     # 10% of balance
-        balance_5_percent = user_balance * Decimal('0.05')     # 5% of balance
-        balance_1_percent = user_balance * Decimal('0.01')     # 1% of balance
-        
-        # Priority 1: Products at 100% of user balance (exact match)
-        exact_balance_products = [
-            p for p in products_list 
-            if p.price == user_balance
-        ]
-        
-        # Priority 2: Products around 80-100% of user balance (optimal range)
-        optimal_products = [
-            p for p in products_list 
-            if balance_80_percent <= p.price < user_balance
-        ]
-        
-        # Priority 3: Products around 60-80% of user balance (good range)
-        good_products = [
-            p for p in products_list 
-            if balance_60_percent <= p.price < balance_80_percent
-        ]
-        
-        # Priority 4: Products around 40-60% of user balance (acceptable range)
-        acceptable_products = [
-            p for p in products_list 
-            if balance_40_percent <= p.price < balance_60_percent
-        ]
-        
-        # Priority 5: Products around 20-40% of user balance (low range)
-        low_products = [
-            p for p in products_list 
-            if balance_20_percent <= p.price < balance_40_percent
-        ]
-        
-        # Priority 6: Products around 10-20% of user balance (very low range)
-        very_low_products = [
-            p for p in products_list 
-            if balance_10_percent <= p.price < balance_20_percent
-        ]
-        
-        # Priority 7: Products around 5-10% of user balance (minimal range)
-        minimal_products = [
-            p for p in products_list 
-            if balance_5_percent <= p.price < balance_10_percent
-        ]
-        
-        # Priority 8: Products around 1-5% of user balance (fallback range)
-        fallback_products = [
-            p for p in products_list 
-            if balance_1_percent <= p.price < balance_5_percent
-        ]
-        
-        # Smart selection logic - always select ONE product
-        selected_product = None
-        
-        # Try to select from highest priority ranges first
-        if exact_balance_products:
-            selected_product = random.choice(exact_balance_products)
-        elif optimal_products:
-            selected_product = random.choice(optimal_products)
-        elif good_products:
-            selected_product = random.choice(good_products)
-        elif acceptable_products:
-            selected_product = random.choice(acceptable_products)
-        elif low_products:
-            selected_product = random.choice(low_products)
-        elif very_low_products:
-            selected_product = random.choice(very_low_products)
-        elif minimal_products:
-            selected_product = random.choice(minimal_products)
-        elif fallback_products:
-            selected_product = random.choice(fallback_products)
-        
-        # If still no product selected, fallback to ALL products (including played ones)
-        if not selected_product:
-            all_products = list(Product.objects.all().order_by('price'))
-            
-            # Find products that fit within user balance
-            affordable_all_products = [
-                p for p in all_products 
-                if p.price <= user_balance
-            ]
-            
-            if affordable_all_products:
-                # Select the highest priced product that fits
-                selected_product = max(affordable_all_products, key=lambda x: x.price)
-            else:
-                # If no products fit at all, select the lowest priced product
-                selected_product = all_products[0] if all_products else None
-        
-        # Return as list (always one product)
-        return [selected_product] if selected_product else []
-
+        index = get_product_price_index()
+        for _ in range(2):
+            product_id = index.select_for_balance(user_balance, excluded_product_ids)
+            if product_id is None:
+                return []
+            selected_product = Product.objects.filter(pk=product_id).first()
+            if selected_product:
+                return [selected_product]
+            # The product was removed since the index was built
+            index.invalidate()
+            index = get_product_price_index()
+        return []
+
+    @single_flight
     def play_game(self, rating_score, comment):
         """
         Main method to mark the active game as played and assign the next game.
@@ -473,6 +522,21 @@ class PlayGameService:
 
         return active_game, "Album reviewed successfully!" if played else error_playing
 
+    @single_flight
+    def play_and_advance(self, rating_score, comment):
+        """
+        Play the active game, then resolve the next active game in the same
+        transaction, reusing the user, wallet and pack already loaded by this service.
+        Returns a tuple: (game: Game or None, message: str, next_game: Game or None, next_error: str)
+        """
+        with transaction.atomic():
+            game, message = self.play_game(rating_score, comment)
+            if not game:
+                return None, message, None, ""
+            next_game, next_error = self.get_active_game()
+        return game, message, next_game, next_error
+
+    @single_flight
     def play_pending_game(self, rating_score, comment):
         """
         Main method to mark the active game as played and assign the next game.
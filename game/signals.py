@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shared.cache_utils import invalidate_product_cache
+
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_on_product_change(sender, instance, **kwargs):
+    """
+    Product changes made outside the product endpoints (Django admin, scripts)
+    refresh the cached product lists and every worker's price index too.
+    """
+    transaction.on_commit(invalidate_product_cache)
@@ -1,3 +1,386 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from administration.models import Settings
+from shared.custom_exceptions import ActionInProgressException
+from packs.models import Pack
+from wallet.models import OnHoldPay, Wallet
+
+from .models import Game, Product
+from .product_combinations import CombinationSearch
+from .product_index import get_product_price_index
+from .serializers import AdminNegativeUserSerializer
+from .services import PlayGameService
+
+User = get_user_model()
+
+GAME_TEST_SETTINGS = {
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'game-tests',
+        }
+    },
+    # Image URLs without the Cloudinary credentials
+    'DEFAULT_FILE_STORAGE': 'django.core.files.storage.FileSystemStorage',
+}
+
+
+class GameTestMixin:
+    """
+    Settings, pack, products and players shared by the game tests.
+    """
+
+    def create_fixtures(self):
+        Settings.objects.create(
+            percentage_of_sponsors=10,
+            service_availability_start_time="00:00",
+            service_availability_end_time="23:59",
+        )
+        self.pack = Pack.objects.create(
+            name="VIP1", usd_value=0, daily_missions=5, daily_withdrawals=1, icon="pack.png",
+            profit_percentage=Decimal("0.5"), short_description="s", description="d", number_of_set=2,
+        )
+        for i in range(20):
+            Product.objects.create(name=f"Album {i}", price=Decimal(10 + i * 5), description="d", image="album.png")
+
+    def create_user(self, username, balance=Decimal("300.00")):
+        user = User.objects.create_user(
+            username=username, email=f"{username}@example.com", password="password",
+            phone_number=username, transactional_password="1234",
+        )
+        Wallet.objects.filter(user=user).update(balance=balance, package=self.pack)
+        return user
+
+    def create_game(self, user, **fields):
+        values = {
+            'amount': Decimal("50.00"),
+            'commission': Decimal("0.25"),
+            'commission_percentage': Decimal("0.5"),
+            **fields,
+        }
+        return Game.objects.create(user=user, **values)
+
+
+@override_settings(**GAME_TEST_SETTINGS)
+class ActiveGameResolutionTests(GameTestMixin, TestCase):
+    """
+    PlayGameService.get_active_game picks the game of the highest priority level.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.create_fixtures()
+        self.user = self.create_user("player")
+        self.service = PlayGameService.for_user(self.user)
+        # Games that never count: played, inactive, special at another game number
+        self.create_game(self.user, played=True)
+        self.create_game(self.user, is_active=False, pending=True)
+        self.create_game(self.user, special_product=True, game_number=3)
+
+    def test_pending_special_game_comes_first(self):
+        self.create_game(self.user, pending=True)
+        self.create_game(self.user, special_product=True, game_number=1)
+        expected = self.create_game(self.user, special_product=True, pending=True, game_number=2)
+
+        game, error = self.service.get_active_game()
+
+        self.assertEqual(game, expected)
+        self.assertEqual(error, "")
+
+    def test_special_game_at_target_number_is_activated(self):
+        self.create_game(self.user, pending=True)
+        on_hold = OnHoldPay.objects.create(min_amount=Decimal("10"), max_amount=Decimal("20"))
+        expected = self.create_game(self.user, special_product=True, game_number=1, on_hold=on_hold)
+        self.create_game(self.user, special_product=True, game_number=1, on_hold=on_hold)
+
+        game, error = self.service.get_active_game()
+
+        # Oldest special game of the appearance, priced above the balance
+        self.assertEqual(game, expected)
+        self.assertEqual(error, "")
+        game.refresh_from_db()
+        self.assertTrue(game.pending)
+        self.assertGreaterEqual(game.amount, Decimal("310.00"))
+        self.assertLessEqual(game.amount, Decimal("320.00"))
+        wallet = Wallet.objects.get(user=self.user)
+        self.assertEqual(wallet.balance, Decimal("300.00") - game.amount)
+        self.assertEqual(wallet.on_hold, game.amount)
+
+    def test_pending_regular_game_before_active_regular_game(self):
+        expected = self.create_game(self.user, pending=True)
+        self.create_game(self.user)
+
+        game, error = self.service.get_active_game()
+
+        self.assertEqual(game, expected)
+        self.assertEqual(error, "")
+
+    def test_active_regular_game_is_marked_pending(self):
+        self.create_game(self.user)
+        expected = self.create_game(self.user)
+
+        game, error = self.service.get_active_game()
+
+        # Latest first
+        self.assertEqual(game, expected)
+        self.assertEqual(error, "")
+        game.refresh_from_db()
+        self.assertTrue(game.pending)
+
+    def test_next_game_assigned_without_active_game(self):
+        games_before = set(Game.objects.values_list('pk', flat=True))
+
+        game, error = self.service.get_active_game()
+
+        self.assertIsNone(error)
+        self.assertNotIn(game.pk, games_before)
+        self.assertTrue(game.pending)
+        self.assertFalse(game.played)
+        self.assertEqual(game.products.count(), 1)
+
+    def test_candidate_resolved_in_one_query(self):
+        self.create_game(self.user)
+        self.create_game(self.user, pending=True)
+        self.create_game(self.user, special_product=True, game_number=1)
+        expected = self.create_game(self.user, special_product=True, pending=True, game_number=2)
+
+        with self.assertNumQueries(1):
+            game, priority = self.service.find_active_game_candidate()
+            # on_hold comes with the game
+            game.on_hold
+
+        self.assertEqual(game, expected)
+        self.assertEqual(priority, PlayGameService.PRIORITY_PENDING_SPECIAL)
+
+@override_settings(**GAME_TEST_SETTINGS)
+class PlayQueryBudgetTests(GameTestMixin, TestCase):
+    """
+    Query budgets of the play flow: the user, wallet, pack and invitation are
+    loaded once per request and reused (PlayGameService.for_user).
+    The budgets include the SAVEPOINT/RELEASE pairs of the service transactions.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # The middleware's background reset thread would share the test database
+        patcher = mock.patch('users.daily_reset.run_daily_reset_in_background')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.create_fixtures()
+        self.user = self.create_user("player")
+        self.game = self.create_game(self.user, pending=True)
+        self.game.products.set([Product.objects.first()])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_current_game_queries(self):
+        # user with wallet/pack/invitation, wallet lock, active game, products, savepoint pair
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/games/current-game/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['id'], self.game.pk)
+
+    def test_play_game_queries(self):
+        with self.assertNumQueries(15):
+            response = self.client.post('/api/games/play-game/', {'rating_score': 5, 'comment': "Nice"}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], "Album reviewed successfully!")
+
+    def test_play_pending_game_queries(self):
+        with self.assertNumQueries(14):
+            game, message = PlayGameService.for_user(self.user).play_pending_game(5, "Nice")
+
+        self.assertEqual(game, self.game)
+        self.assertEqual(message, "Album reviewed successfully!")
+
+
+@override_settings(GAME_USER_LOCK_WAIT=0.2, **GAME_TEST_SETTINGS)
+class ConcurrentPlayTests(GameTestMixin, TransactionTestCase):
+    """
+    Concurrent play-game calls of one user are serialized by the per-user game lock.
+    """
+
+    callers = 8
+
+    def setUp(self):
+        cache.clear()
+        self.create_fixtures()
+        self.user = self.create_user("player")
+        self.game = self.create_game(self.user, pending=True, commission=Decimal("0.40"))
+
+    def test_game_credited_once(self):
+        # One service per request, as the views build them
+        services = [PlayGameService.for_user(self.user) for _ in range(self.callers)]
+        played, busy = [], []
+        others_done = threading.Event()
+        mark_game_as_played = PlayGameService.mark_game_as_played
+
+        def held_mark_game_as_played(service, *args):
+            # Keep the lock until every other caller has been turned away
+            others_done.wait(timeout=10)
+            return mark_game_as_played(service, *args)
+
+        def play(service):
+            try:
+                played.append(service.play_game(5, "Nice"))
+            except ActionInProgressException as e:
+                busy.append(e)
+                if len(busy) == self.callers - 1:
+                    others_done.set()
+            finally:
+                connection.close()
+
+        with mock.patch.object(PlayGameService, 'mark_game_as_played', held_mark_game_as_played):
+            threads = [threading.Thread(target=play, args=(service,)) for service in services]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=30)
+
+        self.assertEqual(played, [(self.game, "Album reviewed successfully!")])
+        self.assertEqual(len(busy), self.callers - 1)
+        for error in busy:
+            self.assertEqual(error.status_code, 409)
+            self.assertEqual(error.message, "Your previous request is still being processed. Please try again.")
+
+        wallet = Wallet.objects.get(user=self.user)
+        self.assertEqual(wallet.commission, Decimal("0.40"))
+        self.assertEqual(wallet.balance, Decimal("300.40"))
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.number_of_submission_today, 1)
+        self.assertEqual(user.games_played_count, 1)
+        self.assertEqual(Game.objects.filter(user=self.user, played=True).count(), 1)
+
+
+@override_settings(**GAME_TEST_SETTINGS)
+class ProductIndexInvalidationTests(GameTestMixin, TestCase):
+    """
+    Catalog changes made outside the product endpoints reach the price index.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.create_fixtures()
+
+    def indexed(self):
+        prices, ids = get_product_price_index().snapshot()
+        return dict(zip(ids, prices))
+
+    def test_created_product_is_indexed(self):
+        self.indexed()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="New album", price=Decimal("12.34"), description="d", image="a.png")
+
+        self.assertEqual(self.indexed()[product.pk], 1234)
+
+    def test_repriced_product_is_reindexed(self):
+        product = Product.objects.first()
+        self.indexed()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = Decimal("99.99")
+            product.save()
+
+        self.assertEqual(self.indexed()[product.pk], 9999)
+
+    def test_deleted_product_leaves_the_index(self):
+        product = Product.objects.first()
+        self.indexed()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=product.pk).delete()
+
+        self.assertNotIn(product.pk, self.indexed())
+
+
+class CombinationSearchTests(SimpleTestCase):
+    """
+    CombinationSearch returns distinct products whose total is inside the window.
+    """
+
+    # 1.00 to 50.00 in steps of 1.00, as integer cents
+    prices = [100 * n for n in range(1, 51)]
+    ids = list(range(1, 51))
+
+    def assertFits(self, product_ids, count, min_cents, max_cents):
+        self.assertEqual(len(product_ids), count)
+        self.assertEqual(len(set(product_ids)), count)
+        total = sum(self.prices[self.ids.index(product_id)] for product_id in product_ids)
+        self.assertGreaterEqual(total, min_cents)
+        self.assertLessEqual(total, max_cents)
+
+    def test_pairs_inside_the_window(self):
+        for _ in range(200):
+            search = CombinationSearch(self.prices, self.ids, 4150, 4400, 2)
+            self.assertFits(search.run(), 2, 4150, 4400)
+            self.assertFalse(search.timed_out)
+
+    def test_triples_inside_the_window(self):
+        for _ in range(200):
+            search = CombinationSearch(self.prices, self.ids, 600, 800, 3)
+            self.assertFits(search.run(), 3, 600, 800)
+            self.assertFalse(search.timed_out)
+
+    def test_narrow_triple_window_found_by_the_scan(self):
+        # 1 + 2 + 3 is the only triple of total 6.00
+        search = CombinationSearch(self.prices, self.ids, 600, 600, 3)
+        self.assertEqual(sorted(search.run()), [1, 2, 3])
+
+    def test_no_combination(self):
+        # Totals are whole amounts, so nothing lands in 10.50
+        for count in (1, 2, 3):
+            search = CombinationSearch(self.prices, self.ids, 1050, 1050, count)
+            self.assertEqual(search.run(), [])
+            self.assertFalse(search.timed_out)
+
+    def test_window_below_the_cheapest_products(self):
+        search = CombinationSearch(self.prices, self.ids, 100, 250, 3)
+        self.assertEqual(search.run(), [])
+
+    def test_budget_exhausted(self):
+        search = CombinationSearch(self.prices, self.ids, 1050, 1050, 3, time_budget=0)
+        with self.assertLogs('game.product_combinations', 'WARNING'):
+            self.assertEqual(search.run(), [])
+        self.assertTrue(search.timed_out)
+
+
+@override_settings(**GAME_TEST_SETTINGS)
+class SelectProductsWithinRangeTests(GameTestMixin, TestCase):
+    """
+    AdminNegativeUserSerializer.Create.select_products_within_range loads the products picked on the index.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.create_fixtures()
+        self.serializer = AdminNegativeUserSerializer.Create()
+
+    def test_products_inside_the_range(self):
+        products = self.serializer.select_products_within_range(Decimal("60"), Decimal("70"), 2)
+
+        self.assertEqual(len(products), 2)
+        self.assertTrue(Decimal("60") <= sum(product.price for product in products) <= Decimal("70"))
+
+    def test_deleted_product_retried_on_a_rebuilt_index(self):
+        deleted, kept = Product.objects.order_by('id')[:2]
+        Product.objects.filter(pk=deleted.pk).delete()
+        picks = [[deleted.pk], [kept.pk]]
+
+        with mock.patch('game.serializers.select_product_combination', side_effect=picks) as select, \
+                mock.patch('game.serializers.invalidate_product_price_index') as invalidate:
+            products = self.serializer.select_products_within_range(Decimal("1"), Decimal("1000"), 1)
+
+        self.assertEqual(products, [kept])
+        self.assertEqual(select.call_count, 2)
+        invalidate.assert_called_once_with()
+
+    def test_no_products_in_range(self):
+        self.assertEqual(self.serializer.select_products_within_range(Decimal("1"), Decimal("5"), 1), [])
@@ -8,11 +8,14 @@ from rest_framework import status
 from .models import Game
 from .serializers import ProductSerializer,GameSerializer
 from shared.mixins import StandardResponseMixin
+from shared.pagination import KeysetPagination, KEYSET_PAGINATION_PARAMETERS
 from core.permissions import IsAdminOrReadOnly
 from .services import PlayGameService
-from wallet.models import Wallet
+from .counters import reset_game_counters
+from administration.stats import clear_submissions
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.db import transaction
 from django.db.models import Q
 from administration.models import Event
 from administration.serializers import EventSerializer
@@ -31,12 +34,12 @@ class ProductViewSet(StandardResponseMixin, ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
 
-    @cache_result('PRODUCTS', 'all')  # Literal string "all"
+    @cache_result('PRODUCTS', 'all', l1=True)  # Literal string "all"
     def list(self, request, *args, **kwargs):
         """List all products with caching"""
         return super().list(request, *args, **kwargs)
 
-    @cache_result('PRODUCTS', ['pk'])  # Cache by product ID (pk in kwargs)
+    @cache_result('PRODUCTS', ['pk'], l1=True)  # Cache by product ID (pk in kwargs)
     def retrieve(self, request, *args, **kwargs):
         """Retrieve a specific product with caching"""
         return super().retrieve(request, *args, **kwargs)
@@ -116,13 +119,10 @@ class GameViewSet(StandardResponseMixin, ViewSet):
     def get_service(self, user):
         """
         Helper method to initialize the PlayGameService.
+        The service loads the user, wallet, pack and invitation in one query;
+        use service.user afterwards, it holds the up-to-date counters.
         """
-        wallet = getattr(user, 'wallet', None)
-        if not wallet:
-            wallet = Wallet.objects.create(user=user)
-
-        total_number_can_play = wallet.package.daily_missions  # Example: Maximum number of games per day
-        return PlayGameService(user, total_number_can_play, wallet), ""
+        return PlayGameService.for_user(user), ""
 
     @action(detail=False, methods=['get'], url_path='current-game')
     def get_current_game(self, request):
@@ -144,7 +144,7 @@ class GameViewSet(StandardResponseMixin, ViewSet):
         game, error = service.get_active_game()
         error_payload = {
             "total_number_can_play": service.total_number_can_play,
-            "current_number_count": Game.count_games_played_today(user)
+            "current_number_count": Game.count_games_played_today(service.user)
         }
         if error:
             return self.standard_response(
@@ -159,7 +159,7 @@ class GameViewSet(StandardResponseMixin, ViewSet):
             game,
             context={
                 "total_number_can_play": service.total_number_can_play,
-                "current_number_count": Game.count_games_played_today(user),
+                "current_number_count": Game.count_games_played_today(service.user),
             }
         )
         return self.standard_response(
@@ -174,6 +174,16 @@ class GameViewSet(StandardResponseMixin, ViewSet):
         operation_summary="Play a Game",
         operation_description="Play the current active game and assign the next game to the user.",
         request_body=GameSerializer.PlayGameRequestSerializer,
+        manual_parameters=[
+            openapi.Parameter(
+                name="advance",
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="When set to 1, the response also contains the next active game "
+                            "(data.played_game and data.next_game) so no extra current-game call is needed.",
+                required=False,
+            )
+        ],
         responses={
             200: openapi.Response(
                 description="Submission was successfully",
@@ -190,6 +200,7 @@ class GameViewSet(StandardResponseMixin, ViewSet):
                     },
                 ),
             ),
+            409: openapi.Response(description="A previous play-game request of the user is still being processed"),
         },
     )
     @action(detail=False, methods=['post'], url_path='play-game')
@@ -215,6 +226,9 @@ class GameViewSet(StandardResponseMixin, ViewSet):
         rating_score = serializer.validated_data["rating_score"]
         comment = serializer.validated_data.get("comment", "")
 
+        if request.query_params.get("advance") in ("1", "true", "True"):
+            return self.play_game_and_advance(service, rating_score, comment)
+
         # Play the game
         game, message = service.play_game(rating_score, comment)
 
@@ -231,7 +245,7 @@ class GameViewSet(StandardResponseMixin, ViewSet):
             game,
             context={
                 "total_number_can_play": service.total_number_can_play,
-                "current_number_count": Game.count_games_played_today(user),
+                "current_number_count": Game.count_games_played_today(service.user),
             }
         )
         return self.standard_response(
@@ -241,6 +255,38 @@ class GameViewSet(StandardResponseMixin, ViewSet):
             status_code=status.HTTP_200_OK
         )
         
+    def play_game_and_advance(self, service, rating_score, comment):
+        """
+        Play the active game and return it together with the next active game,
+        as play-game followed by current-game would.
+        """
+        game, message, next_game, next_error = service.play_and_advance(rating_score, comment)
+
+        if not game:
+            return self.standard_response(
+                success=False,
+                message=message,
+                data=None,
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = {
+            "total_number_can_play": service.total_number_can_play,
+            "current_number_count": Game.count_games_played_today(service.user),
+        }
+        return self.standard_response(
+            success=True,
+            message=message,
+            data={
+                "played_game": GameSerializer.Retrieve(game, context=context).data,
+                "next_game": GameSerializer.Retrieve(next_game, context=context).data if next_game else None,
+                "next_game_message": next_error or "",
+                **context,
+            },
+            status_code=status.HTTP_200_OK
+        )
+
+    @swagger_auto_schema(manual_parameters=KEYSET_PAGINATION_PARAMETERS)
     @action(detail=False, methods=['get'], url_path='game-record')
     def game_record(self, request):
         user = request.user
@@ -250,18 +296,17 @@ class GameViewSet(StandardResponseMixin, ViewSet):
             user=user,is_active=True
         ).filter(
             Q(played=True) | Q(pending=True)
-        ).order_by('-updated_at', '-created_at')
+        )
+        # Most recently played first. A game updated while the record is paged
+        # moves to the top and may be missed until the first page is reloaded
+        paginator = KeysetPagination(ordering=('-updated_at', '-id'))
+        games = paginator.paginate_queryset(games, request, view=self)
 
         # Serialize the data
         serializer = GameSerializer.List(games, many=True)
 
         # Use the preferred response format
-        return self.standard_response(
-            success=True,
-            message="Game record",
-            data=serializer.data,
-            status_code=status.HTTP_200_OK
-        )
+        return paginator.get_paginated_response(serializer.data, message="Game record")
 
     @action(detail=False, methods=['delete'], url_path='delete-all-games', permission_classes=[])
     def delete_all_games(self, request):
@@ -274,7 +319,10 @@ class GameViewSet(StandardResponseMixin, ViewSet):
             total_games = Game.objects.count()
             
             # Delete all games
-            deleted_count = Game.objects.all().delete()[0]
+            with transaction.atomic():
+                deleted_count = Game.objects.all().delete()[0]
+                reset_game_counters()
+                clear_submissions()
             
             return self.standard_response(
                 success=True,
@@ -305,12 +353,12 @@ class UserEventViewSet(StandardResponseMixin,ModelViewSet):
 
     http_method_names = ['get']
 
-    @cache_result('EVENTS', 'active')
+    @cache_result('EVENTS', 'active', l1=True)
     def list(self, request, *args, **kwargs):
         """List all active events with caching"""
         return super().list(request, *args, **kwargs)
 
-    @cache_result('EVENTS', ['pk'])
+    @cache_result('EVENTS', ['pk'], l1=True)
     def retrieve(self, request, *args, **kwargs):
         """Retrieve a specific event with caching"""
         return super().retrieve(request, *args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.21 on 2026-10-16 23:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0004_adminlog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminlog',
+            index=models.Index(fields=['-created_at', '-id'], name='adminlog_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'type', 'is_read', '-created_at', '-id'], name='notif_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['type', 'is_read', '-created_at', '-id'], name='notif_type_keyset_idx'),
+        ),
+    ]
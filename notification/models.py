@@ -30,6 +30,11 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['is_read', '-created_at']
+        indexes = [
+            # Keyset pagination of the user and admin lists (unread first, newest first)
+            models.Index(fields=['user', 'type', 'is_read', '-created_at', '-id'], name='notif_user_keyset_idx'),
+            models.Index(fields=['type', 'is_read', '-created_at', '-id'], name='notif_type_keyset_idx'),
+        ]
 
     @classmethod
     def mark_all_user_as_read(cls, user):
@@ -68,5 +73,9 @@ class AdminLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of AdminLogReadView
+            models.Index(fields=['-created_at', '-id'], name='adminlog_keyset_idx'),
+        ]
 
     
\ No newline at end of file
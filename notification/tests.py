@@ -1,3 +1,86 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+
+import pytz
 from django.test import TestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from shared.pagination import KeysetPagination
+
+from .models import Notification
+from .views import NOTIFICATION_ORDERING
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    KeysetPagination over the notifications: unread first (ascending), then
+    newest first (descending), with ties on created_at broken by id.
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        start = datetime(2024, 5, 1, 12, 0, 0, 123456, tzinfo=pytz.UTC)
+        for i in range(9):
+            notification = Notification.objects.create(
+                message=f"Notification {i}", type=Notification.ADMIN, is_read=i % 4 == 0,
+            )
+            # Three notifications per timestamp, not in the order of their ids
+            Notification.objects.filter(pk=notification.pk).update(created_at=start + timedelta(minutes=i % 3))
+        self.expected = list(Notification.objects.order_by(*NOTIFICATION_ORDERING).values_list('id', flat=True))
+
+    def request(self, **params):
+        return Request(self.factory.get('/', params))
+
+    def paginate(self, **params):
+        paginator = KeysetPagination(ordering=NOTIFICATION_ORDERING)
+        rows = paginator.paginate_queryset(Notification.objects.all(), self.request(**params))
+        return paginator, [row.pk for row in rows]
+
+    def cursor(self, values):
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination(ordering=NOTIFICATION_ORDERING)
+        row = Notification.objects.order_by(*NOTIFICATION_ORDERING).first()
+
+        values = paginator.decode_cursor(self.request(cursor=paginator.encode_cursor(row)))
+
+        # Microseconds are kept, or rows sharing the millisecond would be skipped
+        self.assertEqual(values, [row.is_read, row.created_at.isoformat(), row.pk])
+
+    def test_pages_follow_the_ordering(self):
+        paginator, seen = self.paginate(page_size=2)
+        # Bounded, a wrong predicate could return the same rows forever
+        for _ in range(len(self.expected)):
+            if not paginator.has_next:
+                break
+            paginator, ids = self.paginate(page_size=2, cursor=paginator.next_cursor)
+            seen += ids
+
+        self.assertEqual(seen, self.expected)
+
+    def test_page_boundary_inside_a_tie(self):
+        # Unread rows of the newest timestamp: two share created_at
+        newest = Notification.objects.filter(is_read=False).order_by('-created_at', '-id')[:2]
+        self.assertEqual(newest[0].created_at, newest[1].created_at)
+
+        paginator, ids = self.paginate(page_size=1)
+        paginator, ids = self.paginate(page_size=1, cursor=paginator.next_cursor)
+
+        self.assertEqual(ids, [newest[1].pk])
 
-# Create your tests here.
+    def test_tampered_cursor(self):
+        row = Notification.objects.order_by(*NOTIFICATION_ORDERING).first()
+        cursors = [
+            "not base64!",
+            urlsafe_b64encode(b"not json").decode(),
+            self.cursor({'id': row.pk}),
+            self.cursor([row.is_read, row.pk]),
+            self.cursor([row.is_read, "yesterday", row.pk]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(cursor=cursor)
@@ -13,6 +13,11 @@ from shared.cache_utils import (
     cache_result, invalidate_user_notifications_cache, 
     invalidate_admin_notifications_cache
 )
+from shared.pagination import KeysetPagination, KEYSET_PAGINATION_PARAMETERS
+
+# Unread first, then newest first. A notification read while the list is paged
+# moves to the read section and may be listed again, never skipped
+NOTIFICATION_ORDERING = ('is_read', '-created_at', '-id')
 
 
 class UserNotificationViewSet(StandardResponseMixin, ViewSet):
@@ -21,19 +26,18 @@ class UserNotificationViewSet(StandardResponseMixin, ViewSet):
     """
     permission_classes = [IsAuthenticated]
 
-    @cache_result('NOTIFICATIONS', 'user.id')
+    @swagger_auto_schema(manual_parameters=KEYSET_PAGINATION_PARAMETERS)
+    @cache_result('NOTIFICATIONS', 'user.id', scoped=True, vary_on_query=('cursor', 'page_size'))
     def list(self, request):
         """
-        List all notifications for the authenticated user.
+        List the notifications of the authenticated user, unread first.
         """
-        notifications = request.user.notifications.filter(type=Notification.USER).order_by('is_read', '-created_at')
-        serializer = UserNotification.NotificationSerializer(notifications, many=True)
-        return self.standard_response(
-            success=True,
-            message="All notifications have been fetched.",
-            data=serializer.data,
-            status_code=status.HTTP_200_OK
+        paginator = KeysetPagination(ordering=NOTIFICATION_ORDERING)
+        notifications = paginator.paginate_queryset(
+            request.user.notifications.filter(type=Notification.USER), request, view=self
         )
+        serializer = UserNotification.NotificationSerializer(notifications, many=True)
+        return paginator.get_paginated_response(serializer.data, message="All notifications have been fetched.")
 
     @action(detail=False, methods=["post"], url_path="mark-all-read")
     def mark_all_as_read(self, request):
@@ -102,19 +106,18 @@ class AdminNotificationViewSet(StandardResponseMixin, ViewSet):
     """
     permission_classes = [IsAuthenticated, IsSiteAdmin]
 
-    @cache_result('NOTIFICATIONS', 'admin')
+    @swagger_auto_schema(manual_parameters=KEYSET_PAGINATION_PARAMETERS)
+    @cache_result('NOTIFICATIONS', 'admin', scoped=True, vary_on_query=('cursor', 'page_size'))
     def list(self, request):
         """
-        List all notifications for all the admins
+        List the notifications of all the admins, unread first.
         """
-        notifications = Notification.objects.filter(type=Notification.ADMIN).order_by('is_read', '-created_at')
-        serializer = AdminNotification.NotificationSerializer(notifications, many=True)
-        return self.standard_response(
-            success=True,
-            message="All Admin notifications have been fetched.",
-            data=serializer.data,
-            status_code=status.HTTP_200_OK
+        paginator = KeysetPagination(ordering=NOTIFICATION_ORDERING)
+        notifications = paginator.paginate_queryset(
+            Notification.objects.filter(type=Notification.ADMIN), request, view=self
         )
+        serializer = AdminNotification.NotificationSerializer(notifications, many=True)
+        return paginator.get_paginated_response(serializer.data, message="All Admin notifications have been fetched.")
 
     @action(detail=False, methods=["post"], url_path="mark-all-read")
     def mark_all_as_read(self, request):
@@ -179,5 +182,6 @@ class AdminNotificationViewSet(StandardResponseMixin, ViewSet):
 
 class AdminLogReadView(ReadOnlyModelViewSet):
     queryset = AdminLog.objects.all().order_by('-created_at')
+    pagination_class = KeysetPagination
     serializer_class = AdminLogSerializer
     permission_classes = [IsSiteAdmin]
\ No newline at end of file
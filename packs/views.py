@@ -24,12 +24,12 @@ class PackViewSet(StandardResponseMixin, ModelViewSet):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
-    @cache_result('PACKAGES', 'all')  # Literal string "all"
+    @cache_result('PACKAGES', 'all', l1=True)  # Literal string "all"
     def list(self, request, *args, **kwargs):
         """List all packages with caching"""
         return super().list(request, *args, **kwargs)
 
-    @cache_result('PACKAGES', ['pk'])  # Cache by pack ID (pk in kwargs)
+    @cache_result('PACKAGES', ['pk'], l1=True)  # Cache by pack ID (pk in kwargs)
     def retrieve(self, request, *args, **kwargs):
         """Retrieve a specific package with caching"""
         return super().retrieve(request, *args, **kwargs)
@@ -79,7 +79,7 @@ class PackViewSet(StandardResponseMixin, ModelViewSet):
         except Exception:
             pass
 
-    @cache_result('PACKAGES', 'active')  # Literal string "active"
+    @cache_result('PACKAGES', 'active', l1=True)  # Literal string "active"
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def active_packs(self, request):
         """
@@ -89,7 +89,7 @@ class PackViewSet(StandardResponseMixin, ModelViewSet):
         serializer = self.get_serializer(active_packs, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    @cache_result('PACKAGES', 'inactive')  # Literal string "inactive"
+    @cache_result('PACKAGES', 'inactive', l1=True)  # Literal string "inactive"
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def inactive_packs(self, request):
         """
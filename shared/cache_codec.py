@@ -0,0 +1,130 @@
+"""
+Payload codec of the Redis cache (django-redis SERIALIZER).
+
+Values are packed with msgpack, with native extension types for Decimal,
+datetime, date, time, timedelta and UUID, and only compressed with zlib above
+COMPRESS_MIN_BYTES. The codec compresses by itself, so the cache is
+configured with django-redis' IdentityCompressor.
+
+The size of the last payload encoded by each thread is kept for the cache
+metrics (``take_payload_size()``), so they need no second encoding.
+
+Every payload starts with a format byte. Values written by the previous
+JSONSerializer + ZlibCompressor configuration have none and are still
+decoded, so workers can be switched over without flushing the cache.
+"""
+import datetime
+import json
+import threading
+import uuid
+import zlib
+from decimal import Decimal
+
+import msgpack
+from django.utils.functional import Promise
+from django_redis.serializers.base import BaseSerializer
+
+# Format bytes
+RAW = b'\x01'
+ZLIB = b'\x02'
+
+# msgpack extension type codes
+EXT_DECIMAL = 1
+EXT_DATETIME = 2
+EXT_DATE = 3
+EXT_TIME = 4
+EXT_TIMEDELTA = 5
+EXT_UUID = 6
+
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+DEFAULT_COMPRESS_LEVEL = 1
+
+_local = threading.local()
+
+
+def take_payload_size():
+    """
+    Size in bytes of the last payload encoded by this thread, or None when
+    nothing was encoded since the last call.
+    """
+    size = getattr(_local, 'payload_size', None)
+    _local.payload_size = None
+    return size
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(EXT_DECIMAL, str(obj).encode())
+    # datetime is a subclass of date, test it first
+    if isinstance(obj, datetime.datetime):
+        return msgpack.ExtType(EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, datetime.time):
+        return msgpack.ExtType(EXT_TIME, obj.isoformat().encode())
+    if isinstance(obj, datetime.timedelta):
+        return msgpack.ExtType(EXT_TIMEDELTA, msgpack.packb([obj.days, obj.seconds, obj.microseconds]))
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(EXT_UUID, obj.bytes)
+    if isinstance(obj, Promise):
+        # Lazy translation strings
+        return str(obj)
+    raise TypeError(f"Cannot serialize {type(obj).__name__} in the cache")
+
+
+def _ext_hook(code, data):
+    if code == EXT_DECIMAL:
+        return Decimal(data.decode())
+    if code == EXT_DATETIME:
+        return datetime.datetime.fromisoformat(data.decode())
+    if code == EXT_DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if code == EXT_TIME:
+        return datetime.time.fromisoformat(data.decode())
+    if code == EXT_TIMEDELTA:
+        days, seconds, microseconds = msgpack.unpackb(data)
+        return datetime.timedelta(days=days, seconds=seconds, microseconds=microseconds)
+    if code == EXT_UUID:
+        return uuid.UUID(bytes=data)
+    return msgpack.ExtType(code, data)
+
+
+def _loads_legacy(value):
+    """
+    Decode a value written by JSONSerializer + ZlibCompressor (only values above 15 bytes were compressed).
+    """
+    try:
+        value = zlib.decompress(value)
+    except zlib.error:
+        pass
+    return json.loads(value.decode())
+
+
+class MsgpackSerializer(BaseSerializer):
+    """
+    msgpack serializer with size-threshold zlib compression.
+
+    CACHES OPTIONS: CODEC_COMPRESS_MIN_BYTES (1024) and CODEC_COMPRESS_LEVEL (1).
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.compress_min_bytes = int(options.get('CODEC_COMPRESS_MIN_BYTES', DEFAULT_COMPRESS_MIN_BYTES))
+        self.compress_level = int(options.get('CODEC_COMPRESS_LEVEL', DEFAULT_COMPRESS_LEVEL))
+
+    def dumps(self, value):
+        payload = msgpack.packb(value, default=_default, use_bin_type=True)
+        if len(payload) > self.compress_min_bytes:
+            payload = ZLIB + zlib.compress(payload, self.compress_level)
+        else:
+            payload = RAW + payload
+        _local.payload_size = len(payload)
+        return payload
+
+    def loads(self, value):
+        header = value[:1]
+        if header == RAW:
+            return msgpack.unpackb(value[1:], ext_hook=_ext_hook, raw=False, strict_map_key=False)
+        if header == ZLIB:
+            return msgpack.unpackb(zlib.decompress(value[1:]), ext_hook=_ext_hook, raw=False, strict_map_key=False)
+        return _loads_legacy(value)
@@ -0,0 +1,208 @@
+"""
+Per-family metrics of the cache_result caches.
+
+Every process counts its L1/L2 hits and misses, stale values served, lookup
+and recomputation latencies (as histograms) and the size of the stored
+payloads, as measured by the cache codec (shared.cache_codec) while encoding
+them; payloads are not measured with other cache backends. The counters are
+added to a Redis hash per family every CACHE_METRICS_FLUSH_INTERVAL seconds,
+from a background thread, so ``get_metrics()`` reports the totals of every
+worker. Without Redis it reports the counters of the current process.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('cache_operations')
+
+# Upper bounds (milliseconds) of the latency histogram buckets, the last one is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_lock = threading.Lock()
+# {cache type: {counter: value}}, since the start of the process and since the last flush
+_totals = defaultdict(lambda: defaultdict(int))
+_pending = defaultdict(lambda: defaultdict(int))
+_next_flush = 0
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def metrics_key(cache_type):
+    return cache.make_key(f"cache_metrics:{cache_type}")
+
+
+def _bucket(seconds):
+    milliseconds = seconds * 1000
+    for bound in LATENCY_BUCKETS_MS:
+        if milliseconds <= bound:
+            return f"le_{bound}ms"
+    return "gt_{}ms".format(LATENCY_BUCKETS_MS[-1])
+
+
+def _add(cache_type, counters):
+    global _next_flush
+    current = time.monotonic()
+    with _lock:
+        for name, value in counters.items():
+            _totals[cache_type][name] += value
+            _pending[cache_type][name] += value
+        flush_due = current >= _next_flush
+        if flush_due:
+            _next_flush = current + getattr(settings, 'CACHE_METRICS_FLUSH_INTERVAL', 10)
+    if flush_due:
+        flush_in_background()
+
+
+def record_lookup(cache_type, tier, hit, seconds=None):
+    """
+    Count a lookup of ``tier`` ('l1', 'l2' or 'stale'), with its duration when measured.
+    """
+    counters = {f"{tier}_{'hits' if hit else 'misses'}": 1}
+    if seconds is not None:
+        counters[f"{tier}_lookup_us"] = int(seconds * 1000000)
+        counters[f"{tier}_lookup_{_bucket(seconds)}"] = 1
+    _add(cache_type, counters)
+
+
+def record_set(cache_type, seconds, stored_bytes=None):
+    """
+    Count a recomputation taking ``seconds`` and, when known, the size of its stored payload.
+    """
+    counters = {
+        'sets': 1,
+        'compute_us': int(seconds * 1000000),
+        f"compute_{_bucket(seconds)}": 1,
+    }
+    if stored_bytes is not None:
+        counters['sized_sets'] = 1
+        counters['stored_bytes'] = stored_bytes
+    _add(cache_type, counters)
+
+
+def flush():
+    """
+    Add the counters recorded since the last flush to the Redis hashes.
+    """
+    redis = _redis()
+    if redis is None:
+        return
+    with _lock:
+        pending = {cache_type: dict(counters) for cache_type, counters in _pending.items()}
+        _pending.clear()
+    if not pending:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for cache_type, counters in pending.items():
+            for name, value in counters.items():
+                pipe.hincrby(metrics_key(cache_type), name, value)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Cache metrics flush failed: {e}")
+        # Kept for the next flush
+        with _lock:
+            for cache_type, counters in pending.items():
+                for name, value in counters.items():
+                    _pending[cache_type][name] += value
+
+
+def flush_in_background():
+    threading.Thread(target=flush, name='cache-metrics-flush', daemon=True).start()
+
+
+def _summarize(counters):
+    """
+    Hit rates, mean latencies and payload sizes of raw counters.
+    """
+    summary = {}
+    for tier in ('l1', 'l2'):
+        hits, misses = counters.get(f"{tier}_hits", 0), counters.get(f"{tier}_misses", 0)
+        summary[tier] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+    summary['l2']['mean_lookup_ms'] = (
+        round(counters.get('l2_lookup_us', 0) / 1000 / (summary['l2']['hits'] + summary['l2']['misses']), 3)
+        if summary['l2']['hits'] + summary['l2']['misses'] else 0.0
+    )
+    summary['l2']['lookup_histogram'] = _histogram(counters, 'l2_lookup')
+    summary['stale_served'] = counters.get('stale_hits', 0)
+
+    sets = counters.get('sets', 0)
+    summary['recomputations'] = {
+        'count': sets,
+        'mean_ms': round(counters.get('compute_us', 0) / 1000 / sets, 3) if sets else 0.0,
+        'histogram': _histogram(counters, 'compute'),
+    }
+    sized_sets = counters.get('sized_sets', 0)
+    summary['payload'] = {
+        'stored_bytes': counters.get('stored_bytes', 0),
+        'mean_bytes': round(counters.get('stored_bytes', 0) / sized_sets) if sized_sets else 0,
+    }
+    return summary
+
+
+def _histogram(counters, prefix):
+    buckets = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["gt_{}ms".format(LATENCY_BUCKETS_MS[-1])]
+    return {bucket: counters.get(f"{prefix}_{bucket}", 0) for bucket in buckets}
+
+
+def get_local_metrics(cache_types=None):
+    """
+    Metrics of the current process: {cache_type: summary}, for ``cache_types``
+    or for every family recorded so far.
+    """
+    with _lock:
+        totals = {cache_type: dict(counters) for cache_type, counters in _totals.items()}
+    cache_types = cache_types or sorted(totals)
+    return {cache_type: _summarize(totals.get(cache_type, {})) for cache_type in cache_types}
+
+
+def get_metrics(cache_types):
+    """
+    Metrics of every worker for ``cache_types``, as last flushed to Redis
+    (the current process is flushed first). Falls back to the current
+    process' metrics without Redis.
+    """
+    redis = _redis()
+    if redis is None:
+        return get_local_metrics(cache_types)
+    flush()
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for cache_type in cache_types:
+            pipe.hgetall(metrics_key(cache_type))
+        results = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Cache metrics read failed: {e}")
+        return get_local_metrics(cache_types)
+    return {
+        cache_type: _summarize({name.decode(): int(value) for name, value in counters.items()})
+        for cache_type, counters in zip(cache_types, results)
+    }
+
+
+def reset_metrics(cache_types):
+    """
+    Clear the counters of this process and of Redis.
+    """
+    with _lock:
+        _totals.clear()
+        _pending.clear()
+    redis = _redis()
+    if redis is not None:
+        try:
+            redis.delete(*(metrics_key(cache_type) for cache_type in cache_types))
+        except Exception as e:
+            logger.warning(f"Cache metrics reset failed: {e}")
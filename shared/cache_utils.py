@@ -3,8 +3,16 @@ Cache utility functions for Redis caching
 """
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
 from functools import wraps
 import logging
+import math
+import random
+import time
+import uuid
+
+from shared import cache_codec, cache_metrics
+from shared.local_cache import local_cache
 
 logger = logging.getLogger('cache_operations')
 
@@ -17,8 +25,23 @@ CACHE_PREFIXES = {
     'ADMIN_NOTIFICATIONS': 'admin_notifications',
     'SETTINGS': 'settings',
     'EVENTS': 'events',
+    'DASHBOARD': 'dashboard',
 }
 
+# Families cached with cache_result, reported by the cache metrics
+CACHE_FAMILIES = ('PRODUCTS', 'PACKAGES', 'NOTIFICATIONS', 'SETTINGS', 'EVENTS', 'DASHBOARD')
+
+# Every cache key embeds the generation of its family (and of its scope), so
+# invalidating a family or a scope is a single INCR of its counter
+GENERATION_KEY_PREFIX = 'cache_gen'
+
+# Poll interval (seconds) of a worker waiting for another worker's recomputation
+REFRESH_POLL_INTERVAL = 0.05
+
+# Generations recently fetched by this process: {generation key: (fetched at, value)}
+_generation_memo = {}
+
+
 def get_cache_ttl(cache_type):
     """Get TTL for specific cache type"""
     return getattr(settings, 'CACHE_TTL', {}).get(cache_type, settings.CACHE_TTL.get('DEFAULT', 300))
@@ -29,15 +52,171 @@ def build_cache_key(prefix, *args):
     key_parts.extend([str(arg) for arg in args])
     return ':'.join(key_parts)
 
-def cache_result(cache_type, key_args=None, ttl=None):
+def generation_key(cache_type, scope=None):
+    """Key of the generation counter of a cache family, or of one scope within it"""
+    family = CACHE_PREFIXES.get(cache_type, cache_type)
+    if scope is None:
+        return f"{GENERATION_KEY_PREFIX}:{family}"
+    return f"{GENERATION_KEY_PREFIX}:{family}:{scope}"
+
+def _initial_generation():
+    # Time based, so a counter lost to eviction does not restart at an already used value
+    return int(time.time() * 1000)
+
+def get_generations(*keys, max_age=None):
+    """
+    Current values of the given generation counters, created when missing.
+    With ``max_age``, values fetched by this process less than max_age seconds
+    ago are reused without a round trip.
+    """
+    if max_age:
+        current = time.monotonic()
+        memo = [_generation_memo.get(key) for key in keys]
+        if all(entry and current - entry[0] < max_age for entry in memo):
+            return [entry[1] for entry in memo]
+
+    values = cache.get_many(keys)
+    missing = [key for key in keys if values.get(key) is None]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_generation(), None)
+        values.update(cache.get_many(missing))
+    generations = [values[key] for key in keys]
+    if max_age:
+        current = time.monotonic()
+        for key, generation in zip(keys, generations):
+            _generation_memo[key] = (current, generation)
+    return generations
+
+def get_generation(cache_type, scope=None):
+    """Current generation of a cache family, or of one scope within it"""
+    return get_generations(generation_key(cache_type, scope))[0]
+
+def build_versioned_cache_key(cache_type, *args, scoped=False, max_age=None):
+    """
+    Build a cache key with the family generation folded in. When ``scoped``,
+    the first argument is a scope (a user id...) with its own generation.
+    One cache round trip for the generations, none when they were fetched
+    less than ``max_age`` seconds ago.
+    """
+    keys = [generation_key(cache_type)]
+    if scoped and args:
+        keys.append(generation_key(cache_type, args[0]))
+    generations = get_generations(*keys, max_age=max_age)
+    parts = [f"g{generations[0]}"]
+    if scoped and args:
+        parts.extend([args[0], f"g{generations[1]}"])
+        args = args[1:]
+    return build_cache_key(cache_type, *parts, *args)
+
+def invalidate_generation(cache_type, scope=None):
+    """
+    Invalidate every key of a cache family (or of one scope) with a single
+    INCR, once the current transaction is committed. The old keys are no
+    longer read and expire with their TTL.
+    """
+    key = generation_key(cache_type, scope)
+
+    def bump():
+        # This process sees the new generation at once, the others within their max_age
+        _generation_memo.pop(key, None)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Missing counter
+                cache.set(key, _initial_generation(), None)
+            _log_sampled("Cache generation bumped: %s", key)
+        except Exception as e:
+            logger.error(f"Cache invalidation error: {e}")
+
+    transaction.on_commit(bump)
+
+def _log_sampled(message, *args):
+    """Per-request cache log line, at DEBUG level for a CACHE_LOG_SAMPLE_RATE share of the calls"""
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < getattr(settings, 'CACHE_LOG_SAMPLE_RATE', 0.01):
+        logger.debug(message, *args)
+
+def _restore_cached_result(cached_result):
+    """Rebuild the value returned by a cached function"""
+    # Handle cached DRF Response objects
+    if isinstance(cached_result, dict) and 'data' in cached_result and 'status_code' in cached_result:
+        # Reconstruct DRF Response object
+        from rest_framework.response import Response
+        response = Response(
+            data=cached_result['data'],
+            status=cached_result['status_code']
+        )
+        # Set headers if they exist
+        if 'headers' in cached_result and cached_result['headers']:
+            for key, value in cached_result['headers'].items():
+                response[key] = value
+        return response
+    # Regular cached result
+    return cached_result
+
+def _acquire_refresh_lock(lock_key):
+    """
+    Short lock letting a single worker recompute a cache key. Returns the
+    lock token, or None when another worker holds the lock.
+    """
+    token = uuid.uuid4().hex
+    try:
+        if cache.add(lock_key, token, getattr(settings, 'CACHE_REFRESH_LOCK_TIMEOUT', 30)):
+            return token
+        return None
+    except Exception as e:
+        # Cannot coordinate with the other workers: recompute
+        logger.warning(f"Cache refresh lock error: {e}")
+        return token
+
+def _release_refresh_lock(lock_key, token):
+    try:
+        if token and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    except Exception as e:
+        logger.warning(f"Cache refresh lock release error: {e}")
+
+def _needs_early_refresh(entry):
+    """
+    Probabilistic early expiry (XFetch): the closer the expiry and the slower
+    the recomputation, the likelier a read triggers the refresh, so the
+    workers' refreshes are spread instead of all happening at expiry.
+    """
+    beta = getattr(settings, 'CACHE_EARLY_EXPIRY_BETA', 1.0)
+    return time.time() - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expires_at']
+
+def _wait_for_refresh(cache_key):
+    """Poll the key recomputed by another worker, for CACHE_REFRESH_WAIT seconds at most"""
+    deadline = time.monotonic() + getattr(settings, 'CACHE_REFRESH_WAIT', 2.0)
+    while time.monotonic() < deadline:
+        time.sleep(REFRESH_POLL_INTERVAL)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry
+    return None
+
+def cache_result(cache_type, key_args=None, ttl=None, scoped=False, l1=False, vary_on_query=None):
     """
     Decorator to cache function results
     
+    Concurrent misses of a key are recomputed by a single worker holding a
+    short lock; the others serve the key's previous value (kept under an
+    unversioned 'stale' key) or wait for the new one. Keys are also refreshed
+    early with a probability growing near their expiry.
+
     Args:
         cache_type: Type of cache (PRODUCTS, PACKAGES, etc.)
         key_args: Function arguments to use in cache key (by name or index)
                  Can also use nested access like 'user.id' (assumes args[1] is request)
         ttl: Time to live in seconds (overrides default)
+        scoped: The first key part is a scope invalidated on its own
+                 (see invalidate_generation)
+        l1: Also keep the result in the per-process LRU (shared.local_cache),
+            for hot reads served without a Redis round trip. Other workers'
+            invalidations are seen within CACHE_L1_GENERATION_CHECK_INTERVAL.
+        vary_on_query: Names of request query parameters (e.g. the pagination
+            cursor and page_size) added to the key
     """
     def decorator(func):
         @wraps(func)
@@ -73,7 +252,6 @@ def cache_result(cache_type, key_args=None, ttl=None):
                             # Regular keyword argument
                             elif arg in kwargs:
                                 cache_key_parts.append(str(kwargs[arg]))
-                    cache_key = build_cache_key(cache_type, *cache_key_parts)
                 else:
                     # Single argument - handle nested access
                     if isinstance(key_args, str) and '.' in key_args:
@@ -87,49 +265,58 @@ def cache_result(cache_type, key_args=None, ttl=None):
                                 else:
                                     break
                             if obj is not None:
-                                cache_key = build_cache_key(cache_type, str(obj))
+                                cache_key_parts = [str(obj)]
                             else:
-                                cache_key = build_cache_key(cache_type, str(key_args))
+                                cache_key_parts = [str(key_args)]
                         except (AttributeError, IndexError):
-                            cache_key = build_cache_key(cache_type, str(key_args))
+                            cache_key_parts = [str(key_args)]
                     else:
                         # Single argument
-                        cache_key = build_cache_key(cache_type, str(key_args))
+                        cache_key_parts = [str(key_args)]
             else:
                 # Use function name and all arguments
-                all_args = [str(arg) for arg in args] + [f"{k}={v}" for k, v in kwargs.items()]
-                cache_key = build_cache_key(cache_type, func.__name__, *all_args)
-            
-            # Try to get from cache
+                cache_key_parts = [func.__name__] + [str(arg) for arg in args] + [f"{k}={v}" for k, v in kwargs.items()]
+
+            if vary_on_query and len(args) > 1:
+                query_params = getattr(args[1], 'query_params', {})
+                cache_key_parts += [f"{name}={query_params.get(name, '')}" for name in vary_on_query]
+
             try:
-                cached_result = cache.get(cache_key)
-                if cached_result is not None:
-                    logger.info(f"Cache HIT: {cache_key}")
-                    
-                    # Handle cached DRF Response objects
-                    if isinstance(cached_result, dict) and 'data' in cached_result and 'status_code' in cached_result:
-                        # Reconstruct DRF Response object
-                        from rest_framework.response import Response
-                        response = Response(
-                            data=cached_result['data'],
-                            status=cached_result['status_code']
-                        )
-                        # Set headers if they exist
-                        if 'headers' in cached_result and cached_result['headers']:
-                            for key, value in cached_result['headers'].items():
-                                response[key] = value
-                        return response
-                    else:
-                        # Regular cached result
-                        return cached_result
+                cache_key = build_versioned_cache_key(
+                    cache_type, *cache_key_parts, scoped=scoped,
+                    max_age=getattr(settings, 'CACHE_L1_GENERATION_CHECK_INTERVAL', 1.0) if l1 else None,
+                )
             except Exception as e:
-                logger.warning(f"Cache GET error: {e}")
+                # Cache unavailable: serve without it
+                logger.warning(f"Cache generation lookup error: {e}")
+                return func(*args, **kwargs)
             
-            # Execute function and cache result
-            try:
-                result = func(*args, **kwargs)
-                cache_ttl = ttl or get_cache_ttl(cache_type)
-                
+            cache_ttl = ttl or get_cache_ttl(cache_type)
+            # The L1 copy never outlives the Redis one
+            l1_ttl = min(getattr(settings, 'CACHE_L1_TTL', 60), cache_ttl)
+
+            if l1:
+                local_result = local_cache.get(cache_key)
+                cache_metrics.record_lookup(cache_type, 'l1', local_result is not None)
+                if local_result is not None:
+                    _log_sampled("Cache L1 HIT: %s", cache_key)
+                    return _restore_cached_result(local_result)
+
+            lock_key = f"{cache_key}:refresh_lock"
+            # Last value of the key across generations, served while another worker recomputes it
+            stale_key = build_cache_key(cache_type, 'stale', *cache_key_parts)
+
+            def refresh(token):
+                # Execute function and cache result
+                try:
+                    start = time.perf_counter()
+                    result = func(*args, **kwargs)
+                    delta = time.perf_counter() - start
+                except Exception as e:
+                    logger.error(f"Function execution error: {e}")
+                    _release_refresh_lock(lock_key, token)
+                    raise
+
                 # Handle Django REST Framework Response objects
                 if hasattr(result, 'data') and hasattr(result, 'status_code'):
                     # It's a DRF Response object, cache the data and status
@@ -138,95 +325,144 @@ def cache_result(cache_type, key_args=None, ttl=None):
                         'status_code': result.status_code,
                         'headers': dict(result.items()) if hasattr(result, 'items') else {}
                     }
-                    cache.set(cache_key, cache_data, cache_ttl)
-                    logger.info(f"Cache SET: {cache_key} (TTL: {cache_ttl}s) - DRF Response")
                 else:
                     # Regular result, cache as-is
-                    cache.set(cache_key, result, cache_ttl)
-                    logger.info(f"Cache SET: {cache_key} (TTL: {cache_ttl}s)")
-                
+                    cache_data = result
+                entry = {'value': cache_data, 'delta': delta, 'expires_at': time.time() + cache_ttl}
+                stored_bytes = None
+                try:
+                    cache.set(cache_key, entry, cache_ttl)
+                    # Measured by the codec while encoding the entry
+                    stored_bytes = cache_codec.take_payload_size()
+                    cache.set(stale_key, cache_data, cache_ttl + getattr(settings, 'CACHE_STALE_GRACE', 600))
+                    _log_sampled("Cache SET: %s (TTL: %ss)", cache_key, cache_ttl)
+                except Exception as e:
+                    logger.warning(f"Cache SET error: {e}")
+                # Released once the value is stored, so the next lock holder finds it
+                _release_refresh_lock(lock_key, token)
+                cache_metrics.record_set(cache_type, delta, stored_bytes)
+                if l1:
+                    local_cache.set(cache_key, cache_data, l1_ttl)
                 return result
+
+            # Try to get from cache
+            start = time.perf_counter()
+            try:
+                entry = cache.get(cache_key)
             except Exception as e:
-                logger.error(f"Function execution error: {e}")
-                raise
-                
+                logger.warning(f"Cache GET error: {e}")
+                entry = None
+            cache_metrics.record_lookup(cache_type, 'l2', entry is not None, time.perf_counter() - start)
+
+            if entry is not None:
+                _log_sampled("Cache HIT: %s", cache_key)
+                if _needs_early_refresh(entry):
+                    # One worker recomputes ahead of the expiry, the others keep the current value
+                    token = _acquire_refresh_lock(lock_key)
+                    if token is not None:
+                        return refresh(token)
+                elif l1:
+                    local_cache.set(cache_key, entry['value'], l1_ttl)
+                return _restore_cached_result(entry['value'])
+
+            token = _acquire_refresh_lock(lock_key)
+            if token is None:
+                # Another worker is recomputing the key: serve its previous value, or wait for the new one
+                try:
+                    cached_result = cache.get(stale_key)
+                    if cached_result is None:
+                        entry = _wait_for_refresh(cache_key)
+                        cached_result = entry['value'] if entry else None
+                    else:
+                        cache_metrics.record_lookup(cache_type, 'stale', True)
+                except Exception as e:
+                    logger.warning(f"Cache GET error: {e}")
+                    cached_result = None
+                if cached_result is not None:
+                    return _restore_cached_result(cached_result)
+                # The refresh is taking too long, recompute without waiting any longer
+                token = _acquire_refresh_lock(lock_key) or ''
+            else:
+                # The previous lock holder may have stored the key since our miss
+                try:
+                    entry = cache.get(cache_key)
+                except Exception:
+                    entry = None
+                if entry is not None:
+                    _release_refresh_lock(lock_key, token)
+                    return _restore_cached_result(entry['value'])
+            return refresh(token)
+
         return wrapper
     return decorator
 
-def invalidate_cache_pattern(pattern):
-    """Invalidate all cache keys matching pattern"""
-    try:
-        # Get all keys matching pattern
-        keys = cache.keys(pattern)
-        if keys:
-            cache.delete_many(keys)
-            logger.info(f"Invalidated {len(keys)} cache keys matching: {pattern}")
-        else:
-            logger.debug(f"No cache keys found matching: {pattern}")
-    except Exception as e:
-        logger.error(f"Cache invalidation error: {e}")
-
 def invalidate_product_cache():
     """Invalidate all product-related cache"""
-    invalidate_cache_pattern("products:*")
+    invalidate_generation('PRODUCTS')
+    # Rebuild the in-memory price index used for game product selection
+    from game.product_index import invalidate_product_price_index
+    invalidate_product_price_index()
 
 def invalidate_package_cache():
     """Invalidate all package-related cache"""
-    invalidate_cache_pattern("packages:*")
+    invalidate_generation('PACKAGES')
 
 def invalidate_user_notifications_cache(user_id=None):
     """Invalidate user notification cache"""
     if user_id:
-        invalidate_cache_pattern(f"notifications:{user_id}*")
+        invalidate_generation('NOTIFICATIONS', user_id)
     else:
-        invalidate_cache_pattern("notifications:*")
+        # Also covers the admin notifications
+        invalidate_generation('NOTIFICATIONS')
 
 def invalidate_admin_notifications_cache():
     """Invalidate admin notification cache"""
-    invalidate_cache_pattern("notifications:admin*")
+    invalidate_generation('NOTIFICATIONS', 'admin')
 
 def invalidate_all_notifications_cache():
     """Invalidate all notification cache"""
-    invalidate_user_notifications_cache()
-    invalidate_admin_notifications_cache()
+    invalidate_generation('NOTIFICATIONS')
 
 def invalidate_settings_cache():
     """Invalidate all settings-related cache"""
-    invalidate_cache_pattern("settings:*")
+    invalidate_generation('SETTINGS')
+    # The in-memory copy of the settings follows the SETTINGS generation
+    from shared.helpers.settings import invalidate_settings
+    invalidate_settings()
 
 def invalidate_events_cache():
     """Invalidate all events-related cache"""
-    invalidate_cache_pattern("events:*")
+    invalidate_generation('EVENTS')
 
 # Cache key builders
 def get_products_cache_key():
     """Get cache key for all products"""
-    return build_cache_key('PRODUCTS', 'all')
+    return build_versioned_cache_key('PRODUCTS', 'all')
 
 def get_product_cache_key(product_id):
     """Get cache key for specific product"""
-    return build_cache_key('PRODUCTS', product_id)
+    return build_versioned_cache_key('PRODUCTS', product_id)
 
 def get_packages_cache_key():
     """Get cache key for all packages"""
-    return build_cache_key('PACKAGES', 'all')
+    return build_versioned_cache_key('PACKAGES', 'all')
 
 def get_user_notifications_cache_key(user_id):
     """Get cache key for user notifications"""
-    return build_cache_key('USER_NOTIFICATIONS', user_id)
+    return build_versioned_cache_key('NOTIFICATIONS', user_id, scoped=True)
 
 def get_admin_notifications_cache_key():
     """Get cache key for admin notifications"""
-    return build_cache_key('ADMIN_NOTIFICATIONS', 'all')
+    return build_versioned_cache_key('NOTIFICATIONS', 'admin', scoped=True)
 
 def get_settings_cache_key():
     """Get cache key for global settings"""
-    return build_cache_key('SETTINGS', 'global')
+    return build_versioned_cache_key('SETTINGS', 'global')
 
 def get_events_cache_key():
     """Get cache key for all active events"""
-    return build_cache_key('EVENTS', 'active')
+    return build_versioned_cache_key('EVENTS', 'active')
 
 def get_event_cache_key(event_id):
     """Get cache key for specific event"""
-    return build_cache_key('EVENTS', event_id)
+    return build_versioned_cache_key('EVENTS', event_id)
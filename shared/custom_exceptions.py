@@ -23,3 +23,11 @@ class CustomException(Exception):
         if not isinstance(errors, (list, tuple, set)):
             errors = [errors]
         self.errors = errors
+
+
+class ActionInProgressException(CustomException):
+    """
+    Raised when the same action is already being processed for the user.
+    """
+    def __init__(self, message: str = "Your previous request is still being processed. Please try again."):
+        super().__init__(status_code=status.HTTP_409_CONFLICT, message=message)
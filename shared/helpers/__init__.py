@@ -1,4 +1,5 @@
 from .invitation import *
 from .settings import *
 from .notification import *
-from .admin_log import *
\ No newline at end of file
+from .admin_log import *
+from .code_allocator import *
@@ -0,0 +1,235 @@
+import logging
+import random
+import string
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+from .invitation import generate_invitation_code
+
+__all__ = [
+    'CodeAllocator',
+    'invitation_code_allocator',
+    'rating_no_allocator',
+    'allocate_invitation_codes',
+    'allocate_rating_numbers',
+]
+
+logger = logging.getLogger('cache_operations')
+
+
+class CodeAllocator:
+    """
+    Hand out random codes that are not used yet by any of the given model fields.
+
+    Candidates are generated in batches and checked for collisions with one
+    ``IN`` query per model field and with the codes already pooled, then kept
+    in a pool until they are handed out. The pool is a Redis set shared by
+    every worker: SADD drops codes pooled twice and SPOP hands each pooled
+    code out once, so most allocations need no query at all. When Redis is not
+    available the pool is an in-process set, which cannot see the codes of the
+    other workers: its codes are checked against the database again, with one
+    ``IN`` query per model field, before they are handed out.
+    """
+
+    def __init__(self, name, generator, lookups):
+        """
+        Args:
+            name (str): Pool name, used in the Redis key.
+            generator (callable): Returns one random candidate code.
+            lookups (list): ("app_label.Model", "field") pairs the codes must not collide with.
+        """
+        self.name = name
+        self.generator = generator
+        self.lookups = lookups
+        self._local_pool = set()
+        self._lock = threading.Lock()
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'CODE_POOL_BATCH_SIZE', 500)
+
+    @property
+    def pool_size(self):
+        return getattr(settings, 'CODE_POOL_SIZE', 2000)
+
+    @property
+    def pool_key(self):
+        return cache.make_key(f"code_pool_set:{self.name}")
+
+    # ------------------------------------------------------------------ #
+    # Pool storage
+    # ------------------------------------------------------------------ #
+    def _redis(self):
+        try:
+            from django_redis import get_redis_connection
+            return get_redis_connection('default')
+        except Exception:
+            return None
+
+    def _pop(self, count):
+        """
+        Take up to ``count`` codes out of the pool. Returns (codes, shared),
+        ``shared`` being False when they come from the in-process pool.
+        """
+        redis = self._redis()
+        if redis is not None:
+            try:
+                codes = redis.spop(self.pool_key, count) or []
+                return [code.decode() if isinstance(code, bytes) else code for code in codes], True
+            except Exception as e:
+                logger.warning(f"Code pool {self.name} read failed: {e}")
+        with self._lock:
+            return [self._local_pool.pop() for _ in range(min(count, len(self._local_pool)))], False
+
+    def _push(self, codes):
+        if not codes:
+            return
+        redis = self._redis()
+        if redis is not None:
+            try:
+                redis.sadd(self.pool_key, *codes)
+                return
+            except Exception as e:
+                logger.warning(f"Code pool {self.name} write failed: {e}")
+        with self._lock:
+            self._local_pool.update(codes)
+
+    def _pooled(self, codes):
+        """
+        The ``codes`` already waiting in the pool.
+        """
+        redis = self._redis()
+        if redis is not None:
+            try:
+                pipe = redis.pipeline(transaction=False)
+                for code in codes:
+                    pipe.sismember(self.pool_key, code)
+                return {code for code, pooled in zip(codes, pipe.execute()) if pooled}
+            except Exception as e:
+                logger.warning(f"Code pool {self.name} lookup failed: {e}")
+        with self._lock:
+            return self._local_pool.intersection(codes)
+
+    def pool_length(self):
+        redis = self._redis()
+        if redis is not None:
+            try:
+                return redis.scard(self.pool_key)
+            except Exception as e:
+                logger.warning(f"Code pool {self.name} length failed: {e}")
+        return len(self._local_pool)
+
+    def clear(self):
+        redis = self._redis()
+        if redis is not None:
+            try:
+                redis.delete(self.pool_key)
+            except Exception as e:
+                logger.warning(f"Code pool {self.name} clear failed: {e}")
+        with self._lock:
+            self._local_pool.clear()
+
+    # ------------------------------------------------------------------ #
+    # Generation
+    # ------------------------------------------------------------------ #
+    def _remove_taken(self, candidates):
+        """
+        Drop from the ``candidates`` set the codes used by any model field, one IN query per field.
+        """
+        for model_label, field in self.lookups:
+            if not candidates:
+                break
+            model = apps.get_model(model_label)
+            taken = model.objects.filter(**{f"{field}__in": candidates}).values_list(field, flat=True)
+            candidates.difference_update(taken)
+        return candidates
+
+    def generate_batch(self, size=None, exclude=()):
+        """
+        Generate up to ``size`` codes unused by the model fields and not pooled yet.
+        """
+        size = min(size or self.batch_size, self.batch_size)
+        exclude = set(exclude)
+        candidates = set()
+        # Bounded number of draws, in case the code space is nearly full
+        for _ in range(size * 4):
+            if len(candidates) >= size:
+                break
+            code = self.generator()
+            if code not in exclude:
+                candidates.add(code)
+
+        candidates.difference_update(self._pooled(list(candidates)))
+        return list(self._remove_taken(candidates))
+
+    def allocate(self, count=1):
+        """
+        Return ``count`` unused codes, taken from the pool.
+        """
+        codes = []
+        while len(codes) < count:
+            popped, shared = self._pop(count - len(codes))
+            if not shared:
+                popped = self._remove_taken(set(popped))
+            codes.extend(popped)
+            if len(codes) >= count:
+                break
+            # Fresh codes go through the pool too, so a code generated by two
+            # workers at once is only handed out once
+            batch = self.generate_batch(self.batch_size, exclude=codes)
+            if not batch:
+                raise ValueError(f"Unable to allocate a unique {self.name} code.")
+            self._push(batch)
+        return codes
+
+    def refill(self, size=None):
+        """
+        Top the pool up to ``size`` codes. Returns the number of codes added.
+        """
+        size = size or self.pool_size
+        added = 0
+        while self.pool_length() < size:
+            batch = self.generate_batch(min(self.batch_size, size - self.pool_length()))
+            if not batch:
+                break
+            self._push(batch)
+            added += len(batch)
+        return added
+
+
+def generate_rating_no():
+    """
+    Generate a random 11-digit rating number.
+    """
+    return ''.join(random.choices(string.digits, k=11))
+
+
+# Referral codes and invitation codes share one namespace
+invitation_code_allocator = CodeAllocator(
+    'invitation_code',
+    generate_invitation_code,
+    [('users.User', 'referral_code'), ('users.InvitationCode', 'invitation_code')],
+)
+
+rating_no_allocator = CodeAllocator(
+    'rating_no',
+    generate_rating_no,
+    [('game.Product', 'rating_no')],
+)
+
+
+def allocate_invitation_codes(count=1):
+    """
+    Allocate ``count`` codes unused by any User referral_code or InvitationCode.
+    """
+    return invitation_code_allocator.allocate(count)
+
+
+def allocate_rating_numbers(count=1):
+    """
+    Allocate ``count`` 11-digit rating numbers unused by any Product.
+    """
+    return rating_no_allocator.allocate(count)
@@ -1,7 +1,74 @@
+"""
+Process-local copy of the admin Settings singleton.
+
+The row is kept in memory and revalidated against the SETTINGS cache
+generation, at most once every SETTINGS_VERSION_CHECK_INTERVAL seconds.
+``invalidate_settings_cache()`` increments the generation, so every worker
+reloads the row on its next check. Without a reachable cache the row is read
+from the database on every call.
+
+The returned instance is shared: treat it as read-only and load the row from
+the database to update it.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings as django_settings
+
 from administration.models import Settings
+from shared.cache_utils import get_generation
 
-def get_settings():
+__all__ = ['get_settings', 'invalidate_settings']
+
+logger = logging.getLogger('cache_operations')
+
+_lock = threading.Lock()
+_cached = None
+_cached_version = None
+_next_check = 0
+
+
+def _load():
     try:
         return Settings.objects.first()
     except Settings.DoesNotExist:
-        raise ValueError("Admin Settings isnt available")
\ No newline at end of file
+        raise ValueError("Admin Settings isnt available")
+
+
+def get_settings():
+    global _cached, _cached_version, _next_check
+    current = time.monotonic()
+    with _lock:
+        if _cached is not None and current < _next_check:
+            return _cached
+
+    try:
+        version = get_generation('SETTINGS')
+    except Exception as e:
+        logger.warning(f"Settings version check failed, reading from the database: {e}")
+        version = None
+    if version is None:
+        return _load()
+
+    with _lock:
+        if _cached is not None and _cached_version == version:
+            _next_check = current + getattr(django_settings, 'SETTINGS_VERSION_CHECK_INTERVAL', 0.25)
+            return _cached
+
+    # The version is read before the row, so a concurrent update is seen on the next check
+    instance = _load()
+    with _lock:
+        if instance is not None:
+            _cached, _cached_version = instance, version
+            _next_check = current + getattr(django_settings, 'SETTINGS_VERSION_CHECK_INTERVAL', 0.25)
+    return instance
+
+
+def invalidate_settings():
+    """
+    Drop the local copy, other workers follow the SETTINGS generation.
+    """
+    global _cached, _cached_version
+    with _lock:
+        _cached, _cached_version = None, None
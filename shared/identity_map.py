@@ -0,0 +1,57 @@
+"""
+Request-scoped identity map: at most one loaded instance per (model, pk).
+"""
+
+
+class IdentityMap:
+    """
+    Keep the model instances loaded during one request so every read and write
+    goes through the same object instead of a second copy loaded elsewhere.
+    """
+
+    def __init__(self):
+        self._instances = {}
+
+    @staticmethod
+    def _key(model, pk):
+        return model._meta.concrete_model, pk
+
+    def add(self, instance):
+        """
+        Register an instance and return the one to use: the instance already
+        known for the same row, or this one.
+        """
+        if instance is None or instance.pk is None:
+            return instance
+        return self._instances.setdefault(self._key(type(instance), instance.pk), instance)
+
+    def get(self, model, pk):
+        return self._instances.get(self._key(model, pk))
+
+    def get_or_load(self, model, pk, loader):
+        """
+        Return the known instance, or call ``loader()`` once and register its result.
+        """
+        instance = self.get(model, pk)
+        if instance is None:
+            instance = self.add(loader())
+        return instance
+
+    def merge(self, instance):
+        """
+        Copy the column values of a freshly loaded instance onto the registered
+        instance of the same row (registering it when unknown) and return it.
+        Related objects already attached to the registered instance are kept.
+        """
+        current = self.add(instance)
+        if current is not instance:
+            for field in instance._meta.concrete_fields:
+                if not field.is_relation:
+                    setattr(current, field.attname, getattr(instance, field.attname))
+        return current
+
+    def __contains__(self, instance):
+        return self.get(type(instance), instance.pk) is instance
+
+    def __len__(self):
+        return len(self._instances)
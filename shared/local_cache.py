@@ -0,0 +1,53 @@
+"""
+Per-process LRU cache used by cache_result as a first tier (L1) in front of Redis.
+
+Entries are stored under the versioned cache key, so bumping a family
+generation makes them unreachable; they then leave the cache through the LRU
+bound (CACHE_L1_MAX_ENTRIES) or their TTL (CACHE_L1_TTL, shorter than the
+Redis TTL).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class LocalLRUCache:
+    """
+    Thread-safe LRU mapping with a per-entry expiry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        current = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= current:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        max_entries = getattr(settings, 'CACHE_L1_MAX_ENTRIES', 1000)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalLRUCache()
@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from drf_yasg import openapi
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from shared.utils import standard_response
 
 
@@ -25,3 +32,118 @@ class CustomPagination(PageNumberPagination):
             errors=None,
             status_code=200  # HTTP 200 OK
         )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination for growing tables.
+
+    Rows are ordered on ``ordering``, whose last field must be unique
+    (``id``), and every page starts strictly after the last row of the
+    previous one: the cursor holds that row's ordering values, so a page is
+    an index range scan whatever its depth, and no COUNT is run. A row whose
+    ordering values change while a client pages moves across the cursor, so
+    it can be skipped or listed twice.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = "Invalid cursor."
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, row):
+        values = [getattr(row, field.lstrip('-')) for field in self.ordering]
+        # isoformat() keeps the microseconds (DjangoJSONEncoder truncates them to milliseconds)
+        position = json.dumps(values, default=lambda value: value.isoformat(), separators=(',', ':'))
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        """
+        Rows strictly after ``values`` in the ordering:
+        a > va OR (a = va AND b > vb) OR ..., with < for descending fields.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        # Redundant bound on the leading field so the database starts the index scan at the cursor
+        leading = self.ordering[0]
+        bound = Q(**{f"{leading.lstrip('-')}__{'lte' if leading.startswith('-') else 'gte'}": values[0]})
+        return bound & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        values = self.decode_cursor(request)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.after(values))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One extra row tells whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data, message="Data fetched successfully."):
+        """
+        Paginated items in the standard response format.
+        """
+        return standard_response(
+            success=True,
+            message=message,
+            data={
+                "items": data,
+                "pagination": {
+                    "next_cursor": self.next_cursor,
+                    "has_next": self.has_next,
+                    "page_size": self.page_size,
+                }
+            },
+            errors=None,
+            status_code=200
+        )
+
+
+# Query parameters of KeysetPagination, for swagger_auto_schema
+KEYSET_PAGINATION_PARAMETERS = [
+    openapi.Parameter(
+        'cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description="next_cursor of the previous page (omit for the first page)",
+    ),
+    openapi.Parameter(
+        'page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+        description=f"Items per page (default {KeysetPagination.page_size}, max {KeysetPagination.max_page_size})",
+    ),
+]
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        if getattr(settings, 'DAILY_RESET_SCHEDULER_ENABLED', False):
+            from .daily_reset import start_scheduler
+            start_scheduler()
@@ -0,0 +1,147 @@
+"""
+Cached authentication principal.
+
+The few user fields needed to authenticate a request (session UUIDs,
+is_active, is_staff...) are cached per user in Redis, with a short-lived
+in-process copy in front of it, so authenticating a request needs no query.
+Views get a PrincipalUser that loads the full User row only when a field
+outside the principal is used.
+
+The cache is invalidated by User.save() whenever one of the principal fields
+is saved, logins and logouts included as they rotate the session UUIDs. The
+in-process copy of other processes may lag behind for AUTH_PRINCIPAL_L1_TTL
+seconds, so a principal that fails authentication is re-read without it.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger('cache_operations')
+
+PRINCIPAL_FIELDS = (
+    'id', 'username', 'is_active', 'is_staff', 'is_superuser', 'session_uuid_user', 'session_uuid_admin',
+)
+# Bound of the in-process copy, it is simply emptied when full
+L1_MAX_ENTRIES = 10000
+
+_l1 = {}
+_l1_lock = threading.Lock()
+
+
+def principal_key(user_id):
+    return f"auth_principal:{user_id}"
+
+
+def _load(user_id):
+    values = get_user_model().objects.filter(pk=user_id).values(*PRINCIPAL_FIELDS).first()
+    if values is None:
+        return None
+    values['session_uuid_user'] = str(values['session_uuid_user'])
+    values['session_uuid_admin'] = str(values['session_uuid_admin'])
+    return values
+
+
+def get_principal(user_id, use_l1=True):
+    """
+    Principal fields of the user as a dict, or None when the user does not exist.
+
+    ``use_l1=False`` skips the in-process copy, which other processes cannot
+    invalidate: a principal that fails authentication is re-read this way
+    before the request is rejected.
+    """
+    current = time.monotonic()
+    if use_l1:
+        with _l1_lock:
+            entry = _l1.get(user_id)
+        if entry and entry[0] > current:
+            return entry[1]
+
+    principal = None
+    try:
+        principal = cache.get(principal_key(user_id))
+    except Exception as e:
+        logger.warning(f"Auth principal cache read failed for user {user_id}: {e}")
+    if principal is None:
+        principal = _load(user_id)
+        if principal is None:
+            return None
+        try:
+            cache.set(principal_key(user_id), principal, getattr(settings, 'AUTH_PRINCIPAL_TTL', 300))
+        except Exception as e:
+            logger.warning(f"Auth principal cache write failed for user {user_id}: {e}")
+
+    with _l1_lock:
+        if len(_l1) >= L1_MAX_ENTRIES:
+            _l1.clear()
+        # Kept short: other processes cannot drop their copy on invalidation
+        _l1[user_id] = (current + getattr(settings, 'AUTH_PRINCIPAL_L1_TTL', 5), principal)
+    return principal
+
+
+def invalidate_principal(user_id):
+    """
+    Drop the cached principal of the user, after a login, logout, password or status change.
+    """
+    with _l1_lock:
+        _l1.pop(user_id, None)
+    try:
+        cache.delete(principal_key(user_id))
+    except Exception as e:
+        logger.warning(f"Auth principal invalidation failed for user {user_id}: {e}")
+
+
+class PrincipalUser(SimpleLazyObject):
+    """
+    Stand-in for the authenticated User. Principal fields are answered from
+    the cache; any other attribute loads the User row once and is delegated
+    to it. Attributes set before the row is loaded are applied to it on load.
+    """
+
+    def __init__(self, principal):
+        user_id = principal['id']
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        self.__dict__['_principal'] = principal
+        self.__dict__['_pending'] = {}
+
+    def _setup(self):
+        super()._setup()
+        for name, value in self.__dict__['_pending'].items():
+            setattr(self._wrapped, name, value)
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            principal = self.__dict__['_principal']
+            pending = self.__dict__['_pending']
+            if name in pending:
+                return pending[name]
+            if name in principal:
+                return principal[name]
+            if name == 'pk':
+                return principal['id']
+            if name == 'is_authenticated':
+                return True
+            if name == 'is_anonymous':
+                return False
+        return super().__getattr__(name)
+
+    def __setattr__(self, name, value):
+        if name == '_wrapped' or self._wrapped is not empty:
+            super().__setattr__(name, value)
+        else:
+            self.__dict__['_pending'][name] = value
+
+    def __bool__(self):
+        return True
+
+    def __hash__(self):
+        # Same as Model.__hash__
+        return hash(self.__dict__['_principal']['id'])
+
+    @property
+    def is_loaded(self):
+        return self._wrapped is not empty
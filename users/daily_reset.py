@@ -0,0 +1,250 @@
+"""
+Daily reset of the users' submission counters.
+
+The reset runs out of the request path: from the ``run_daily_reset``
+management command (cron), from the optional in-process scheduler thread, or
+handed to a background thread by ConfigurableResetMiddleware. A row lock on
+the DailyResetTracker makes sure only one worker performs a given reset.
+"""
+import logging
+import threading
+import time as clock
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import pytz
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.utils.timezone import now
+
+from administration.models import DailyResetTracker
+from game.models import Game
+from shared.helpers import get_settings
+from wallet.models import Wallet
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# DST transitions make some days 23 or 25 hours long
+DST_SLACK = timedelta(hours=1)
+
+_background_lock = threading.Lock()
+_scheduler_thread = None
+
+
+def get_reset_timezone():
+    """
+    DAILY_RESET_TIMEZONE when set, otherwise the admin Settings.timezone.
+    """
+    name = getattr(settings, 'DAILY_RESET_TIMEZONE', '')
+    if not name:
+        admin_settings = get_settings()
+        name = getattr(admin_settings, 'timezone', '') or 'UTC'
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        logger.warning(f"Unknown reset timezone {name!r}, falling back to UTC")
+        return pytz.UTC
+
+
+def get_reset_interval(tracker):
+    hours = float(tracker.reset_interval_hours or 0)
+    # A zero or negative interval would reset on every check
+    return timedelta(hours=hours if hours > 0 else 24)
+
+
+def latest_boundary(current_time, tz, interval):
+    """
+    Most recent reset boundary at or before ``current_time``: local midnight,
+    plus whole intervals when the interval is shorter than a day.
+    """
+    local_time = current_time.astimezone(tz)
+    midnight = tz.localize(datetime.combine(local_time.date(), time.min))
+    if interval < timedelta(days=1):
+        midnight += ((local_time - midnight) // interval) * interval
+    return midnight.astimezone(pytz.UTC)
+
+
+def next_boundary(boundary, tz, interval):
+    """
+    First reset boundary after ``boundary``.
+    """
+    if interval < timedelta(days=1):
+        candidate = boundary + interval
+        next_midnight = latest_boundary(boundary + timedelta(days=1, hours=1), tz, timedelta(days=1))
+        return min(candidate, next_midnight)
+    return latest_boundary(boundary + interval + DST_SLACK, tz, timedelta(days=1))
+
+
+def is_due(tracker, boundary, interval):
+    if tracker.last_reset_time >= boundary:
+        return False
+    if interval > timedelta(days=1):
+        # Multi-day intervals: only reset on the midnight that completes the interval
+        return boundary - tracker.last_reset_time >= interval - DST_SLACK
+    return True
+
+
+def pending_special_game_exists():
+    """
+    True for users that still have a pending special game, to use in filters
+    and conditions on the user table.
+    """
+    return Exists(Game.objects.filter(
+        user=OuterRef('pk'), played=False, pending=True, is_active=True, special_product=True
+    ))
+
+
+def next_chunk_end(cursor, chunk_size):
+    """
+    Id of the last user of the chunk following ``cursor``, or None when it is the last chunk.
+    """
+    return User.objects.filter(pk__gt=cursor).order_by('pk').values_list('pk', flat=True)[chunk_size - 1:chunk_size].first()
+
+
+def reset_users_chunk(cursor, chunk_end):
+    """
+    Reset the users with cursor < id <= chunk_end (no upper bound when chunk_end is None)
+    with three set-based UPDATEs. Returns the number of users reset.
+
+    Every user gets number_of_submission_set_today and the wallet salary back
+    to 0; today_profit is kept for users that still have a pending special game.
+    """
+    users = User.objects.filter(pk__gt=cursor)
+    if chunk_end is not None:
+        users = users.filter(pk__lte=chunk_end)
+
+    updated = users.update(
+        number_of_submission_set_today=0,
+        today_profit=Case(
+            When(pending_special_game_exists(), then=F('today_profit')),
+            default=Value(Decimal('0.00')),
+        ),
+    )
+    wallets = Wallet.objects.filter(user__in=users.values('pk'))
+    wallets.update(salary=Decimal('0.00'), updated_at=now())
+    # Saving the wallets used to assign a pack to those without an active one
+    Wallet.assign_missing_packs(wallets)
+    return updated
+
+
+def perform_reset(chunk_size=None):
+    """
+    Reset user fields to their default values, chunk by chunk, in one run.
+    Not resumable; run_daily_reset tracks the progress instead.
+    """
+    chunk_size = chunk_size or getattr(settings, 'DAILY_RESET_CHUNK_SIZE', 5000)
+    cursor = 0
+    total = 0
+    while True:
+        chunk_end = next_chunk_end(cursor, chunk_size)
+        with transaction.atomic():
+            total += reset_users_chunk(cursor, chunk_end)
+        if chunk_end is None:
+            return total
+        cursor = chunk_end
+
+
+def run_daily_reset(force=False):
+    """
+    Perform the reset when a boundary has passed since the last one.
+
+    Users are reset in id-ordered chunks of DAILY_RESET_CHUNK_SIZE, one
+    transaction per chunk. Each chunk locks the tracker row and stores the
+    last reset user id in it, so an interrupted reset resumes after the last
+    committed chunk, and a worker finding the row locked leaves the chunk to
+    the lock holder.
+    Returns a tuple: (reset_done: bool, next_reset_at: datetime or None)
+    """
+    DailyResetTracker.objects.get_or_create(id=1)
+    tz = get_reset_timezone()
+    current_time = now()
+    chunk_size = getattr(settings, 'DAILY_RESET_CHUNK_SIZE', 5000)
+
+    while True:
+        with transaction.atomic():
+            tracker = DailyResetTracker.objects.select_for_update(skip_locked=True).filter(id=1).first()
+            if tracker is None:
+                return False, None
+
+            interval = get_reset_interval(tracker)
+            boundary = latest_boundary(current_time, tz, interval)
+            if tracker.reset_in_progress_for != boundary:
+                if not force and not is_due(tracker, boundary, interval):
+                    return False, next_boundary(boundary, tz, interval)
+                # New reset, or an unfinished one for an older boundary: start over
+                tracker.reset_in_progress_for = boundary
+                tracker.reset_cursor = 0
+                force = False
+
+            cursor = tracker.reset_cursor
+            chunk_end = next_chunk_end(cursor, chunk_size)
+            count = reset_users_chunk(cursor, chunk_end)
+
+            if chunk_end is None:
+                # Store the boundary itself, so the next run is aligned on it
+                tracker.last_reset_time = boundary
+                tracker.reset_in_progress_for = None
+                tracker.reset_cursor = 0
+            else:
+                tracker.reset_cursor = chunk_end
+            tracker.save(update_fields=['last_reset_time', 'reset_in_progress_for', 'reset_cursor'])
+
+        logger.info(
+            f"Daily reset {boundary.isoformat()}: {count} users reset "
+            f"({'done' if chunk_end is None else f'up to id {chunk_end}'})"
+        )
+        if chunk_end is None:
+            return True, next_boundary(boundary, tz, interval)
+
+
+def _run_in_background():
+    close_old_connections()
+    try:
+        run_daily_reset()
+    except Exception as e:
+        logger.error(f"Daily reset failed: {e}")
+    finally:
+        connection.close()
+        _background_lock.release()
+
+
+def run_daily_reset_in_background():
+    """
+    Run the reset check in a daemon thread, unless one is already running in this process.
+    """
+    if not _background_lock.acquire(blocking=False):
+        return
+    threading.Thread(target=_run_in_background, name='daily-reset', daemon=True).start()
+
+
+def run_scheduler(poll_interval=None):
+    """
+    Run the reset check at every boundary, forever. Also re-checks every
+    ``poll_interval`` seconds to pick up interval changes made in the admin.
+    """
+    poll_interval = poll_interval or getattr(settings, 'DAILY_RESET_CHECK_INTERVAL', 60)
+    while True:
+        close_old_connections()
+        wait = poll_interval
+        try:
+            _, next_reset_at = run_daily_reset()
+            if next_reset_at:
+                wait = min(poll_interval, max((next_reset_at - now()).total_seconds(), 1))
+        except Exception as e:
+            logger.error(f"Daily reset failed: {e}")
+        clock.sleep(wait)
+
+
+def start_scheduler():
+    """
+    Start the in-process scheduler thread once per process.
+    """
+    global _scheduler_thread
+    if _scheduler_thread is not None:
+        return
+    _scheduler_thread = threading.Thread(target=run_scheduler, name='daily-reset-scheduler', daemon=True)
+    _scheduler_thread.start()
@@ -0,0 +1,222 @@
+"""
+Write-coalescing tracker of the users' last_connection.
+
+Authenticated requests only record a timestamp, at most once per
+LAST_CONNECTION_WRITE_INTERVAL seconds per user and process, into a Redis
+hash shared by every worker (or an in-process buffer without Redis). The
+buffer is written to the database in bulk by ``flush()``, which runs every
+LAST_CONNECTION_FLUSH_INTERVAL seconds in a background thread, from the
+``flush_last_connections`` command, and before admin reads of last_connection.
+
+The recorded users are also added to a Redis set per local day, whose
+cardinality is the dashboard's count of users connected today
+(``count_active_today()``).
+"""
+import logging
+import threading
+import time
+from datetime import datetime, time as dt_time
+
+import pytz
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.timezone import localdate, make_aware
+
+logger = logging.getLogger('cache_operations')
+
+User = get_user_model()
+
+# Rows per UPDATE statement
+FLUSH_BATCH_SIZE = 1000
+
+# Lifetime (seconds) of a day's set of connected users
+ACTIVE_SET_TTL = 2 * 24 * 3600
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_local_buffer = {}
+_last_recorded = {}
+_next_flush = 0
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception:
+        return None
+
+
+def buffer_key():
+    return cache.make_key("last_connection_buffer")
+
+
+def active_key(day):
+    return cache.make_key(f"active_users:{day.isoformat()}")
+
+
+def write_interval():
+    return getattr(settings, 'LAST_CONNECTION_WRITE_INTERVAL', 60)
+
+
+def flush_interval():
+    return getattr(settings, 'LAST_CONNECTION_FLUSH_INTERVAL', 60)
+
+
+def touch(user):
+    """
+    Record that ``user`` is connected now. Sets user.last_connection on the
+    instance; the database is updated by the next flush.
+    """
+    global _next_flush
+    current = time.time()
+    user.last_connection = datetime.fromtimestamp(current, tz=pytz.UTC)
+
+    with _lock:
+        if current - _last_recorded.get(user.pk, 0) < write_interval():
+            return
+        _last_recorded[user.pk] = current
+        flush_due = current >= _next_flush
+        if flush_due:
+            _next_flush = current + flush_interval()
+
+    redis = _redis()
+    recorded = False
+    if redis is not None:
+        try:
+            active = active_key(localdate(user.last_connection))
+            pipe = redis.pipeline(transaction=False)
+            pipe.hset(buffer_key(), user.pk, current)
+            pipe.sadd(active, user.pk)
+            pipe.expire(active, ACTIVE_SET_TTL)
+            pipe.execute()
+            recorded = True
+        except Exception as e:
+            logger.warning(f"Last connection buffer write failed: {e}")
+    if not recorded:
+        with _lock:
+            _local_buffer[user.pk] = current
+
+    if flush_due:
+        flush_in_background()
+
+
+def _take_buffer():
+    """
+    Remove and return the buffered {user_id: timestamp} entries.
+    """
+    entries = {}
+    redis = _redis()
+    if redis is not None:
+        try:
+            pipe = redis.pipeline(transaction=True)
+            pipe.hgetall(buffer_key())
+            pipe.delete(buffer_key())
+            values, _ = pipe.execute()
+            entries = {int(user_id): float(timestamp) for user_id, timestamp in values.items()}
+        except Exception as e:
+            logger.warning(f"Last connection buffer read failed: {e}")
+    with _lock:
+        for user_id, timestamp in _local_buffer.items():
+            entries[user_id] = max(timestamp, entries.get(user_id, 0))
+        _local_buffer.clear()
+        # Throttle entries older than the write interval are no longer needed
+        threshold = time.time() - write_interval()
+        for user_id in [user_id for user_id, recorded in _last_recorded.items() if recorded < threshold]:
+            del _last_recorded[user_id]
+    return entries
+
+
+def _bulk_update(entries):
+    """
+    Write {user_id: datetime} with one UPDATE per batch, never moving a
+    last_connection backwards.
+    """
+    table = connection.ops.quote_name(User._meta.db_table)
+    pk_column = connection.ops.quote_name(User._meta.pk.column)
+    column = connection.ops.quote_name(User._meta.get_field('last_connection').column)
+    items = list(entries.items())
+
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        if connection.vendor == 'postgresql':
+            values = ', '.join(['(%s, %s::timestamptz)'] * len(batch))
+            params = [value for item in batch for value in item]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET {column} = v.seen_at "
+                    f"FROM (VALUES {values}) AS v(id, seen_at) "
+                    f"WHERE {table}.{pk_column} = v.id "
+                    f"AND ({table}.{column} IS NULL OR {table}.{column} < v.seen_at)",
+                    params,
+                )
+        else:
+            # Same guard as above: keep the stored value when it is more recent
+            users = [
+                User(pk=user_id, last_connection=Greatest(Coalesce('last_connection', Value(seen_at)), Value(seen_at)))
+                for user_id, seen_at in batch
+            ]
+            User.objects.bulk_update(users, ['last_connection'])
+
+
+def flush():
+    """
+    Write the buffered timestamps to the database. Returns the number of users updated.
+    """
+    with _flush_lock:
+        entries = _take_buffer()
+        if not entries:
+            return 0
+        try:
+            with transaction.atomic():
+                _bulk_update({
+                    user_id: datetime.fromtimestamp(timestamp, tz=pytz.UTC)
+                    for user_id, timestamp in entries.items()
+                })
+        except Exception:
+            # Put the entries back for the next flush
+            with _lock:
+                for user_id, timestamp in entries.items():
+                    _local_buffer[user_id] = max(timestamp, _local_buffer.get(user_id, 0))
+            raise
+    return len(entries)
+
+
+def _flush_in_background():
+    close_old_connections()
+    try:
+        flush()
+    except Exception as e:
+        logger.error(f"Last connection flush failed: {e}")
+    finally:
+        connection.close()
+
+
+def flush_in_background():
+    threading.Thread(target=_flush_in_background, name='last-connection-flush', daemon=True).start()
+
+
+def start_of_today():
+    """
+    Local midnight of the current day.
+    """
+    return make_aware(datetime.combine(localdate(), dt_time()))
+
+
+def count_active_today():
+    """
+    Number of users connected since local midnight, from the day's Redis set.
+    Without Redis, the buffer is flushed and last_connection is counted.
+    """
+    redis = _redis()
+    if redis is not None:
+        try:
+            return redis.scard(active_key(localdate()))
+        except Exception as e:
+            logger.warning(f"Active users count failed: {e}")
+    flush()
+    return User.objects.filter(last_connection__gte=start_of_today()).count()
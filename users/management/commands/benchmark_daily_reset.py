@@ -0,0 +1,123 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from game.models import Game
+from packs.models import Pack
+from users.daily_reset import perform_reset
+from wallet.models import Wallet
+
+User = get_user_model()
+
+
+def legacy_perform_reset():
+    """
+    Previous ConfigurableResetMiddleware.perform_reset, kept here as the benchmark baseline.
+    """
+    users_with_pending_games = User.objects.filter(
+        games__played=False, games__pending=True, games__is_active=True, games__special_product=True
+    ).distinct()
+
+    users_with_pending_games.update(
+        number_of_submission_set_today=0
+    )
+    for user in users_with_pending_games:
+        if hasattr(user, "wallet"):
+            user.wallet.salary = 0
+            user.wallet.save()
+
+    other_users = User.objects.exclude(id__in=users_with_pending_games)
+    other_users.update(
+        today_profit=0.00,
+        number_of_submission_set_today=0
+    )
+    for user in other_users:
+        if hasattr(user, "wallet"):
+            user.wallet.salary = 0
+            user.wallet.save()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the chunked set-based daily reset with the previous per-user reset "
+        "on seeded users. Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--pending-ratio', type=float, default=0.05,
+                            help="Share of seeded users with a pending special game")
+        parser.add_argument('--skip-legacy', action='store_true', help="Only run the set-based reset")
+
+    def seed(self, count, pending_ratio):
+        pack = Pack.objects.filter(is_active=True).order_by('usd_value').first()
+        if pack is None:
+            raise CommandError("An active pack is required to seed wallets.")
+        prefix = uuid.uuid4().hex[:8]
+        batch_size = 5000
+        for start in range(0, count, batch_size):
+            usernames = [f"rst_{prefix}_{i}" for i in range(start, min(start + batch_size, count))]
+            User.objects.bulk_create(
+                [
+                    User(
+                        username=username,
+                        email=f"{username}@example.com",
+                        phone_number=f"{prefix[:4]}{username.rsplit('_', 1)[1]}",
+                        today_profit=Decimal('12.50'),
+                        number_of_submission_set_today=2,
+                    )
+                    for username in usernames
+                ],
+                batch_size=batch_size,
+            )
+            # Primary keys are not returned by bulk_create on every backend
+            seeded = list(User.objects.filter(username__in=usernames))
+            Wallet.objects.bulk_create(
+                [Wallet(user=user, balance=Decimal('150.00'), salary=Decimal('3.00'), package=pack) for user in seeded],
+                batch_size=batch_size,
+            )
+            step = max(int(1 / pending_ratio), 1) if pending_ratio > 0 else 0
+            if step:
+                Game.objects.bulk_create(
+                    [
+                        Game(user=user, pending=True, special_product=True, amount=Decimal('10.00'))
+                        for position, user in enumerate(seeded) if position % step == 0
+                    ],
+                    batch_size=batch_size,
+                )
+
+    def restore(self):
+        User.objects.update(today_profit=Decimal('12.50'), number_of_submission_set_today=2)
+        Wallet.objects.update(salary=Decimal('3.00'))
+
+    def measure(self, label, func):
+        # Counted with a wrapper: the debug query log only keeps the last 9000 queries
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(1)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<10} {elapsed:8.2f} s  {len(queries):>8} queries")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['users']} users...")
+            self.seed(options['users'], options['pending_ratio'])
+
+            if not options['skip_legacy']:
+                self.measure("legacy", legacy_perform_reset)
+                self.restore()
+            self.measure("set-based", lambda: perform_reset(options['chunk_size']))
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark completed (changes rolled back)."))
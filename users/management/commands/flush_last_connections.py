@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users import last_seen
+
+
+class Command(BaseCommand):
+    help = "Write the buffered last_connection timestamps to the database. Meant to be run periodically."
+
+    def handle(self, *args, **options):
+        updated = last_seen.flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed last connection of {updated} users."))
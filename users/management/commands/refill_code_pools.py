@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from shared.helpers import invitation_code_allocator, rating_no_allocator
+
+
+class Command(BaseCommand):
+    help = "Pre-generate unused invitation/referral codes and rating numbers into the allocator pools."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=None, help="Target pool size (defaults to CODE_POOL_SIZE)")
+        parser.add_argument('--clear', action='store_true', help="Empty the pools before refilling them")
+
+    def handle(self, *args, **options):
+        for allocator in (invitation_code_allocator, rating_no_allocator):
+            if options['clear']:
+                allocator.clear()
+            added = allocator.refill(options['size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{allocator.name}: added {added} codes, pool now holds {allocator.pool_length()} codes."
+                )
+            )
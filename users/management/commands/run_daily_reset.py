@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from users.daily_reset import run_daily_reset, run_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Reset the users' daily submission counters when the reset boundary has passed. "
+        "Meant to be run from cron, or with --loop as a long-running scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Reset even if the current boundary was already reset")
+        parser.add_argument('--loop', action='store_true', help="Keep running and reset at every boundary")
+
+    def handle(self, *args, **options):
+        if options['loop']:
+            self.stdout.write("Daily reset scheduler started.")
+            run_scheduler()
+            return
+
+        reset_done, next_reset_at = run_daily_reset(force=options['force'])
+        if reset_done:
+            self.stdout.write(self.style.SUCCESS("Daily reset performed."))
+        elif next_reset_at is None:
+            self.stdout.write(self.style.WARNING("Another worker is running the daily reset."))
+        else:
+            self.stdout.write("No reset due.")
+        if next_reset_at:
+            self.stdout.write(f"Next reset at {next_reset_at.isoformat()}.")
@@ -1,10 +1,6 @@
-from datetime import datetime
-from django.utils.timezone import now
-from django.utils.timezone import now, timedelta
-from administration.models import DailyResetTracker
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils.timezone import now
-import pytz
+from . import daily_reset, last_seen
 import random
 
 User = get_user_model()
@@ -21,8 +17,7 @@ class UpdateLastConnectionMiddleware:
     def __call__(self, request):
         # Update last_connection only for authenticated users
         if request.user.is_authenticated:
-            request.user.last_connection = now()
-            request.user.save(update_fields=['last_connection'])
+            last_seen.touch(request.user)
 
         response = self.get_response(request)
         return response
@@ -47,10 +42,33 @@ class SlowDownMiddleware:
         return response
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import AuthenticationFailed
-from django.utils.timezone import now
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .auth_principal import PrincipalUser, get_principal
 
 class CustomJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        """
+        Authenticate from the cached principal; the User row is only loaded
+        if the view uses a field outside of it.
+        """
+        if api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != 'id':
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        principal = get_principal(user_id)
+        if principal is not None and not principal['is_active']:
+            # The in-process copy may predate a reactivation made by another process
+            principal = get_principal(user_id, use_l1=False)
+        if principal is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not principal['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return PrincipalUser(principal)
+
     def authenticate(self, request):
         user_and_token = super().authenticate(request)
         if not user_and_token:
@@ -63,101 +81,42 @@ class CustomJWTAuthentication(JWTAuthentication):
         
         sid = payload.get("sid")
         surf = payload.get("surf", "user")
-        current_sid = str(getattr(user, "session_uuid_admin" if surf == "admin" else "session_uuid_user", ""))
+        sid_field = "session_uuid_admin" if surf == "admin" else "session_uuid_user"
+        current_sid = str(getattr(user, sid_field, ""))
+        if sid and sid != current_sid and isinstance(user, PrincipalUser):
+            # The in-process copy may predate a login handled by another process
+            principal = get_principal(user.pk, use_l1=False)
+            if principal is not None and principal['is_active']:
+                user = PrincipalUser(principal)
+                current_sid = principal[sid_field]
         if not sid or sid != current_sid:
             raise AuthenticationFailed("Session has been invalidated. Please log in again.")
 
         if not user.is_staff:
-            user.last_connection = now()
-            user.save(update_fields=['last_connection'])
+            # Buffered, written in bulk by last_seen.flush()
+            last_seen.touch(user)
         return (user, validated_token)
 
 
 class ConfigurableResetMiddleware:
     """
-    Middleware to reset user submission-related fields based on a configurable time interval.
+    Safety net for the daily reset when no scheduler runs it.
+
+    Only compares the time with a timestamp kept in memory; once it has passed,
+    the reset check is handed to a background thread (see users.daily_reset)
+    so no request waits for it.
     """
     def __init__(self, get_response):
         self.get_response = get_response
+        self.next_check = 0
 
     def __call__(self, request):
-        # Ensure the reset action is performed
-        self.check_and_reset_fields()
+        current = time.time()
+        if current >= self.next_check:
+            # Re-check at least every DAILY_RESET_CHECK_INTERVAL seconds, and soon after a due reset
+            self.next_check = current + getattr(settings, 'DAILY_RESET_CHECK_INTERVAL', 60)
+            daily_reset.run_daily_reset_in_background()
 
         # Proceed with the response
         response = self.get_response(request)
         return response
-
-    # def check_and_reset_fields(self):
-    #     """
-    #     Check the last reset time and reset fields if the interval has passed.
-    #     """
-    #     # Get or create the tracker entry
-    #     tracker, created = DailyResetTracker.objects.get_or_create(id=1)  # Use a fixed ID for simplicity
-
-    #     # Calculate the reset interval in hours
-    #     reset_interval = timedelta(hours=float(tracker.reset_interval_hours))  # Convert to float
-
-    #     # Perform reset if the interval has passed
-    #     if now() >= tracker.last_reset_time + reset_interval:
-    #         self.perform_reset()
-    #         # Update the last reset time
-    #         tracker.last_reset_time = now()
-    #         tracker.save()
-
-
-    def check_and_reset_fields(self):
-        # Define Eastern Time timezone
-        eastern_time = pytz.timezone("US/Eastern")
-
-        # Get or create tracker entry
-        tracker, created = DailyResetTracker.objects.get_or_create(id=1)
-
-        # Calculate today's 12:00 AM in Eastern Time
-        today_midnight = now().astimezone(eastern_time).replace(hour=0, minute=0, second=0, microsecond=0)
-
-        # Convert today's midnight to UTC
-        today_midnight_utc = today_midnight.astimezone(pytz.UTC)
-
-        # Perform reset if last reset time is earlier than today's midnight
-        if tracker.last_reset_time < today_midnight_utc:
-            self.perform_reset()
-            # Update the last reset time to today's midnight in UTC
-            tracker.last_reset_time = today_midnight_utc
-            tracker.save()
-
-
-    def perform_reset(self):
-        """
-        Reset user fields to their default values.
-        """
-        try:
-            users_with_pending_games = User.objects.filter(
-                games__played=False, games__pending=True, games__is_active=True, games__special_product=True
-            ).distinct()
-
-            # Reset wallet salary for users with pending games
-            users_with_pending_games.update(
-                number_of_submission_set_today=0
-            )
-            for user in users_with_pending_games:
-                if hasattr(user, "wallet"):
-                    user.wallet.salary = 0
-                    user.wallet.save()
-
-            # Reset other users' fields in bulk
-            other_users = User.objects.exclude(id__in=users_with_pending_games)
-            other_users.update(
-                # number_of_submission_today=0,
-                today_profit=0.00,
-                number_of_submission_set_today=0
-            )
-            for user in other_users:
-                if hasattr(user, "wallet"):
-                    user.wallet.salary = 0
-                    user.wallet.save()
-
-            print("User fields reset successfully.")
-        except Exception as e:
-            print(f"Error in perform_reset: {e}")
-
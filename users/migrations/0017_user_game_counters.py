@@ -0,0 +1,50 @@
+# Generated by Django 3.2.21 on 2026-10-16 23:39
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_game_counters(apps, schema_editor):
+    """
+    Fill the new counters from the played games (see game.counters).
+    """
+    User = apps.get_model('users', 'User')
+    Game = apps.get_model('game', 'Game')
+    played = Game.objects.filter(user=OuterRef('pk'), played=True, is_active=True).order_by().values('user')
+
+    def total(queryset, aggregate, output_field):
+        return Coalesce(Subquery(queryset.annotate(total=aggregate).values('total')[:1]), Value(0), output_field=output_field)
+
+    User.objects.update(
+        games_played_count=total(played, Count('pk'), IntegerField()),
+        special_games_played_count=total(played.filter(special_product=True), Count('pk'), IntegerField()),
+        lifetime_commission=total(played, Sum('commission'), DecimalField(max_digits=14, decimal_places=2)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_auto_20250814_1457'),
+        ('game', '0014_game_record_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='games_played_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='the total number of games played'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='lifetime_commission',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0.0, max_digits=14, verbose_name='The total commission earned from played games'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='special_games_played_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='the total number of special games played'),
+        ),
+        migrations.RunPython(backfill_game_counters, migrations.RunPython.noop),
+    ]
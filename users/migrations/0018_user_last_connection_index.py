@@ -0,0 +1,18 @@
+# Generated by Django 3.2.21 on 2026-10-16 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_user_game_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='last_connection',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Last Connection'),
+        ),
+    ]
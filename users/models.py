@@ -5,7 +5,12 @@ from django.core.validators import RegexValidator
 import uuid
 
 from shared.enums import GenderEnum
-from shared.helpers import generate_invitation_code
+from shared.helpers import allocate_invitation_codes
+from .auth_principal import PRINCIPAL_FIELDS, invalidate_principal
+
+# Saving any of these fields drops the cached auth principal
+AUTH_PRINCIPAL_SAVE_FIELDS = frozenset(PRINCIPAL_FIELDS) | {'password'}
+
 
 class UserQuerySet(models.QuerySet):
     """
@@ -103,6 +108,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     last_connection = models.DateTimeField(
         blank=True, 
         null=True, 
+        db_index=True,
         verbose_name="Last Connection"
     )
     is_min_balance_for_submission_removed = models.BooleanField(default=False)
@@ -155,23 +161,30 @@ class User(AbstractBaseUser, PermissionsMixin):
     )
     number_of_submission_set_today = models.IntegerField(null=True,blank=True,verbose_name="the total number of submission done set completed today",default=0)
 
+    # Lifetime totals of the played games, denormalized from Game (see game.counters)
+    games_played_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name="the total number of games played")
+    special_games_played_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name="the total number of special games played")
+    lifetime_commission = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0.00,
+        db_index=True,
+        verbose_name="The total commission earned from played games"
+    )
+
     USERNAME_FIELD = "username"
     EMAIL_FIELD = "email"
     REQUIRED_FIELDS = ["email"]
 
     def save(self, *args, **kwargs):
         if not self.referral_code:
-            # Generate a unique referral code not used by any User or InvitationCode
-            code = generate_invitation_code()
-            # Ensure uniqueness across both User.referral_code and InvitationCode.invitation_code
-            from django.db.models import Q
-            while (
-                User.objects.filter(referral_code=code).exists()
-                or InvitationCode.objects.filter(invitation_code=code).exists()
-            ):
-                code = generate_invitation_code()
-            self.referral_code = code
+            # Unique across both User.referral_code and InvitationCode.invitation_code
+            self.referral_code = allocate_invitation_codes(1)[0]
         super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        # Logins rotate the session UUIDs, status and password changes go through here too
+        if update_fields is None or AUTH_PRINCIPAL_SAVE_FIELDS.intersection(update_fields):
+            invalidate_principal(self.pk)
 
     def check_transactional_password(self,transactional_password):
         return self.transactional_password == transactional_password
@@ -216,12 +229,6 @@ class InvitationCode(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.invitation_code:
-            # Generate a unique invitation code not used by any InvitationCode or User referral_code
-            code = generate_invitation_code()
-            while (
-                InvitationCode.objects.filter(invitation_code=code).exists()
-                or User.objects.filter(referral_code=code).exists()
-            ):
-                code = generate_invitation_code()
-            self.invitation_code = code
+            # Unique across both InvitationCode.invitation_code and User.referral_code
+            self.invitation_code = allocate_invitation_codes(1)[0]
         super().save(*args, **kwargs)
\ No newline at end of file
@@ -5,9 +5,12 @@ from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 
 from .models import Invitation,InvitationCode
+from . import last_seen
 from wallet.models import Wallet,OnHoldPay
 from wallet.serializers import WalletSerializer
+from packs.serializers import PackProfileSerializer
 from administration.serializers import SettingsSerializer
+from administration.stats import get_dashboard_stats
 from shared.helpers import get_settings
 from shared.mixins import AdminPasswordMixin
 from game.models import Product,Game
@@ -247,6 +250,15 @@ class InvitationCodeSerializer(serializers.ModelSerializer):
         fields = ['id', 'invitation_code', 'is_used', 'created_at'] 
 
 
+class InvitationCodeGenerateSerializer(serializers.Serializer):
+    count = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=500,
+        help_text="Number of invitation codes to generate. When omitted a single code object is returned."
+    )
+
+
 
 class UserProfileListSerializer(serializers.ModelSerializer):
     wallet = WalletSerializer.UserWalletSerializer(read_only=True) 
@@ -256,9 +268,24 @@ class UserProfileListSerializer(serializers.ModelSerializer):
     total_negative_product_submitted = serializers.SerializerMethodField(read_only=True)
     class Meta:
         model = User
-        fields = ['id','username','email','phone_number','first_name','last_name','gender','referral_code','profile_picture','last_connection','is_active','date_joined','wallet','total_play','total_available_play','total_product_submitted','total_negative_product_submitted','is_min_balance_for_submission_removed','is_reg_balance_add','number_of_submission_set_today','today_profit']
+        fields = ['id','username','email','phone_number','first_name','last_name','gender','referral_code','profile_picture','last_connection','is_active','date_joined','wallet','total_play','total_available_play','total_product_submitted','total_negative_product_submitted','is_min_balance_for_submission_removed','is_reg_balance_add','number_of_submission_set_today','today_profit','lifetime_commission']
         read_only_fields = ['date_joined','referral_code',]
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Load everything the serializer reads in the list query: the wallet and
+        its pack are joined, with only the serialized columns, so a list costs
+        the same number of queries whatever its length.
+        """
+        return queryset.select_related('wallet__package').only(
+            *(field for field in cls.Meta.fields if field not in cls._declared_fields),
+            'number_of_submission_today', 'games_played_count', 'special_games_played_count',
+            *(f'wallet__{field}' for field in WalletSerializer.UserWalletSerializer.Meta.fields if field != 'package'),
+            *(f'wallet__package__{field}' for field in PackProfileSerializer.Meta.fields),
+            'wallet__package__daily_missions',
+        )
+
     def get_total_play(self,obj):
         return Game.count_games_played_today(obj)
 
@@ -270,14 +297,25 @@ class UserProfileListSerializer(serializers.ModelSerializer):
             return None
 
     def get_total_negative_product_submitted(self,obj):
-        return Game.objects.filter(user=obj,special_product=True,played=True,is_active=True).count()
+        # Maintained by PlayGameService, see game.counters
+        return obj.special_games_played_count
 
     def get_total_product_submitted(self,obj):
-        return Game.objects.filter(user=obj,played=True,is_active=True).count()
+        return obj.games_played_count
 
 
 # ----------------------------------- Admin Serializers -----------------------------------------
 
+class UserActivitySerializer(serializers.ModelSerializer):
+    """
+    Lightweight projection of the users connected today (admin users/active-today).
+    """
+    class Meta:
+        model = User
+        fields = ['id','username','email','phone_number','first_name','last_name','profile_picture','last_connection','is_active']
+        read_only_fields = fields
+
+
 class DashboardSerializer(serializers.Serializer):
     """
     Serializer for admin dashboard data.
@@ -289,106 +327,45 @@ class DashboardSerializer(serializers.Serializer):
     user_registrations_per_month = serializers.SerializerMethodField()
     total_submissions_per_month = serializers.SerializerMethodField()
 
+    @property
+    def stats(self):
+        """
+        Totals read from the DailyStats rollup (see administration.stats), once per serialization.
+        """
+        if not hasattr(self, '_stats'):
+            self._stats = get_dashboard_stats()
+        return self._stats
+
     def get_total_users(self, obj):
-        # Replace with actual logic to calculate total users
-        return User.objects.users().count()
+        return self.stats['total_users']
 
     def get_active_products(self, obj):
-        # Replace with actual logic to calculate active users
-        return Product.objects.count()
+        return self.stats['active_products']
 
     def get_total_submissions(self, obj):
-        # Calculate the start of today
-        start_of_today = now().replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_today = start_of_today + timedelta(days=1)
-
-        # Query to count games created today with `played=True` or `pending=True`
-        count = Game.objects.filter(
-            updated_at__gte=start_of_today,  # From start of today
-            updated_at__lt=end_of_today,    # Until the end of today
-            is_active=True
-        ).filter(
-            Q(played=True) | Q(pending=True)  # Either played or pending
-        ).count()
-        return count
+        # Games played or pending today
+        return self.stats['total_submissions']
     
     def get_total_users_login_today(self, obj):
         """
-        Count the total number of users who logged in today based on their `last_connection` field.
+        Count the users connected today, from the last-seen tracker.
+        The users are listed by the admin users/active-today endpoint.
         """
-        # Calculate the start and end of today
-        start_of_today = now().replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_today = start_of_today + timedelta(days=1)
-
-        # Filter users whose last_connection is within today's range
-        users_today = User.objects.filter(
-            last_connection__gte=start_of_today,
-            last_connection__lt=end_of_today,
-        ).order_by("-last_connection")  # Most recent first
-
-        return {
-            "count": users_today.count(),
-            "users": UserProfileListSerializer(users_today, many=True).data  # Serialize user list
-        }
+        return {"count": last_seen.count_active_today()}
 
     def get_user_registrations_per_month(self, obj):
         """
         Get the number of users registered per month for the current year,
         up to the current month.
         """
-        current_year = now().year
-        current_month = now().month
-
-        # Aggregate data grouped by month
-        registrations = User.objects.users().filter(
-            date_joined__year=current_year
-        ).annotate(
-            month=ExtractMonth('date_joined')  # Extract month from date_joined
-        ).values(
-            'month'
-        ).annotate(
-            count=Count('id')  # Count users for each month
-        ).order_by('month')
-
-        # Initialize all months with 0
-        result = {month: 0 for month in range(1, 13)}
-
-        # Update result with actual counts
-        for reg in registrations:
-            result[reg['month']] = reg['count']
-
-        return result
-        
+        return self.stats['user_registrations_per_month']
         
     def get_total_submissions_per_month(self, obj):
         """
         Get the total number of submissions per month for the current year.
         Includes submissions where played=True or pending=True.
         """
-        current_year = now().year
-        current_month = now().month
-
-        # Query for submissions grouped by month
-        submissions = Game.objects.filter(
-            updated_at__year=current_year,  # Filter by current year
-            is_active=True
-        ).filter(
-            Q(played=True) | Q(pending=True)  # Filter for played or pending
-        ).annotate(
-            month=ExtractMonth('updated_at')  # Group by month
-        ).values(
-            'month'
-        ).annotate(
-            count=Count('id')  # Count games for each month
-        ).order_by('month')
-
-        # Format the result for only the months up to the current month
-        result = {month: 0 for month in range(1, current_month + 1)}
-        for submission in submissions:
-            if submission['month'] <= current_month:  # Ensure only months up to the current month are included
-                result[submission['month']] = submission['count']
-
-        return result
+        return self.stats['total_submissions_per_month']
 
 
 class AdminAuthSerializer:
@@ -1,3 +1,232 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from administration.models import Settings
+from packs.models import Pack
+
+from . import auth_principal, last_seen
+
+User = get_user_model()
+
+
+USERS_TEST_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'users-tests'}},
+    'DEFAULT_FILE_STORAGE': 'django.core.files.storage.FileSystemStorage',
+}
+
+
+@override_settings(**USERS_TEST_SETTINGS)
+class AdminUserListQueryTests(TestCase):
+    """
+    The admin user list loads the users with their wallet and pack in one
+    query, whatever the number of users listed.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # The middleware's background reset thread would share the test database
+        patcher = mock.patch('users.daily_reset.run_daily_reset_in_background')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Pack.objects.create(
+            name="VIP1", usd_value=0, daily_missions=5, daily_withdrawals=1, icon="pack.png",
+            profit_percentage=Decimal("0.5"), short_description="s", description="d",
+        )
+        admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="password", phone_number="admin", is_staff=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def create_users(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password", phone_number=f"user{i}",
+            )
+
+    def list_users(self):
+        response = self.client.get('/site_admin/users/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_query_count_does_not_grow_with_the_list(self):
+        self.create_users(5)
+        with self.assertNumQueries(1):
+            users = self.list_users()
+        self.assertEqual(len(users), 5)
+
+        self.create_users(15)
+        with self.assertNumQueries(1):
+            users = self.list_users()
+        self.assertEqual(len(users), 20)
+        self.assertEqual(users[0]['wallet']['package']['name'], "VIP1")
+        self.assertEqual(users[0]['total_available_play'], 5)
+
+
+@override_settings(**USERS_TEST_SETTINGS)
+class LastConnectionFlushTests(TestCase):
+    """
+    Buffered last_connection timestamps are written in bulk and never move
+    a stored value backwards.
+    """
+
+    def setUp(self):
+        self.now = datetime(2024, 5, 1, 12, 0, tzinfo=pytz.UTC)
+        self.recent = User.objects.create_user(
+            username="recent", email="recent@example.com", password="password", phone_number="recent",
+        )
+        self.stale = User.objects.create_user(
+            username="stale", email="stale@example.com", password="password", phone_number="stale",
+        )
+        self.never = User.objects.create_user(
+            username="never", email="never@example.com", password="password", phone_number="never",
+        )
+        User.objects.filter(pk=self.recent.pk).update(last_connection=self.now)
+        User.objects.filter(pk=self.stale.pk).update(last_connection=self.now - timedelta(hours=1))
+        User.objects.filter(pk=self.never.pk).update(last_connection=None)
+
+    def last_connection(self, user):
+        return User.objects.values_list('last_connection', flat=True).get(pk=user.pk)
+
+    def bulk_update(self):
+        seen_at = self.now - timedelta(minutes=5)
+        last_seen._bulk_update({self.recent.pk: seen_at, self.stale.pk: seen_at, self.never.pk: seen_at})
+        return seen_at
+
+    def test_last_connection_never_moves_backwards(self):
+        seen_at = self.bulk_update()
+
+        self.assertEqual(self.last_connection(self.recent), self.now)
+        self.assertEqual(self.last_connection(self.stale), seen_at)
+        self.assertEqual(self.last_connection(self.never), seen_at)
+
+    @skipUnless(connection.vendor == 'postgresql', "UPDATE ... FROM (VALUES ...) is PostgreSQL only")
+    def test_postgresql_update_from_values(self):
+        with CaptureQueriesContext(connection) as queries:
+            seen_at = self.bulk_update()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn("FROM (VALUES", queries[0]['sql'])
+        self.assertEqual(self.last_connection(self.recent), self.now)
+        self.assertEqual(self.last_connection(self.stale), seen_at)
+        self.assertEqual(self.last_connection(self.never), seen_at)
+
+
+@override_settings(**USERS_TEST_SETTINGS)
+class StalePrincipalTests(TestCase):
+    """
+    Another process keeps its in-process principal copy for up to
+    AUTH_PRINCIPAL_L1_TTL seconds after a login, logout or status change;
+    requests are only rejected once the shared copy fails too.
+    """
+
+    def setUp(self):
+        cache.clear()
+        auth_principal._l1.clear()
+        self.addCleanup(auth_principal._l1.clear)
+        for target in ('users.daily_reset.run_daily_reset_in_background', 'users.last_seen.flush_in_background'):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        Settings.objects.create(
+            percentage_of_sponsors=10,
+            service_availability_start_time="00:00",
+            service_availability_end_time="23:59",
+        )
+        Pack.objects.create(
+            name="VIP1", usd_value=0, daily_missions=5, daily_withdrawals=1, icon="pack.png",
+            profit_percentage=Decimal("0.5"), short_description="s", description="d",
+        )
+        self.user = User.objects.create_user(
+            username="player", email="player@example.com", password="password", phone_number="player",
+        )
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            '/auth/login/', {'username_or_email': "player", 'password': "password"}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def me(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access_token']}")
+        try:
+            return self.client.get('/auth/me/').status_code
+        finally:
+            self.client.credentials()
+
+    def refresh(self, tokens):
+        return self.client.post(
+            '/auth/refresh-token/', {'refresh': tokens['refresh_token']}, format='json',
+        ).status_code
+
+    def keep_stale_copy(self):
+        """
+        Snapshot of this process's copy, to put back as another process would still have it.
+        """
+        self.assertIn(self.user.pk, auth_principal._l1)
+        entry = auth_principal._l1[self.user.pk]
+        return lambda: auth_principal._l1.__setitem__(self.user.pk, entry)
+
+    def test_login_on_another_process(self):
+        old = self.login()
+        self.assertEqual(self.me(old), 200)
+        restore = self.keep_stale_copy()
+
+        new = self.login()
+        restore()
+
+        self.assertEqual(self.me(new), 200)
+        self.assertEqual(self.me(old), 401)
+
+    def test_refresh_after_login_on_another_process(self):
+        old = self.login()
+        self.assertEqual(self.me(old), 200)
+        restore = self.keep_stale_copy()
+
+        new = self.login()
+        restore()
+
+        self.assertEqual(self.refresh(new), 200)
+        self.assertEqual(self.refresh(old), 401)
+
+    def test_logout(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access_token']}")
+        response = self.client.post('/auth/logout/')
+        self.client.credentials()
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.me(tokens), 401)
+        self.assertEqual(self.refresh(tokens), 401)
+        restore = self.keep_stale_copy()
+
+        # Logging in again on another process
+        tokens = self.login()
+        restore()
+        self.assertEqual(self.me(tokens), 200)
+
+    def test_deactivation_and_reactivation(self):
+        tokens = self.login()
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.me(tokens), 401)
+        restore = self.keep_stale_copy()
+
+        # Reactivated on another process
+        self.user.is_active = True
+        self.user.save(update_fields=['is_active'])
+        restore()
+        self.assertEqual(self.me(tokens), 200)
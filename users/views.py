@@ -11,6 +11,7 @@ from .serializers import (
     ChangePasswordSerializer,
     ChangeTransactionalPasswordSerializer,
     InvitationCodeSerializer,
+    InvitationCodeGenerateSerializer,
     AdminAuthSerializer
 )
 from administration.serializers import SettingsSerializer
@@ -31,6 +32,8 @@ from .models import InvitationCode
 from rest_framework_simplejwt.exceptions import InvalidToken
 from shared.helpers import create_user_notification
 from shared.helpers import create_admin_log
+from shared.helpers import allocate_invitation_codes
+from .auth_principal import get_principal
 
 
 class CustomTokenRefreshView(TokenRefreshView):
@@ -52,12 +55,14 @@ class CustomTokenRefreshView(TokenRefreshView):
             user_id = claims.get('user_id')
             sid = claims.get('sid')
             surf = claims.get('surf', 'user')
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            user = User.objects.filter(id=user_id).first()
-            if not user:
+            sid_field = 'session_uuid_admin' if surf == 'admin' else 'session_uuid_user'
+            principal = get_principal(user_id)
+            if principal and sid and sid != principal[sid_field]:
+                # The in-process copy may predate a login handled by another process
+                principal = get_principal(user_id, use_l1=False)
+            if not principal:
                 raise InvalidToken('Invalid token user')
-            expected_sid = str(getattr(user, 'session_uuid_admin' if surf == 'admin' else 'session_uuid_user'))
+            expected_sid = principal[sid_field]
             if not sid or sid != expected_sid:
                 return Response(
                     success=False,
@@ -210,7 +215,10 @@ class UserAuthViewSet(ViewSet):
     )
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def logout(self, request):
-        request.user.auth_token.delete()
+        # Rotate the USER session UUID so the user's tokens stop being accepted (saving invalidates the principal)
+        import uuid
+        request.user.session_uuid_user = uuid.uuid4()
+        request.user.save(update_fields=["session_uuid_user"])
         return Response(
             success=True,
             message="Logout successful.",
@@ -396,11 +404,29 @@ class InvitationCodeViewSet(ViewSet):
     """
     permission_classes = [IsSiteAdmin]
 
+    @swagger_auto_schema(request_body=InvitationCodeGenerateSerializer)
     @action(detail=False, methods=['post'], url_path='generate-code')
     def generate_invitation_code(self, request):
         """
-        Generate a new invitation code.
+        Generate a new invitation code, or `count` codes at once.
         """
+        request_serializer = InvitationCodeGenerateSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+        count = request_serializer.validated_data.get('count')
+
+        if count is not None:
+            # Codes come from the allocator pool and are inserted in one query
+            invitation_codes = InvitationCode.objects.bulk_create(
+                [InvitationCode(invitation_code=code) for code in allocate_invitation_codes(count)]
+            )
+            serializer = InvitationCodeSerializer(invitation_codes, many=True)
+            return Response(
+                success=True,
+                message=f"{len(invitation_codes)} invitation codes generated successfully.",
+                data=serializer.data,
+                status_code=status.HTTP_201_CREATED
+            )
+
         # Create a new InvitationCode instance
         invitation_code = InvitationCode.objects.create()
 
@@ -1,5 +1,8 @@
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Case, F, Q, When
 from django.contrib.auth import get_user_model
+from django.utils.timezone import now
 from django.core.validators import MinValueValidator, MaxValueValidator
 from packs.models import Pack
 from game.models import Game
@@ -150,6 +153,91 @@ class Wallet(models.Model):
         self.balance += amount
         self.save()
 
+    # ------------------------------------------------------------------ #
+    # Atomic mutations: one UPDATE with F-expressions, no full-row save
+    # ------------------------------------------------------------------ #
+    def _apply_update(self, **values):
+        """
+        Apply column expressions to this wallet in a single UPDATE, read the
+        resulting amounts back and refresh this instance with them.
+        Returns a dict with the new balance, on_hold and commission.
+        """
+        values['updated_at'] = now()
+        with transaction.atomic():
+            Wallet.objects.filter(pk=self.pk).update(**values)
+            amounts = Wallet.objects.filter(pk=self.pk).values('balance', 'on_hold', 'commission', 'updated_at').get()
+        for field, value in amounts.items():
+            setattr(self, field, value)
+        amounts.pop('updated_at')
+        return amounts
+
+    def atomic_credit(self, amount, commission=Decimal('0')):
+        """
+        Same rules as credit() followed by credit_commission(), in one statement:
+        the amount is added to the balance and, once the balance is no longer
+        negative, the on_hold amount is moved back to the balance.
+        """
+        if commission < 0:
+            raise ValueError("Credit amount must be positive.")
+
+        # Every SET expression sees the row as it was before the update
+        releases_hold = Q(balance__gte=-amount, on_hold__gt=0)
+        return self._apply_update(
+            balance=Case(
+                When(releases_hold, then=F('balance') + amount + F('on_hold')),
+                default=F('balance') + amount,
+            ),
+            on_hold=Case(
+                When(releases_hold, then=Decimal('0')),
+                default=F('on_hold'),
+            ),
+            commission=F('commission') + commission,
+        )
+
+    def atomic_debit(self, amount):
+        """
+        Same rules as debit(), in one statement: the balance may go negative,
+        in which case the debited amount is kept on hold.
+        """
+        if amount < 0:
+            raise ValueError("Debit amount must be positive.")
+
+        return self._apply_update(
+            balance=F('balance') - amount,
+            on_hold=Case(
+                When(balance__gte=amount, then=F('on_hold')),
+                default=amount,
+            ),
+        )
+
+    @classmethod
+    def add_to_balance(cls, user_id, amount):
+        """
+        Add an amount to a user's wallet balance without loading the wallet.
+        Returns False when the user has no wallet.
+        """
+        return cls.objects.filter(user_id=user_id).update(
+            balance=F('balance') + amount,
+            updated_at=now(),
+        ) > 0
+
+    @classmethod
+    def assign_missing_packs(cls, queryset):
+        """
+        Set-based version of the pack rule of save(): wallets of ``queryset``
+        without an active pack get the highest active pack their balance
+        reaches, or the lowest active pack. One UPDATE per active pack.
+        """
+        missing = queryset.filter(Q(package__isnull=True) | Q(package__is_active=False))
+        if not missing.exists():
+            return
+        packs = list(Pack.objects.filter(is_active=True).order_by('-usd_value'))
+        for pack in packs:
+            # Wallets get their pack in the first matching update, later ones skip them
+            cls.objects.filter(pk__in=missing.filter(balance__gte=pack.usd_value).values('pk')).update(package=pack)
+        lowest = packs[-1] if packs else None
+        cls.objects.filter(pk__in=missing.values('pk')).update(package=lowest)
+
     def save(self, *args, **kwargs):
         """
         Assign a Pack based on the wallet balance ONLY on creation or when no pack is set.